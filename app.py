@@ -1,16 +1,28 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from src.orchestrator import Orchestrator
+from src.broker import BrokerError
+from src.jobs import PipelineJob
+from src.datastore import get_datastore
+from src.dashboard import get_dashboard_cache
 from src.utils import setup_logging
 import logging
+import uuid
 import os
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# Inicializa o orquestrador
-orchestrator = Orchestrator()
+# O orquestrador é um singleton do processo (compartilhado entre as sessões) e só cria os agentes no primeiro uso
+@st.cache_resource
+def get_orchestrator():
+    return Orchestrator()
+
+@st.cache_resource
+def get_pipeline_job():
+    """Execução da pipeline em segundo plano, compartilhada entre as sessões."""
+    return PipelineJob(get_orchestrator())
+
+orchestrator = get_orchestrator()
 
 # Configuração da página
 st.set_page_config(page_title="O GUARDIÃO", layout="wide", initial_sidebar_state="collapsed")
@@ -162,41 +174,38 @@ st.markdown("""
 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">
 """, unsafe_allow_html=True)
 
-# Cache para carregar dados
-@st.cache_data
+# Os dados ficam em memória no DataStore compartilhado e são relidos apenas quando o arquivo muda
 def load_analysis():
     data_dir = "data"
     analysis_file = os.path.join(data_dir, "analyst_data.parquet")
-    
-    if not os.path.exists(analysis_file):
-        logger.warning(f"Arquivo de análise {analysis_file} não encontrado, executando pipeline")
-        _, analysis = orchestrator.run_pipeline()
-        return analysis
 
     try:
-        df = pd.read_parquet(analysis_file, engine="pyarrow")
-        required_columns = ["Categoria", "Subcategoria", "Valor"]
-        if df.empty or not all(col in df.columns for col in required_columns):
-            logger.warning(f"Arquivo {analysis_file} está vazio ou não contém colunas esperadas: {required_columns}")
-            _, analysis = orchestrator.run_pipeline()
-            return analysis
-
-        analysis = {}
-        for _, row in df.iterrows():
-            category = row["Categoria"]
-            subcategory = row["Subcategoria"]
-            value = row["Valor"]
-            if subcategory:
-                if category not in analysis:
-                    analysis[category] = {}
-                analysis[category][subcategory] = value
-            else:
-                analysis[category] = value
-        return analysis
+        analysis = get_datastore(data_dir).get_analysis() if os.path.exists(analysis_file) else {}
     except Exception as e:
         logger.error(f"Erro ao ler {analysis_file}: {e}")
-        _, analysis = orchestrator.run_pipeline()
-        return analysis
+        analysis = {}
+
+    if not analysis:
+        # a pipeline roda em segundo plano; a página nunca espera por ela
+        job = get_pipeline_job()
+        if job.status in ("idle", "busy"):
+            logger.warning(f"Arquivo de análise {analysis_file} ausente ou vazio, iniciando pipeline em segundo plano")
+            job.start()
+    return analysis
+
+@st.fragment(run_every=2)
+def pipeline_status():
+    """Mostra o progresso da pipeline em segundo plano e recarrega a página quando ela termina."""
+    job = get_pipeline_job()
+    if job.running:
+        st.progress(job.progress, text=f"{job.stage}...")
+    elif job.status == "busy":
+        st.info("A pipeline já está em execução em outro processo (ex.: o agendador). O painel será atualizado quando ela terminar.")
+    elif job.status == "error":
+        st.error(f"A pipeline falhou: {job.error}")
+    elif job.finished_at and st.session_state.get("pipeline_finished_at") != job.finished_at:
+        st.session_state.pipeline_finished_at = job.finished_at
+        st.rerun()
 
 # Banner
 with st.container():
@@ -216,52 +225,64 @@ with tab1:
     analysis = load_analysis()
 
     if not analysis:
-        st.warning("Nenhum dado disponível. Tente executar o pipeline novamente.")
-        if st.button("Executar Pipeline"):
-            with st.spinner("Executando pipeline..."):
-                _, analysis = orchestrator.run_pipeline()
-                st.experimental_rerun()
+        job = get_pipeline_job()
+        if job.running:
+            st.info("Coletando dados em segundo plano. O painel será atualizado automaticamente.")
+        elif job.status == "busy":
+            if st.button("Tentar novamente"):
+                job.start()
+        else:
+            st.warning("Nenhum dado disponível. Tente executar o pipeline novamente.")
+            if st.button("Executar Pipeline"):
+                job.start()
+        pipeline_status()
     else:
+        # agregados e figuras vêm prontos do cache do painel, recalculado só quando os dados mudam
+        dashboard = get_dashboard_cache().get(require_figures=True)
+        figures = dashboard["figures"]
+
         # Total de golpes registrados
-        st.metric(label="Total de Golpes Registrados", value=analysis.get("total_golpes", 0), delta_color="off")
+        st.metric(label="Total de Golpes Registrados", value=dashboard["total"], delta_color="off")
 
         # Gráficos em colunas
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("<h3>Tipos de Golpes</h3>", unsafe_allow_html=True)
-            tipos = analysis.get("golpes_por_tipo", {})
-            if tipos:
-                df_types = pd.DataFrame(list(tipos.items()), columns=["Tipo", "Contagem"])
-                fig_types = px.bar(df_types, x="Tipo", y="Contagem", title="Distribuição por Tipo de Golpe",
-                                   color_discrete_sequence=["#e48f4f"])
-                fig_types.update_layout(paper_bgcolor="#252525", plot_bgcolor="#252525", font_color="#e9e9e9")
-                st.plotly_chart(fig_types, use_container_width=True)
+            if "tipos" in figures:
+                st.plotly_chart(figures["tipos"], use_container_width=True)
             else:
                 st.info("Nenhum dado disponível para tipos de golpes.")
 
         with col2:
             st.markdown("<h3>Canais Utilizados</h3>", unsafe_allow_html=True)
-            canais = analysis.get("golpes_por_canal", {})
-            if canais:
-                df_channels = pd.DataFrame(list(canais.items()), columns=["Canal", "Contagem"])
-                fig_channels = px.bar(df_channels, x="Canal", y="Contagem", title="Distribuição por Canal",
-                                      color_discrete_sequence=["#e48f4f"])
-                fig_channels.update_layout(paper_bgcolor="#252525", plot_bgcolor="#252525", font_color="#e9e9e9")
-                st.plotly_chart(fig_channels, use_container_width=True)
+            if "canais" in figures:
+                st.plotly_chart(figures["canais"], use_container_width=True)
             else:
                 st.info("Nenhum dado disponível para canais utilizados.")
 
         st.markdown("<h3>Público Alvo</h3>", unsafe_allow_html=True)
-        publicos = analysis.get("golpes_por_publico", {})
-        if publicos:
-            df_public = pd.DataFrame(list(publicos.items()), columns=["Público", "Contagem"])
-            fig_public = px.pie(df_public, names="Público", values="Contagem", title="Distribuição por Público Alvo",
-                                color_discrete_sequence=["#e48f4f", "#f5b041", "#e67e22"])
-            fig_public.update_layout(paper_bgcolor="#252525", plot_bgcolor="#252525", font_color="#e9e9e9")
-            st.plotly_chart(fig_public, use_container_width=True)
+        if "publicos" in figures:
+            st.plotly_chart(figures["publicos"], use_container_width=True)
         else:
             st.info("Nenhum dado disponível para público alvo.")
 
+        st.markdown("<h3>Tipo de Golpe × Canal</h3>", unsafe_allow_html=True)
+        if "tipo_canal" in figures:
+            st.plotly_chart(figures["tipo_canal"], use_container_width=True)
+        else:
+            st.info("Nenhum dado disponível para o cruzamento de tipo e canal.")
+
+        # séries temporais pré-calculadas pelo analista (timeseries.parquet)
+        st.markdown("<h3>Tendências</h3>", unsafe_allow_html=True)
+        for spike in dashboard.get("spikes", []):
+            st.warning(f"Pico de notícias de **{spike['tipo']}** na última semana: {spike['casos']} casos (escore {spike['escore']}).")
+        if "tendencia_total" in figures:
+            st.plotly_chart(figures["tendencia_total"], use_container_width=True)
+        if "tendencia_tipos" in figures:
+            st.plotly_chart(figures["tendencia_tipos"], use_container_width=True)
+        if "tendencia_total" not in figures and "tendencia_tipos" not in figures:
+            st.info("Nenhum dado disponível para as tendências.")
+
 # Página Informativo
 with tab2:
     st.markdown("<h2><i class='fas fa-book'></i> Informativo sobre Golpes</h2>", unsafe_allow_html=True)
@@ -273,10 +294,15 @@ with tab2:
         st.markdown("### Principais Golpes Identificados")
         tipos = analysis.get("golpes_por_tipo", {})
         if tipos:
-            for fraud_type, count in sorted(tipos.items(), key=lambda x: x[1], reverse=True)[:5]:
+            top_tipos = sorted(tipos.items(), key=lambda x: x[1], reverse=True)[:5]
+            # as perguntas são enviadas em paralelo ao professor
+            with st.spinner("Gerando informativos..."):
+                responses = orchestrator.get_educational_responses(
+                    [f"Como se prevenir de {fraud_type}?" for fraud_type, _ in top_tipos], analysis
+                )
+            for (fraud_type, count), response in zip(top_tipos, responses):
                 with st.expander(f"🔍 {fraud_type} ({count} casos)"):
                     st.markdown(f"- **Ocorrências**: {count}")
-                    response = orchestrator.get_educational_response(f"Como se prevenir de {fraud_type}?", analysis)
                     st.markdown(response)
         else:
             st.info("Nenhum dado disponível para golpes identificados.")
@@ -289,6 +315,9 @@ with tab3:
     # Inicializa o estado da sessão para o histórico do chat
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    # identifica a sessão no limite de perguntas por sessão do broker
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
     # Container para o chat
     with st.container():
@@ -300,8 +329,39 @@ with tab3:
 
     # Input para nova pergunta
     question = st.text_input("Digite sua pergunta:", key="chat_input", placeholder="Ex.: Como prevenir vazamentos de dados?")
-    if question:
+    # com a fila do broker carregada, avisa antes de o usuário perguntar
+    carga = orchestrator.broker.status()
+    if carga["queued"] >= carga["max_queue"] // 2:
+        st.info("O Guardião está atendendo muitas perguntas agora; as respostas podem demorar.")
+
+    # só processa perguntas novas, já que o text_input mantém o valor entre reruns
+    if question and question != st.session_state.get("last_question"):
+        st.session_state.last_question = question
         analysis = load_analysis()
-        response = orchestrator.get_educational_response(question, analysis)
-        st.session_state.chat_history.append({"user": question, "bot": response})
-        st.experimental_rerun()
\ No newline at end of file
+        st.markdown(f'<div class="chat-message user-message">Você: {question}</div>', unsafe_allow_html=True)
+        try:
+            ticket = orchestrator.submit_question(question, analysis, session_id=st.session_state.session_id)
+        except BrokerError as e:
+            # pergunta recusada (fila cheia ou muitas perguntas da sessão): pode ser reenviada
+            st.warning(str(e))
+            st.session_state.pop("last_question", None)
+            st.button("Tentar novamente")
+        else:
+            aviso = st.empty()
+            posicao = ticket.position()
+            if posicao:
+                aviso.info(f"Sua pergunta está na fila (posição {posicao}). A resposta começa em instantes.")
+            elif ticket.coalesced:
+                aviso.caption("Essa pergunta já está sendo respondida para outra pessoa; acompanhando a mesma resposta.")
+
+            def acompanhar():
+                # o aviso some quando o primeiro pedaço da resposta chega
+                for i, chunk in enumerate(ticket.stream()):
+                    if i == 0:
+                        aviso.empty()
+                    yield chunk
+
+            with st.container():
+                # a resposta aparece à medida que o Gemini gera os tokens
+                response = st.write_stream(acompanhar())
+            st.session_state.chat_history.append({"user": question, "bot": response})
\ No newline at end of file
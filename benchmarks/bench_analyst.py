@@ -0,0 +1,73 @@
+"""Compara a análise vetorizada do AnalystAgent com a versão antiga baseada em Counter.
+
+Uso (na raiz do projeto): python -m benchmarks.bench_analyst --rows 1000000
+"""
+import time
+import argparse
+from collections import Counter
+import numpy as np
+import pandas as pd
+from src.analyst import AnalystAgent
+from src.storage import EngineerDataset
+
+
+def synthetic_data(rows, seed=42, data_dir="data"):
+    """Gera dados sintéticos reamostrando os registros reais com datas e fontes aleatórias."""
+    rng = np.random.default_rng(seed)
+    base = EngineerDataset(data_dir).read()
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    datas = np.datetime64("2023-01-01") + rng.integers(0, 3 * 365, rows).astype("timedelta64[D]")
+    df["Data da notícia"] = pd.Series(datas).dt.strftime("%Y-%m-%d")
+    df["Fonte"] = df["Fonte"] + "?id=" + pd.Series(rng.integers(0, rows // 10 + 1, rows)).astype(str)
+    return df
+
+
+def analyze_with_counters(df):
+    """Implementação anterior, baseada em collections.Counter (referência)."""
+    df = df.copy()
+    tipos = Counter(df["Tipo do golpe"])
+    canais = Counter(df["Canal utilizado"])
+    publicos = Counter(df["Público alvo"])
+    fontes = Counter(df["Fonte"])
+    df["Data da notícia"] = pd.to_datetime(df["Data da notícia"], errors="coerce")
+    tendencias_mensais = df.groupby(df["Data da notícia"].dt.to_period("M")).size().to_dict()
+    return {
+        "total_golpes": len(df),
+        "golpes_por_tipo": dict(tipos),
+        "golpes_por_canal": dict(canais),
+        "golpes_por_publico": dict(publicos),
+        "golpes_por_fonte": dict(fontes),
+        "tendencias_mensais": {str(k): v for k, v in tendencias_mensais.items()},
+    }
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_data(args.rows)
+    agent = AnalystAgent()
+    counter_time, counter_result = best_of(analyze_with_counters, df, args.repeat)
+    vector_time, vector_result = best_of(agent.analyze_data, df, args.repeat)
+
+    iguais = all(counter_result[key] == vector_result[key] for key in counter_result)
+    print(f"Linhas: {args.rows}")
+    print(f"Counter:    {counter_time:.3f}s")
+    print(f"Vetorizado: {vector_time:.3f}s (inclui métricas cruzadas)")
+    print(f"Speedup:    {counter_time / vector_time:.1f}x")
+    print(f"Resultados equivalentes: {iguais}")
+
+
+if __name__ == "__main__":
+    main()
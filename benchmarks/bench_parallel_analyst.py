@@ -0,0 +1,91 @@
+"""Mede o tempo da análise paralela (ProcessPoolExecutor) contra a serial do AnalystAgent.
+
+Gera um dataset sintético em um diretório temporário, com registros reingeridos em arquivos
+posteriores (para exercitar a deduplicação entre fatias). O agente roda no diretório temporário,
+com uma cópia do config.yaml (backend e analyst.workers da linha de comando) e o seu próprio data/.
+A equivalência dos resultados é conferida por tests/test_analyst_parallel.py.
+
+Uso (na raiz do projeto): python -m benchmarks.bench_parallel_analyst --rows 2000000 --workers 4
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import yaml
+from benchmarks.datasets import engineer_records, generate_dataset
+from src.analyst import AnalystAgent
+from src.storage import BACKENDS, open_engineer_storage
+
+
+def reingest(dataset, rows, seed):
+    """Reinsere parte dos registros com outro tipo de golpe (substituições pela chave)."""
+    df = engineer_records(rows, seed=seed)
+    novos = engineer_records(rows, seed=seed + 1)
+    df["Tipo do golpe"] = novos["Tipo do golpe"].to_numpy()
+    dataset.append(df)
+
+
+def workspace(config_path, backend, workers, shard_rows=None):
+    """Diretório temporário com config.yaml (backend, processos e fatias do analista) e data/ vazio."""
+    path = tempfile.mkdtemp(prefix="bench-parallel-")
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("analyst", {})["workers"] = workers
+    if shard_rows:
+        config["analyst"]["shard_rows"] = shard_rows
+    config.setdefault("storage", {})["backend"] = backend
+    with open(os.path.join(path, "config.yaml"), "w") as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    os.makedirs(os.path.join(path, "data"))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", choices=list(BACKENDS), default="parquet")
+    parser.add_argument("--shard-rows", type=int, help="linhas por fatia (padrão: analyst.shard_rows)")
+    parser.add_argument("--config", default="config.yaml", help="config.yaml copiado para o diretório temporário")
+    args = parser.parse_args()
+
+    path = workspace(args.config, args.backend, args.workers, args.shard_rows)
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        generate_dataset(args.rows, "data", seed=42, chunk_rows=args.chunk_rows, backend=args.backend)
+        reingest(open_engineer_storage("data", args.backend), max(args.rows // 20, 1), seed=42)
+
+        agent = AnalystAgent()
+        inicio = time.perf_counter()
+        df = agent.read_from_parquet()
+        agent.analyze_data(df)
+        agent.state.rebuild(df)
+        serial_time = time.perf_counter() - inicio
+        del df
+
+        # analyze_parallel recria o estado incremental do próprio agente (data/analyst_state.sqlite)
+        inicio = time.perf_counter()
+        resultado = agent.analyze_parallel()
+        parallel_time = time.perf_counter() - inicio
+        if resultado is None:
+            print("A análise paralela não rodou (menos de duas fatias ou erro); aumente --rows")
+            return 1
+
+        fatias = len(agent.store.engineer_dataset.shards(agent.shard_rows))
+        print(f"Linhas: {args.rows} (+{max(args.rows // 20, 1)} reingeridas), backend {args.backend}")
+        print(f"Fatias: {fatias}, processos: {args.workers}")
+        print(f"Serial:   {serial_time:.3f}s (leitura + análise + estado)")
+        print(f"Paralelo: {parallel_time:.3f}s")
+        print(f"Speedup:  {serial_time / parallel_time:.1f}x")
+        return 0
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Compara as leituras filtradas do dataset Parquet (projeção + filtros no pyarrow) com a leitura completa.
+
+Gera um dataset sintético em um diretório temporário, com registros reingeridos em um arquivo
+posterior (para exercitar a deduplicação entre arquivos), e confere, para cada filtro, que
+EngineerDataset.select devolve as mesmas linhas que filter_frame sobre read(). Mostra o tempo de
+cada leitura e quantos grupos de linhas o filtro descarta. Depois compacta o dataset e confere que
+select com limit (que para de ler ao atingir o limite) devolve as primeiras linhas da leitura
+completa. Sai com código 1 se houver diferença.
+
+Uso (na raiz do projeto): python -m benchmarks.bench_pushdown --rows 1000000
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from benchmarks.datasets import engineer_records, generate_dataset
+from src.storage import CHAVE_DEDUP, EngineerDataset, filter_expression, filter_frame
+
+FILTROS = [
+    {"date_from": "2025-03-01", "date_to": "2025-03-31"},
+    {"tipo": "Golpe do Pix", "date_from": "2025-03-01", "date_to": "2025-03-31"},
+    {"tipo": "Golpe do Pix", "publico": "Idosos", "date_from": "2025-12-24", "date_to": "2025-12-31"},
+    {"canal": "WhatsApp"},
+]
+COLUNAS = ["Fonte", "Data da notícia", "Tipo do golpe", "Canal utilizado"]
+LIMITE = 100
+
+
+def row_groups(dataset, filters):
+    """(grupos de linhas lidos, total de grupos) com o filtro, somando todos os arquivos."""
+    lidos = total = 0
+    expression = filter_expression(**filters)
+    for _, path in dataset.files():
+        for fragment in dataset._open(path).get_fragments():
+            total += fragment.num_row_groups
+            lidos += len(fragment.split_by_row_group(filter=expression))
+    return lidos, total
+
+
+def same_rows(a, b):
+    if len(a) != len(b):
+        return False
+    ordenar = lambda df: df.sort_values(CHAVE_DEDUP).reset_index(drop=True).astype(str)
+    return ordenar(a).equals(ordenar(b[list(a.columns)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--memory-map", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench-pushdown-")
+    try:
+        generate_dataset(args.rows, data_dir, seed=42, chunk_rows=args.chunk_rows, backend="parquet")
+        dataset = EngineerDataset(data_dir, memory_map=args.memory_map)
+        # substituições: chaves já gravadas com outro tipo de golpe, em um arquivo posterior
+        df = dataset.read().sample(n=max(args.rows // 20, 1), random_state=42)
+        df["Tipo do golpe"] = engineer_records(len(df), seed=43)["Tipo do golpe"].to_numpy()
+        dataset.append(df)
+
+        inicio = time.perf_counter()
+        completo = dataset.read()
+        leitura = time.perf_counter() - inicio
+        print(f"Linhas: {args.rows} (+{len(df)} reingeridas) em {dataset.num_files()} arquivos")
+        print(f"Leitura completa: {leitura:.3f}s ({len(completo)} registros)")
+
+        iguais = True
+        for filters in FILTROS:
+            inicio = time.perf_counter()
+            resultado = dataset.select(columns=COLUNAS, **filters)
+            filtrada = time.perf_counter() - inicio
+            esperado = filter_frame(completo, **filters)
+            igual = same_rows(resultado, esperado)
+            iguais &= igual
+            lidos, total = row_groups(dataset, filters)
+            print(f"{filters}: {len(resultado)} linhas em {filtrada:.3f}s, {lidos}/{total} grupos lidos, iguais: {igual}")
+
+        inicio = time.perf_counter()
+        contagem = dataset.count(by=["tipo"], date_from="2025-06-01", date_to="2025-06-30")
+        print(f"count(by=tipo, junho): {int(contagem['count'].sum())} registros em {time.perf_counter() - inicio:.3f}s")
+
+        dataset.compact()
+        for filters in [{}, *FILTROS]:
+            inicio = time.perf_counter()
+            resultado = dataset.select(columns=COLUNAS, limit=LIMITE, **filters)
+            limitada = time.perf_counter() - inicio
+            esperado = dataset.scan(COLUNAS, **filters).head(LIMITE)
+            igual = resultado.astype(str).equals(esperado.reset_index(drop=True).astype(str))
+            iguais &= igual
+            print(f"compactado, limit={LIMITE} {filters}: {len(resultado)} linhas em {limitada:.3f}s, iguais: {igual}")
+        print(f"Resultados equivalentes: {iguais}")
+        return 0 if iguais else 1
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
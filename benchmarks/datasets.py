@@ -0,0 +1,78 @@
+"""Gerador de datasets sintéticos do engenheiro com os vocabulários reais do prompt.
+
+Uso (na raiz do projeto): python -m benchmarks.datasets --rows 1000000 --data-dir /tmp/bench/data
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from src.engineer import FONTES, TIPOS_GOLPE, CANAIS, PUBLICOS
+from src.storage import BACKENDS, open_engineer_storage
+
+DOMINIOS = {
+    "G1": "g1.globo.com",
+    "UOL": "economia.uol.com.br",
+    "TecMundo": "www.tecmundo.com.br",
+    "Polícia Federal": "www.gov.br/pf",
+    "Febraban": "portal.febraban.org.br",
+    "Reclame Aqui": "www.reclameaqui.com.br",
+}
+DESCRICOES = [
+    "Golpistas se passam por funcionários do banco e pedem uma transferência via Pix.",
+    "Mensagens com links falsos levam a páginas que imitam sites oficiais.",
+    "Criminosos clonam o WhatsApp da vítima e pedem dinheiro aos contatos.",
+    "Falsa oferta de investimento com retorno garantido e alto rendimento.",
+    "Comprovantes falsos são enviados para liberar mercadorias sem pagamento.",
+]
+
+
+def engineer_records(rows, seed=42, start=0):
+    """Gera rows registros no formato do engineer_data; start desloca os identificadores das URLs."""
+    rng = np.random.default_rng(seed + start)
+    fontes = np.array(FONTES, dtype=object)[rng.integers(0, len(FONTES), rows)]
+    dominios = pd.Series(fontes).map(DOMINIOS)
+    datas = np.datetime64("2025-01-01") + rng.integers(0, 365, rows).astype("timedelta64[D]")
+    impacto = np.where(
+        rng.random(rows) < 0.6,
+        "Não informado",
+        "R$ " + rng.integers(1, 900, rows).astype(str).astype(object) + " mil",
+    )
+    return pd.DataFrame({
+        "Fonte": "https://" + dominios + "/noticia/" + pd.Series(np.arange(start, start + rows)).astype(str),
+        "Data da notícia": pd.Series(datas).dt.strftime("%Y-%m-%d"),
+        "Tipo do golpe": np.array(TIPOS_GOLPE, dtype=object)[rng.integers(0, len(TIPOS_GOLPE), rows)],
+        "Descrição breve do golpe": np.array(DESCRICOES, dtype=object)[rng.integers(0, len(DESCRICOES), rows)],
+        "Canal utilizado": np.array(CANAIS, dtype=object)[rng.integers(0, len(CANAIS), rows)],
+        "Público alvo": np.array(PUBLICOS, dtype=object)[rng.integers(0, len(PUBLICOS), rows)],
+        "Estimativa de impacto ou prejuízo": impacto,
+    })
+
+
+def generate_dataset(rows, data_dir="data", seed=42, chunk_rows=1_000_000, backend=None):
+    """Grava rows registros sintéticos no armazenamento do engenheiro, um lote por bloco de chunk_rows.
+
+    Os blocos mantêm o uso de memória limitado mesmo para 10M de linhas. O backend padrão é o
+    storage.backend do config.yaml.
+    """
+    dataset = open_engineer_storage(data_dir, backend)
+    for start in range(0, rows, chunk_rows):
+        dataset.append(engineer_records(min(chunk_rows, rows - start), seed=seed, start=start))
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--backend", choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = generate_dataset(args.rows, args.data_dir, args.seed, args.chunk_rows, args.backend)
+    print(f"{args.rows} linhas em {dataset.num_files()} arquivos ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
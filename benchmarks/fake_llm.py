@@ -0,0 +1,91 @@
+"""Modelo falso com a mesma interface do GenerativeModel do Gemini, para rodar sem GEMINI_API_KEY.
+
+Uso: EngineerAgent(model=FakeModel()), ProfessorAgent(model=FakeModel()) ou Orchestrator(model=FakeModel()).
+"""
+import re
+import json
+import time
+import random
+import itertools
+import threading
+from types import SimpleNamespace
+from src.engineer import TIPOS_GOLPE, CANAIS, PUBLICOS, MESES
+
+
+class FakeResponse:
+    """Resposta com .text e usage_metadata; iterável em pedaços quando pedida com stream=True."""
+
+    def __init__(self, text, prompt, chunk_size=40):
+        self.text = text
+        self._chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        # estimativa grosseira de ~4 caracteres por token, como a do Gemini para português
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+        )
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeModel:
+    """Gera respostas determinísticas: lista JSON para o prompt do engenheiro e Markdown para o professor.
+
+    latency é o tempo (em segundos) de cada chamada; records é o número de registros por resposta JSON.
+    Cada chamada gera URLs novas, para que os registros não sejam descartados como duplicados.
+    """
+
+    def __init__(self, latency=0.0, records=10, seed=0):
+        self.latency = latency
+        self.records = records
+        self.seed = seed
+        self.calls = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+            call = next(self._counter)
+        if self.latency:
+            time.sleep(self.latency)
+        if "lista JSON" in prompt:
+            text = self._json_records(prompt, call)
+        else:
+            text = self._markdown(prompt)
+        return FakeResponse(text, prompt)
+
+    def _json_records(self, prompt, call):
+        rng = random.Random(self.seed * 1_000_003 + call)
+        # respeita o foco do prompt (ex.: 'Busque apenas golpes do tipo "Phishing".')
+        tipo = re.search(r'golpes do tipo "([^"]+)"', prompt)
+        canal = re.search(r'pelo canal "([^"]+)"', prompt)
+        publico = re.search(r'ao público "([^"]+)"', prompt)
+        mes = re.search(r"no mês (\d{4}-\d{2})", prompt)
+        registros = []
+        for i in range(self.records):
+            registros.append({
+                "Fonte": f"https://noticias.exemplo.com.br/golpes/{self.seed}-{call}-{i}",
+                "Data da notícia": f"{mes.group(1) if mes else rng.choice(MESES)}-{rng.randint(1, 28):02d}",
+                "Tipo do golpe": tipo.group(1) if tipo else rng.choice(TIPOS_GOLPE),
+                "Descrição breve do golpe": "Golpistas se passam por instituições para obter dados e transferências.",
+                "Canal utilizado": canal.group(1) if canal else rng.choice(CANAIS),
+                "Público alvo": publico.group(1) if publico else rng.choice(PUBLICOS),
+                "Estimativa de impacto ou prejuízo": rng.choice(["Não informado", f"R$ {rng.randint(1, 900)} mil"]),
+            })
+        return json.dumps(registros, ensure_ascii=False)
+
+    def _markdown(self, prompt):
+        pergunta = re.search(r"\*\*Pergunta do usuário\*\*: (.*)", prompt)
+        assunto = pergunta.group(1).strip() if pergunta else "golpes financeiros"
+        return (
+            f"### Sobre {assunto}\n"
+            "Este é um golpe comum no Brasil, segundo os dados coletados.\n\n"
+            "#### Como se prevenir\n"
+            "1. Desconfie de mensagens com urgência.\n"
+            "2. Confirme a identidade do contato por outro canal.\n"
+            "3. Nunca compartilhe senhas ou códigos.\n\n"
+            "#### Exemplo prático\n"
+            "Você recebe um pedido de Pix de um número desconhecido. **O que fazer?** Ligue para a pessoa antes de pagar."
+        )
@@ -0,0 +1,245 @@
+"""Benchmarks reprodutíveis da pipeline, sem GEMINI_API_KEY (usa o modelo falso de benchmarks.fake_llm).
+
+Mede ingestão (save_to_parquet), análise, leitura das métricas, montagem dos prompts e a
+run_pipeline completa, para cada tamanho de dataset, e grava os resultados em JSON.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.suite --rows 1000,100000 --output benchmarks/results/atual.json
+    python -m benchmarks.suite --rows 1000,100000 --compare benchmarks/results/anterior.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+import pandas as pd
+import pyarrow
+from src.engineer import EngineerAgent
+from src.analyst import AnalystAgent
+from src.professor import ProfessorAgent
+from src.orchestrator import Orchestrator
+from src.datastore import DataStore, get_datastore
+from src.retrieval import reset_retrieval_index
+from src.metrics import dimension_frame
+from src.analyst_state import DIMENSOES, CRUZAMENTOS
+from benchmarks.fake_llm import FakeModel
+from benchmarks.datasets import engineer_records, generate_dataset
+
+PERGUNTAS = [
+    "O que é o golpe do Pix?",
+    "Como evitar phishing?",
+    "Quais golpes atingem mais os idosos?",
+    "Como identificar um falso investimento?",
+]
+
+
+def summarize(runs):
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "runs": runs,
+    }
+
+
+def measure(func, repeat):
+    """Executa func repeat vezes e resume os tempos."""
+    runs = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - inicio)
+    return summarize(runs)
+
+
+class Workspace:
+    """Diretório temporário com config.yaml e data/, usado como diretório de trabalho dos agentes."""
+
+    def __init__(self, root, config_path):
+        self.path = tempfile.mkdtemp(dir=root)
+        shutil.copy(config_path, os.path.join(self.path, "config.yaml"))
+        os.makedirs(os.path.join(self.path, "data"))
+
+    def __enter__(self):
+        self._cwd = os.getcwd()
+        os.chdir(self.path)
+        # o DataStore e o índice de busca compartilhados são indexados pelo caminho relativo "data"
+        get_datastore("data").invalidate()
+        reset_retrieval_index("data")
+        return self
+
+    def __exit__(self, *exc):
+        os.chdir(self._cwd)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class BenchmarkSuite:
+    def __init__(self, rows_list, repeat=3, llm_latency=0.0, workdir=None, config_path="config.yaml"):
+        self.rows_list = rows_list
+        self.repeat = repeat
+        self.llm_latency = llm_latency
+        self.workdir = workdir
+        self.config_path = os.path.abspath(config_path)
+
+    def workspace(self, rows=0):
+        ws = Workspace(self.workdir, self.config_path)
+        if rows:
+            generate_dataset(rows, os.path.join(ws.path, "data"))
+        return ws
+
+    def bench_ingest(self, rows):
+        """save_to_parquet de rows registros novos (deduplicação + escrita) em um dataset vazio."""
+        records = engineer_records(rows, start=0).to_dict("records")
+        runs = []
+        for _ in range(self.repeat):
+            with self.workspace():
+                agent = EngineerAgent(model=FakeModel())
+                inicio = time.perf_counter()
+                agent.save_to_parquet(records)
+                runs.append(time.perf_counter() - inicio)
+        return summarize(runs)
+
+    def bench_analysis(self, rows):
+        """analyze_data sobre o DataFrame já carregado."""
+        with self.workspace(rows):
+            agent = AnalystAgent()
+            df = agent.read_from_parquet()
+            return measure(lambda: agent.analyze_data(df), self.repeat)
+
+    def bench_metrics_load(self, rows):
+        """Leitura a frio do analyst_data.parquet e montagem dos quadros de todas as dimensões."""
+        with self.workspace(rows):
+            AnalystAgent().run()
+
+            def load():
+                metrics = DataStore("data").get_metrics()
+                for dimension in [*DIMENSOES, *CRUZAMENTOS]:
+                    dimension_frame(metrics, dimension)
+            return measure(load, self.repeat)
+
+    def bench_prompt_build(self, rows):
+        """Montagem dos prompts do professor (uma por pergunta) e dos prompts em lote do engenheiro."""
+        with self.workspace(rows):
+            AnalystAgent().run()
+            model = FakeModel()
+            professor = ProfessorAgent(model=model)
+            engineer = EngineerAgent(model=model)
+            engineer_df, analysis = professor.read_parquets()
+
+            def build():
+                for pergunta in PERGUNTAS:
+                    professor.create_prompt(pergunta, engineer_df, analysis)
+                for foco in engineer.build_queries(["tipo", "canal"]):
+                    engineer.prompt_da_busca(foco=foco, max_results=engineer.max_results_per_query)
+            return measure(build, self.repeat)
+
+    def bench_pipeline(self, rows):
+        """run_pipeline completa (engenheiro + analista) com o modelo falso sobre o dataset existente."""
+        runs = []
+        for _ in range(self.repeat):
+            with self.workspace(rows):
+                orchestrator = Orchestrator(model=FakeModel(latency=self.llm_latency))
+                inicio = time.perf_counter()
+                orchestrator.run_pipeline()
+                runs.append(time.perf_counter() - inicio)
+        return summarize(runs)
+
+    BENCHMARKS = ["ingest", "analysis", "metrics_load", "prompt_build", "pipeline"]
+
+    def run(self, only=None):
+        results = {}
+        for rows in self.rows_list:
+            for name in only or self.BENCHMARKS:
+                key = f"{name}[{rows}]"
+                print(f"Executando {key}...", flush=True)
+                result = getattr(self, f"bench_{name}")(rows)
+                result["rows"] = rows
+                results[key] = result
+                print(f"  mediana {result['median']:.4f}s (mín. {result['min']:.4f}s)", flush=True)
+        return {"meta": self.metadata(), "results": results}
+
+    def metadata(self):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "pyarrow": pyarrow.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": self.repeat,
+            "llm_latency": self.llm_latency,
+        }
+
+
+def compare(current, baseline, threshold):
+    """Imprime a razão atual/base das medianas; retorna as chaves que pioraram além de threshold."""
+    regressions = []
+    print(f"\n{'benchmark':<28}{'base':>10}{'atual':>10}{'razão':>8}")
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            print(f"{key:<28}{'-':>10}{result['median']:>10.4f}{'-':>8}")
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        marca = " <- regressão" if ratio > threshold else ""
+        print(f"{key:<28}{base['median']:>10.4f}{result['median']:>10.4f}{ratio:>8.2f}{marca}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da pipeline do Guardião")
+    parser.add_argument("--rows", default="1000,100000",
+                        help="Tamanhos do dataset separados por vírgula (ex.: 1000,1000000,10000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help=f"Benchmarks separados por vírgula: {','.join(BenchmarkSuite.BENCHMARKS)}")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada do modelo, em segundos")
+    parser.add_argument("--workdir", help="Diretório para os datasets temporários (padrão: temp do sistema)")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument("--compare", help="Resultado anterior (JSON) para comparar as medianas")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Razão atual/base a partir da qual a comparação acusa regressão")
+    args = parser.parse_args(argv)
+
+    # os logs INFO dos agentes distorceriam as medições
+    logging.getLogger().setLevel(logging.WARNING)
+
+    suite = BenchmarkSuite(
+        rows_list=[int(rows) for rows in args.rows.split(",")],
+        repeat=args.repeat,
+        llm_latency=args.llm_latency,
+        workdir=args.workdir,
+    )
+    report = suite.run(only=args.only.split(",") if args.only else None)
+
+    output = args.output or os.path.join("benchmarks", "results", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,13 @@
 import logging
 import pandas as pd
-from collections import Counter
 from dotenv import load_dotenv
 from src.utils import setup_logging, load_config
+from src.instrumentation import timed
+from src.datastore import get_datastore
+from src.metrics import analysis_to_metrics, write_metrics
+from src.timeseries import TimeSeriesBuilder
+from src.analyst_parallel import ParallelAnalysis, COLUNAS_ANALISE
+from src.analyst_state import AnalystState, VERSAO_ESTADO, count_series, counts_to_analysis
 import os
 
 load_dotenv()
@@ -14,67 +19,129 @@ class AnalystAgent:
         self.logger = logging.getLogger(__name__)
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.store = get_datastore(self.data_dir)
+        self.incremental = self.config.get("analyst", {}).get("incremental", True)
+        # análise completa em paralelo: 1 = serial, 0 = um processo por CPU
+        self.workers = self.config.get("analyst", {}).get("workers", 1)
+        self.shard_rows = self.config.get("analyst", {}).get("shard_rows", 500_000)
+        self.state = AnalystState(os.path.join(self.data_dir, "analyst_state.sqlite"))
+        ts_config = self.config.get("timeseries", {})
+        self.timeseries = TimeSeriesBuilder(
+            self.data_dir,
+            windows=ts_config.get("windows"),
+            spike_threshold=ts_config.get("spike_threshold", 3.0),
+        ) if ts_config.get("enabled", True) else None
 
-    def read_from_parquet(self, filename="engineer_data.parquet"):
-        """Lê dados de um arquivo Parquet local."""
+    def read_from_parquet(self):
+        """Lê o dataset do engenheiro (via cache compartilhado em memória), só com as colunas da análise."""
         try:
-            input_path = os.path.join(self.data_dir, filename)
-            if not os.path.exists(input_path):
-                self.logger.warning(f"Arquivo Parquet {input_path} não encontrado")
-                return pd.DataFrame()
-            df = pd.read_parquet(input_path, engine="pyarrow")
-            self.logger.info(f"Lido {len(df)} registros de {input_path}")
-            return df
+            return self.store.get_engineer_df(columns=COLUNAS_ANALISE)
         except Exception as e:
             self.logger.error(f"Erro ao ler arquivo Parquet: {e}")
             return pd.DataFrame()
 
+    @timed("analyst.analyze_data")
     def analyze_data(self, df):
         """Analisa os dados de fraude e gera métricas."""
         if df.empty:
             self.logger.warning("Nenhum dado para analisar")
             return {}
 
-        total_golpes = len(df)
-        tipos = Counter(df["Tipo do golpe"])
-        canais = Counter(df["Canal utilizado"])
-        publicos = Counter(df["Público alvo"])
-        fontes = Counter(df["Fonte"])
+        # uma única passada colunar: cada dimensão vira categórica e é contada pelos códigos
+        return counts_to_analysis(count_series(df))
 
-        # Análise de tendência (se datas estiverem disponíveis)
-        df["Data da notícia"] = pd.to_datetime(df["Data da notícia"], errors="coerce")
-        tendencias_mensais = df.groupby(df["Data da notícia"].dt.to_period("M")).size().to_dict()
+    @timed("analyst.analyze_parallel")
+    def analyze_parallel(self):
+        """Análise completa em um pool de processos, fatia a fatia do dataset.
 
-        return {
-            "total_golpes": total_golpes,
-            "golpes_por_tipo": dict(tipos),
-            "golpes_por_canal": dict(canais),
-            "golpes_por_publico": dict(publicos),
-            "golpes_por_fonte": dict(fontes),
-            "tendencias_mensais": {str(k): v for k, v in tendencias_mensais.items()}
-        }
+        Com a análise incremental ativa, o estado também é recriado a partir das fatias. Retorna
+        None quando não vale a pena (menos de duas fatias) ou em caso de erro, e a análise serial
+        deve ser usada.
+        """
+        try:
+            parallel = ParallelAnalysis(self.store.engineer_dataset, self.workers or None, self.shard_rows)
+            shards = parallel.shards()
+            if len(shards) < 2:
+                return None
+            analysis, rows = parallel.run(with_records=self.incremental, shards=shards)
+        except Exception as e:
+            self.logger.error(f"Erro na análise paralela, usando a serial: {e}")
+            return None
+        if not analysis:
+            self.logger.warning("Nenhum dado para analisar")
+        elif self.incremental:
+            self.state.rebuild_from(analysis, rows)
+        return analysis
 
     def save_analysis(self, analysis, filename="analyst_data.parquet"):
-        """Salva os resultados da análise em um arquivo Parquet local."""
+        """Salva os resultados da análise em um arquivo Parquet local e retorna a tabela de métricas."""
         try:
-            # Converte a análise para um DataFrame plano
-            linhas = []
-            for chave, valor in analysis.items():
-                if isinstance(valor, dict):
-                    for subchave, subvalor in valor.items():
-                        linhas.append({"Categoria": chave, "Subcategoria": subchave, "Valor": subvalor})
-                else:
-                    linhas.append({"Categoria": chave, "Subcategoria": "", "Valor": valor})
-            df = pd.DataFrame(linhas)
+            # uma linha por (dimensão, chave, subchave, período), com contagens int64
+            df = analysis_to_metrics(analysis)
             output_path = os.path.join(self.data_dir, filename)
-            df.to_parquet(output_path, engine="pyarrow", index=False)
+            write_metrics(df, output_path)
+            self.store.invalidate(filename)
             self.logger.info(f"Análise salva em {output_path}")
+            return df
         except Exception as e:
             self.logger.error(f"Erro ao salvar análise em Parquet: {e}")
+            return None
+
+    @timed("analyst.timeseries")
+    def save_timeseries(self, metrics):
+        """Recalcula as séries temporais (diária, semanal e mensal) a partir das contagens diárias."""
+        if self.timeseries is None or metrics is None:
+            return None
+        df = self.timeseries.run(metrics)
+        self.store.invalidate("timeseries.parquet")
+        return df
+
+    def update_analysis(self):
+        """Aplica às contagens persistidas apenas os arquivos do dataset ainda não processados.
+
+        Retorna None quando não há estado consistente com o dataset (ex.: primeira execução
+        ou dataset recriado), e a análise deve ser recalculada do zero.
+        """
+        try:
+            dataset = self.store.engineer_dataset
+            seq = self.state.sequence()
+            max_seq = dataset.max_seq()
+            if self.state.watermark() is None or seq is None or max_seq < seq:
+                return None
+            if self.state.schema_version() != VERSAO_ESTADO:
+                # estado gravado antes das dimensões atuais (ex.: sem as contagens diárias)
+                self.logger.info("Estado da análise em versão antiga; recalculando do zero")
+                return None
+
+            if max_seq > seq:
+                delta = dataset.read(since_seq=seq, columns=COLUNAS_ANALISE)
+                if not delta.empty:
+                    self.state.apply(delta)
+                self.state.set_sequence(max_seq)
+            return self.state.to_analysis()
+        except Exception as e:
+            self.logger.error(f"Erro na análise incremental: {e}")
+            return None
 
     def run(self):
-        """Executa a pipeline do analista."""
-        df = self.read_from_parquet("engineer_data.parquet")
-        analysis = self.analyze_data(df)
-        self.save_analysis(analysis, "analyst_data.parquet")
-        return analysis
\ No newline at end of file
+        """Executa a pipeline do analista (incremental quando há estado salvo)."""
+        analysis = None
+        if self.incremental:
+            analysis = self.update_analysis()
+
+        if analysis is None:
+            # sequência capturada antes da leitura: partes gravadas durante a análise ficam para a
+            # próxima execução (reaplicar um registro já contado não altera as contagens)
+            max_seq = self.store.engineer_dataset.max_seq()
+            analysis = self.analyze_parallel() if self.workers != 1 else None
+            if analysis is None:
+                df = self.read_from_parquet()
+                analysis = self.analyze_data(df)
+                if self.incremental and not df.empty:
+                    self.state.rebuild(df)
+            if self.incremental and analysis:
+                self.state.set_sequence(max_seq)
+
+        metrics = self.save_analysis(analysis, "analyst_data.parquet")
+        self.save_timeseries(metrics)
+        return analysis
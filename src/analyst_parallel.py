@@ -0,0 +1,75 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.storage import BACKENDS
+from src.analyst_state import count_series, merge_counts, counts_to_analysis, record_rows
+
+# colunas usadas pela análise (descrição e impacto não são lidos)
+COLUNAS_ANALISE = ["Fonte", "Data da notícia", "Tipo do golpe", "Canal utilizado", "Público alvo"]
+
+
+def analyze_shard(backend, data_dir, shard, with_records=False):
+    """Executado em um processo do pool: contagens parciais de uma fatia do dataset.
+
+    Linhas da fatia substituídas por versões mais recentes (em outras fatias ou arquivos) são
+    descartadas antes da contagem; com with_records, devolve também as linhas da tabela records
+    do estado do analista.
+    """
+    dataset = BACKENDS[backend](data_dir)
+    df = dataset.read_shard(shard, COLUNAS_ANALISE)
+    # no SQLite a chave é única; no Parquet, cada processo procura as substituições da sua fatia
+    drop = None if dataset.unique_keys else dataset.superseded_rows(shard)
+    if drop is not None and len(drop):
+        manter = np.ones(len(df), dtype=bool)
+        manter[drop] = False
+        df = df[manter].reset_index(drop=True)
+    if df.empty:
+        return None, []
+    rows = list(record_rows(df)) if with_records else []
+    return count_series(df), rows
+
+
+class ParallelAnalysis:
+    """Análise completa do dataset do engenheiro em um pool de processos.
+
+    O dataset é dividido em fatias de até shard_rows linhas (faixas de linhas dos arquivos no Parquet,
+    faixas de rowid no SQLite); cada processo conta as dimensões da sua fatia e as contagens parciais
+    são somadas, produzindo o mesmo dicionário de AnalystAgent.analyze_data. No Parquet, cada processo
+    descarta as linhas da sua fatia substituídas por versões mais recentes
+    (EngineerDataset.superseded_rows), para que as fatias não se sobreponham; o processo principal
+    não lê as chaves do histórico.
+    """
+
+    def __init__(self, dataset, workers=None, shard_rows=500_000):
+        self.logger = logging.getLogger(__name__)
+        self.dataset = dataset
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_rows = shard_rows
+
+    def shards(self):
+        return self.dataset.shards(self.shard_rows)
+
+    def run(self, with_records=False, shards=None):
+        """Retorna (análise, linhas do estado ou None); análise vazia se não há dados."""
+        shards = self.shards() if shards is None else shards
+        if not shards:
+            return {}, ([] if with_records else None)
+        # spawn: o pool pode ser criado a partir de uma thread (ex.: pipeline em segundo plano no app)
+        context = multiprocessing.get_context("spawn")
+        partials, rows = [], []
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(shards)), mp_context=context) as pool:
+            futures = [
+                pool.submit(analyze_shard, self.dataset.backend, self.dataset.data_dir, shard, with_records)
+                for shard in shards
+            ]
+            for future in futures:
+                counts, shard_rows = future.result()
+                if counts is not None:
+                    partials.append(counts)
+                    rows.extend(shard_rows)
+        if not partials:
+            return {}, ([] if with_records else None)
+        self.logger.info(f"Análise paralela: {len(shards)} fatias em {min(self.workers, len(shards))} processos")
+        return counts_to_analysis(merge_counts(partials)), (rows if with_records else None)
@@ -0,0 +1,232 @@
+import os
+import json
+import sqlite3
+import logging
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from src.storage import CHAVE_DEDUP
+
+# métricas por dimensão e a coluna do engineer_data de onde vêm
+DIMENSOES = {
+    "golpes_por_tipo": "Tipo do golpe",
+    "golpes_por_canal": "Canal utilizado",
+    "golpes_por_publico": "Público alvo",
+    "golpes_por_fonte": "Fonte",
+}
+# métricas cruzadas entre duas dimensões; a chave é "valor1 | valor2"
+CRUZAMENTOS = {
+    "golpes_por_tipo_canal": ("golpes_por_tipo", "golpes_por_canal"),
+    "golpes_por_tipo_publico": ("golpes_por_tipo", "golpes_por_publico"),
+    "tendencias_mensais_por_tipo": ("tendencias_mensais", "golpes_por_tipo"),
+    "serie_diaria_por_tipo": ("serie_diaria", "golpes_por_tipo"),
+    "serie_diaria_por_canal": ("serie_diaria", "golpes_por_canal"),
+    "serie_diaria_por_publico": ("serie_diaria", "golpes_por_publico"),
+}
+# dimensões de período: mês "YYYY-MM" e dia "YYYY-MM-DD" da notícia (base das séries temporais)
+PERIODOS = {"tendencias_mensais": "%Y-%m", "serie_diaria": "%Y-%m-%d"}
+SEPARADOR = " | "
+# versão das dimensões guardadas por registro; estados de outra versão são recriados do zero
+VERSAO_ESTADO = 2
+
+
+def dimension_columns(df):
+    """Retorna cada dimensão (incluindo o mês e o dia da notícia) como uma coluna categórica.
+
+    A Fonte é praticamente única por registro, então fica como está (só é contada).
+    """
+    colunas = {
+        name: df[column] if name == "golpes_por_fonte" else df[column].astype("category")
+        for name, column in DIMENSOES.items()
+    }
+    # as datas se repetem muito: converte apenas os valores distintos e remapeia os códigos
+    datas = df["Data da notícia"]
+    datas = datas.astype("category") if pd.api.types.is_datetime64_any_dtype(datas) else datas.astype(str).astype("category")
+    datetimes = pd.to_datetime(datas.cat.categories, errors="coerce", format="ISO8601")
+    codigos_data = datas.cat.codes.to_numpy()
+    for name, formato in PERIODOS.items():
+        codigos_periodo, nomes = pd.factorize(datetimes.strftime(formato))
+        codigos = np.where(codigos_data >= 0, codigos_periodo[codigos_data], -1) if len(codigos_periodo) else codigos_data
+        colunas[name] = pd.Series(pd.Categorical.from_codes(codigos, categories=nomes), index=df.index)
+    return colunas
+
+
+def count_series(df):
+    """Contagens de cada dimensão e cruzamento como Series (chave -> casos), só com as chaves presentes."""
+    colunas = dimension_columns(df)
+    counts = {"total_golpes": len(df)}
+    for name in list(DIMENSOES) + list(PERIODOS):
+        serie = colunas[name].value_counts(sort=False)
+        counts[name] = serie[serie.to_numpy() > 0]
+    for name, (primeira, segunda) in CRUZAMENTOS.items():
+        serie = pd.DataFrame({"a": colunas[primeira], "b": colunas[segunda]}).groupby(["a", "b"], observed=True).size()
+        serie = serie[serie.to_numpy() > 0]
+        serie.index = serie.index.get_level_values(0).astype(str) + SEPARADOR + serie.index.get_level_values(1).astype(str)
+        counts[name] = serie
+    return counts
+
+
+def merge_counts(partials):
+    """Soma as contagens de fatias disjuntas do dataset (resultado de count_series de cada uma).
+
+    A soma é associativa, então as fatias podem ser combinadas em qualquer ordem.
+    """
+    merged = {"total_golpes": sum(partial["total_golpes"] for partial in partials)}
+    for name in partials[0]:
+        if name == "total_golpes":
+            continue
+        series = [partial[name].set_axis(partial[name].index.astype(str)) for partial in partials]
+        merged[name] = pd.concat(series).groupby(level=0, sort=True).sum()
+    return merged
+
+
+def counts_to_analysis(counts):
+    """Converte as contagens de count_series/merge_counts para o dicionário de análise."""
+    analysis = {}
+    for name, valor in counts.items():
+        if not isinstance(valor, pd.Series):
+            analysis[name] = valor
+            continue
+        if name in PERIODOS:
+            valor = valor.sort_index()
+        analysis[name] = dict(zip(valor.index.tolist(), valor.to_numpy().tolist()))
+    return analysis
+
+
+def record_dimensions(df):
+    """Retorna um DataFrame com o valor de cada dimensão e cruzamento por registro."""
+    colunas = dimension_columns(df)
+    dims = pd.DataFrame({name: serie.astype(object) for name, serie in colunas.items()}, index=df.index)
+    for name, (primeira, segunda) in CRUZAMENTOS.items():
+        dims[name] = (dims[primeira] + SEPARADOR + dims[segunda]).where(dims[primeira].notna() & dims[segunda].notna())
+    return dims.astype(object).where(dims.notna(), None)
+
+
+def record_rows(df, dims=None):
+    """Linhas (fonte, data, dimensões em JSON) da tabela records do estado."""
+    dims = record_dimensions(df) if dims is None else dims
+    return zip(df["Fonte"], df["Data da notícia"].astype(str), (json.dumps(d) for d in dims.to_dict("records")))
+
+
+class AnalystState:
+    """Contagens por dimensão persistidas em SQLite, com marca d'água dos arquivos já processados.
+
+    Guarda também as dimensões de cada chave (Fonte, Data da notícia) para desfazer a
+    contribuição de registros substituídos (mesma chave reingerida pelo engenheiro).
+    """
+
+    def __init__(self, path=os.path.join("data", "analyst_state.sqlite")):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records (fonte TEXT, data TEXT, dims TEXT, PRIMARY KEY (fonte, data))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counts (dimension TEXT, key TEXT, count INTEGER, PRIMARY KEY (dimension, key))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _meta(self, name):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else None
+
+    def watermark(self):
+        """Número de registros já refletidos nas contagens (None se não há estado)."""
+        return self._meta("rows")
+
+    def sequence(self):
+        """Último arquivo (número de sequência) do dataset do engenheiro já processado."""
+        return self._meta("seq")
+
+    def schema_version(self):
+        """Versão das dimensões com que o estado foi construído (None em estados antigos)."""
+        return self._meta("version")
+
+    def set_sequence(self, seq):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('seq', ?)", (str(seq),))
+
+    def rebuild(self, df):
+        """Recria o estado a partir do histórico completo."""
+        dims = record_dimensions(df)
+        counts = {dimension: dims[dimension].value_counts() for dimension in dims.columns}
+        self._replace(record_rows(df, dims), counts, len(df))
+
+    def rebuild_from(self, analysis, rows):
+        """Recria o estado com as contagens de uma análise já calculada e as linhas de record_rows."""
+        counts = {dimension: valor for dimension, valor in analysis.items() if isinstance(valor, dict)}
+        self._replace(rows, counts, analysis.get("total_golpes", 0))
+
+    def _replace(self, rows, counts, total):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM records")
+            conn.execute("DELETE FROM counts")
+            conn.executemany("INSERT OR REPLACE INTO records (fonte, data, dims) VALUES (?, ?, ?)", rows)
+            for dimension, valores in counts.items():
+                conn.executemany(
+                    "INSERT INTO counts (dimension, key, count) VALUES (?, ?, ?)",
+                    ((dimension, str(key), int(count)) for key, count in valores.items()),
+                )
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('rows', ?)", (str(total),))
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (str(VERSAO_ESTADO),))
+
+    def apply(self, batch_df):
+        """Aplica um lote de novos registros, tratando substituições de chaves já existentes."""
+        batch_df = batch_df.drop_duplicates(subset=CHAVE_DEDUP, keep="last")
+        dims = record_dimensions(batch_df)
+        novos = 0
+        with self._connect() as conn:
+            def bump(dimension, key, delta):
+                if key is None:
+                    return
+                conn.execute(
+                    "INSERT INTO counts (dimension, key, count) VALUES (?, ?, ?) "
+                    "ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count",
+                    (dimension, str(key), delta),
+                )
+
+            for fonte, data, record in zip(batch_df["Fonte"], batch_df["Data da notícia"].astype(str), dims.to_dict("records")):
+                old = conn.execute("SELECT dims FROM records WHERE fonte = ? AND data = ?", (fonte, data)).fetchone()
+                if old:
+                    # registro substituído: remove a contribuição antiga
+                    for dimension, key in json.loads(old[0]).items():
+                        bump(dimension, key, -1)
+                else:
+                    novos += 1
+                for dimension, key in record.items():
+                    bump(dimension, key, 1)
+                conn.execute(
+                    "INSERT OR REPLACE INTO records (fonte, data, dims) VALUES (?, ?, ?)",
+                    (fonte, data, json.dumps(record)),
+                )
+            conn.execute("DELETE FROM counts WHERE count <= 0")
+            conn.execute(
+                "UPDATE meta SET value = CAST(CAST(value AS INTEGER) + ? AS TEXT) WHERE name = 'rows'", (novos,)
+            )
+        self.logger.info(f"Estado da análise atualizado com {len(batch_df)} registros ({novos} novos)")
+        return novos
+
+    def to_analysis(self):
+        """Monta o dicionário de análise a partir das contagens persistidas."""
+        analysis = {"total_golpes": self.watermark() or 0}
+        for dimension in list(DIMENSOES) + list(PERIODOS) + list(CRUZAMENTOS):
+            analysis[dimension] = {}
+        with self._connect() as conn:
+            for dimension, key, count in conn.execute("SELECT dimension, key, count FROM counts ORDER BY rowid"):
+                analysis[dimension][key] = count
+        for dimension in analysis:
+            if dimension in PERIODOS or CRUZAMENTOS.get(dimension, ("",))[0] in PERIODOS:
+                analysis[dimension] = dict(sorted(analysis[dimension].items()))
+        return analysis
@@ -0,0 +1,242 @@
+import time
+import logging
+import threading
+from collections import deque
+from src.utils import setup_logging
+from src.cache import normalize_question
+from src.ratelimit import TokenBucket
+from src.instrumentation import get_metrics
+
+setup_logging()
+
+
+class BrokerError(RuntimeError):
+    """Pergunta recusada pelo broker; a mensagem é exibida ao usuário."""
+
+
+class BrokerBusyError(BrokerError):
+    """A fila de perguntas está cheia."""
+
+
+class SessionThrottledError(BrokerError):
+    """A sessão fez perguntas demais em pouco tempo."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Flight:
+    """Uma chamada ao professor, compartilhada por todas as sessões que fizeram a mesma pergunta.
+
+    Os pedaços da resposta ficam guardados: quem chega depois recebe desde o início e segue
+    acompanhando os novos até o fim.
+    """
+
+    def __init__(self, key, question, analysis):
+        self.key = key
+        self.question = question
+        self.analysis = analysis
+        self.waiters = 1
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.chunks = []
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def stream(self, timeout=None):
+        """Gera os pedaços da resposta; TimeoutError se passar timeout segundos sem nenhum pedaço novo."""
+        lidos = 0
+        while True:
+            with self._cond:
+                if lidos >= len(self.chunks) and not self.done:
+                    if not self._cond.wait_for(lambda: lidos < len(self.chunks) or self.done, timeout):
+                        raise TimeoutError("Tempo de espera da resposta esgotado")
+                novos = self.chunks[lidos:]
+                lidos = len(self.chunks)
+                terminou = self.done
+            yield from novos
+            if terminou:
+                return
+
+
+class Ticket:
+    """Acompanha uma pergunta enviada ao broker (resposta em cache ou chamada em andamento)."""
+
+    def __init__(self, broker, flight=None, cached=None, coalesced=False):
+        self.broker = broker
+        self.flight = flight
+        self.cached = cached
+        self.coalesced = coalesced
+
+    def position(self):
+        """Posição na fila (1 = a próxima a ser atendida); 0 se já está sendo respondida."""
+        return 0 if self.flight is None else self.broker.position(self.flight)
+
+    def stream(self):
+        """Gera a resposta em pedaços, como ProfessorAgent.stream_response."""
+        if self.flight is None:
+            yield self.cached
+            return
+        try:
+            yield from self.flight.stream(self.broker.wait_timeout_seconds)
+        except TimeoutError:
+            yield self.broker.timeout_message
+
+    def result(self):
+        return "".join(self.stream()).strip()
+
+
+class RequestBroker:
+    """Fila única do processo na frente do professor, compartilhada por todas as sessões do app.
+
+    - perguntas iguais (após normalização) em andamento viram uma só chamada (single-flight);
+    - respostas em cache saem na hora, sem passar pela fila nem pelos limites;
+    - as chamadas novas esperam uma ficha do limite global (chamadas ao Gemini por minuto) e
+      são atendidas por `workers` threads;
+    - cada sessão tem o seu próprio limite de perguntas novas por minuto (SessionThrottledError);
+    - a fila tem tamanho máximo: acima dele a pergunta é recusada (BrokerBusyError) em vez de
+      acumular chamadas bloqueadas.
+
+    answer(pergunta, análise) deve gerar os pedaços da resposta; cached(pergunta) retorna a
+    resposta em cache ou None.
+    """
+
+    timeout_message = "A resposta está demorando mais que o normal. Tente novamente em alguns instantes."
+    error_message = "Desculpe, não consegui processar sua pergunta no momento. Tente novamente."
+
+    def __init__(self, answer, cached=None, workers=5, max_queue=20, requests_per_minute=30, burst=5,
+                 session_requests_per_minute=6, session_burst=3, wait_timeout_seconds=120, session_ttl_seconds=3600):
+        self.logger = logging.getLogger(__name__)
+        self._answer = answer
+        self._cached = cached
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.bucket = TokenBucket(requests_per_minute, capacity=burst)
+        self.session_requests_per_minute = session_requests_per_minute
+        self.session_burst = session_burst
+        self.session_ttl_seconds = session_ttl_seconds
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._flights = {}
+        self._sessions = {}
+        self._threads = []
+
+    def submit(self, question, analysis=None, session_id=None):
+        """Envia uma pergunta e retorna o Ticket que acompanha a resposta.
+
+        Levanta BrokerBusyError se a fila está cheia e SessionThrottledError se a sessão passou
+        do seu limite; juntar-se a uma chamada em andamento ou ler do cache nunca é recusado.
+        """
+        key = normalize_question(question)
+        ticket = self._join(key)
+        if ticket is not None:
+            return ticket
+
+        cached = self._cached(question) if self._cached is not None else None
+        if cached is not None:
+            get_metrics().incr("broker_requests_total", outcome="cached")
+            return Ticket(self, cached=cached)
+
+        with self._cond:
+            # outra sessão pode ter criado a chamada enquanto o cache era consultado
+            ticket = self._join(key)
+            if ticket is not None:
+                return ticket
+            if len(self._pending) >= self.max_queue:
+                get_metrics().incr("broker_requests_total", outcome="rejected")
+                self.logger.warning(f"Fila do broker cheia ({len(self._pending)} perguntas), recusando: {question}")
+                raise BrokerBusyError(
+                    "O Guardião está recebendo muitas perguntas agora. Aguarde alguns segundos e tente novamente."
+                )
+            self._throttle(session_id)
+            flight = Flight(key, question, analysis)
+            self._flights[key] = flight
+            self._pending.append(flight)
+            self._start_workers()
+            self._cond.notify()
+        get_metrics().incr("broker_requests_total", outcome="queued")
+        return Ticket(self, flight)
+
+    def _join(self, key):
+        with self._cond:
+            flight = self._flights.get(key)
+            if flight is None:
+                return None
+            flight.waiters += 1
+        get_metrics().incr("broker_requests_total", outcome="coalesced")
+        self.logger.info(f"Pergunta já em andamento, aguardando a mesma resposta: {flight.question}")
+        return Ticket(self, flight, coalesced=True)
+
+    def _throttle(self, session_id):
+        """Consome uma ficha da sessão (chamado com o lock do broker)."""
+        if session_id is None:
+            return
+        agora = time.monotonic()
+        # sessões paradas há mais de session_ttl_seconds são esquecidas
+        for antiga in [s for s, (_, visto) in self._sessions.items() if agora - visto > self.session_ttl_seconds]:
+            del self._sessions[antiga]
+        bucket = self._sessions.get(session_id, (None, None))[0]
+        if bucket is None:
+            bucket = TokenBucket(self.session_requests_per_minute, capacity=self.session_burst)
+        self._sessions[session_id] = (bucket, agora)
+        if not bucket.try_acquire():
+            espera = bucket.wait_time()
+            get_metrics().incr("broker_requests_total", outcome="throttled")
+            raise SessionThrottledError(
+                f"Você fez muitas perguntas seguidas. Aguarde {max(1, round(espera))} segundos para perguntar de novo.",
+                espera,
+            )
+
+    def _start_workers(self):
+        # as threads só são criadas na primeira pergunta que vai para a fila
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"broker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                flight = self._pending.popleft()
+            # a chamada espera a vez no limite global; enquanto isso a fila continua limitada
+            self.bucket.acquire()
+            flight.started_at = time.monotonic()
+            get_metrics().observe("broker.queue_wait", flight.started_at - flight.created_at)
+            try:
+                for chunk in self._answer(flight.question, flight.analysis):
+                    flight.publish(chunk)
+            except Exception as e:
+                self.logger.error(f"Erro ao responder a pergunta '{flight.question}': {e}")
+                flight.publish(self.error_message)
+            finally:
+                with self._cond:
+                    self._flights.pop(flight.key, None)
+                flight.finish()
+                if flight.waiters > 1:
+                    self.logger.info(f"Uma chamada atendeu {flight.waiters} pedidos da pergunta: {flight.question}")
+
+    def position(self, flight):
+        with self._cond:
+            try:
+                return self._pending.index(flight) + 1
+            except ValueError:
+                return 0
+
+    def status(self):
+        """Carga atual: perguntas na fila, em andamento e o tamanho máximo da fila."""
+        with self._cond:
+            fila = len(self._pending)
+            return {"queued": fila, "running": len(self._flights) - fila, "max_queue": self.max_queue}
@@ -0,0 +1,203 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+from src.instrumentation import get_metrics
+from src.storage import EngineerDataset, SQLiteEngineerStore
+
+# cache dos hashes por (caminho, mtime, tamanho) para não reler arquivos inalterados
+_hash_cache = {}
+# bancos SQLite do engenheiro abertos pelo cálculo da versão, por caminho
+_sqlite_stores = {}
+
+
+def normalize_question(question):
+    """Normaliza a pergunta: casefold, sem acentos e com espaços colapsados."""
+    text = unicodedata.normalize("NFKD", str(question).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def file_hash(path):
+    """Retorna o hash SHA-256 do conteúdo de um arquivo (ou "" se não existir)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ""
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+    if signature not in _hash_cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _hash_cache[signature] = digest.hexdigest()
+    return _hash_cache[signature]
+
+
+def sqlite_version(path):
+    """Versão de um banco do engenheiro pela sua maior sequência (ou "" se não existir).
+
+    Toda escrita no banco (inclusive substituição) grava uma sequência nova, então a consulta
+    ao índice de seq substitui o hash do arquivo inteiro, que mudaria a cada lote gravado.
+    """
+    if not os.path.exists(path):
+        return ""
+    store = _sqlite_stores.get(path)
+    if store is None:
+        data_dir, filename = os.path.split(path)
+        store = _sqlite_stores[path] = SQLiteEngineerStore(data_dir, os.path.splitext(filename)[0])
+    return f"seq={store.max_seq()}"
+
+
+def dataset_version(data_dir, name):
+    """Versão do dataset Parquet do engenheiro pela assinatura dos arquivos (nome, mtime e tamanho).
+
+    Cada lote gravado é um arquivo novo, então a assinatura muda a cada ingestão sem que os
+    arquivos do histórico sejam lidos: o custo é um stat por arquivo.
+    """
+    assinatura = EngineerDataset(data_dir, name).signature()
+    return repr([(os.path.relpath(path, data_dir), mtime, tamanho) for path, mtime, tamanho in assinatura])
+
+
+def data_version(data_dir="data", filenames=("engineer_data", "engineer_data.sqlite", "analyst_data.parquet")):
+    """Calcula a versão dos dados: hash dos arquivos Parquet avulsos (ex.: analyst_data.parquet).
+
+    Nomes sem extensão são datasets Parquet do engenheiro e entram pela assinatura
+    (dataset_version); bancos SQLite entram pela sequência (sqlite_version). Nenhum dos dois
+    é lido por inteiro.
+    """
+    digest = hashlib.sha256()
+    for filename in filenames:
+        path = os.path.join(data_dir, filename)
+        digest.update(filename.encode())
+        if filename.endswith(".sqlite"):
+            digest.update(sqlite_version(path).encode())
+        elif not os.path.splitext(filename)[1]:
+            digest.update(dataset_version(data_dir, filename).encode())
+        else:
+            digest.update(file_hash(path).encode())
+    return digest.hexdigest()[:16]
+
+
+class ResponseCache:
+    """Cache persistente (SQLite) de respostas do professor, com TTL e despejo LRU."""
+
+    def __init__(self, path=os.path.join("data", "response_cache.sqlite"), ttl_seconds=86400, max_entries=500):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(question, version):
+        """Gera a chave do cache a partir da pergunta normalizada e da versão dos dados."""
+        return hashlib.sha256(f"{normalize_question(question)}|{version}".encode()).hexdigest()
+
+    def get(self, question, version):
+        """Retorna a resposta em cache ou None se ausente/expirada."""
+        response = self._lookup(question, version)
+        get_metrics().record_cache(response is not None, cache="response")
+        return response
+
+    def _lookup(self, question, version):
+        key = self.make_key(question, version)
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                response, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return response
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao ler cache de respostas: {e}")
+            self.misses += 1
+            return None
+
+    def entries(self, version):
+        """Lista (pergunta normalizada, resposta) das entradas válidas para a versão dos dados."""
+        try:
+            with self._lock, self._connect() as conn:
+                query = "SELECT question, response FROM responses WHERE version = ?"
+                params = [version]
+                if self.ttl_seconds:
+                    query += " AND created_at >= ?"
+                    params.append(time.time() - self.ttl_seconds)
+                return conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao listar cache de respostas: {e}")
+            return []
+
+    def set(self, question, version, response):
+        """Armazena uma resposta e despeja as entradas menos usadas além do limite."""
+        key = self.make_key(question, version)
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, question, version, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, normalize_question(question), version, response, now, now),
+                )
+                if self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key NOT IN "
+                        "(SELECT key FROM responses ORDER BY last_access DESC LIMIT ?)",
+                        (self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao gravar cache de respostas: {e}")
+
+    def stats(self):
+        """Retorna contadores de acertos/erros e o número de entradas."""
+        try:
+            with self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
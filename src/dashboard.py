@@ -0,0 +1,190 @@
+import os
+import json
+import glob
+import logging
+import threading
+import pandas as pd
+from src.cache import data_version
+from src.datastore import get_datastore
+from src.metrics import dimension_frame
+from src.timeseries import series_frame, latest_spikes
+
+# tema dos gráficos do painel
+TEMA = {"paper_bgcolor": "#252525", "plot_bgcolor": "#252525", "font_color": "#e9e9e9"}
+
+# painéis: nome -> (dimensão das métricas, colunas renomeadas, tipo do gráfico, título)
+PAINEIS = {
+    "tipos": ("golpes_por_tipo", {"key": "Tipo", "count": "Contagem"}, "bar", "Distribuição por Tipo de Golpe"),
+    "canais": ("golpes_por_canal", {"key": "Canal", "count": "Contagem"}, "bar", "Distribuição por Canal"),
+    "publicos": ("golpes_por_publico", {"key": "Público", "count": "Contagem"}, "pie", "Distribuição por Público Alvo"),
+    "tipo_canal": (
+        "golpes_por_tipo_canal",
+        {"key": "Tipo", "subkey": "Canal", "count": "Contagem"},
+        "heatmap",
+        "Golpes por Tipo e Canal",
+    ),
+}
+# painéis de tendência: nome -> (frequência, série, título), lidos do timeseries.parquet
+PAINEIS_TENDENCIA = {
+    "tendencia_total": ("D", "total", "Notícias por Dia (média móvel)"),
+    "tendencia_tipos": ("W", "tipo", "Tendência Semanal por Tipo de Golpe"),
+}
+MAX_LINHAS_TENDENCIA = 8  # tipos mais frequentes exibidos no gráfico de tendência
+
+
+def build_aggregates(metrics, timeseries=None):
+    """Tabelas prontas para os gráficos, uma por painel, a partir das métricas e das séries."""
+    aggregates = {}
+    for nome, (dimension, colunas, _, _) in PAINEIS.items():
+        df = dimension_frame(metrics, dimension).rename(columns=colunas)
+        aggregates[nome] = df[list(colunas.values())]
+    if timeseries is not None:
+        for nome, (frequency, series, _) in PAINEIS_TENDENCIA.items():
+            df = series_frame(timeseries, frequency, series)
+            if not df.empty:
+                totais = df.groupby("key")["count"].sum().nlargest(MAX_LINHAS_TENDENCIA)
+                df = df[df["key"].isin(totais.index)]
+            df = df.assign(period=pd.to_datetime(df["period"]).dt.strftime("%Y-%m-%d"))
+            aggregates[nome] = df.rename(columns={
+                "period": "Período", "key": "Chave", "count": "Contagem", "rolling_mean": "Média móvel",
+            })[["Período", "Chave", "Contagem", "Média móvel"]]
+    return aggregates
+
+
+def build_figure(nome, df):
+    """Cria a figura do plotly de um painel (o plotly só é importado aqui)."""
+    import plotly.express as px
+
+    if nome in PAINEIS_TENDENCIA:
+        _, series, titulo = PAINEIS_TENDENCIA[nome]
+        # a série total mostra a média móvel (o dia a dia é ruidoso); as por tipo, a contagem
+        y = "Média móvel" if series == "total" else "Contagem"
+        fig = px.line(df, x="Período", y=y, color="Chave", title=titulo,
+                      color_discrete_sequence=["#e48f4f", "#f5b041", "#e67e22", "#c0392b", "#f8c471"])
+        fig.update_layout(**TEMA)
+        return fig
+
+    _, _, tipo, titulo = PAINEIS[nome]
+    colunas = list(df.columns)
+    if tipo == "bar":
+        fig = px.bar(df, x=colunas[0], y="Contagem", title=titulo, color_discrete_sequence=["#e48f4f"])
+    elif tipo == "pie":
+        fig = px.pie(df, names=colunas[0], values="Contagem", title=titulo,
+                     color_discrete_sequence=["#e48f4f", "#f5b041", "#e67e22"])
+    else:
+        fig = px.density_heatmap(df, x="Canal", y="Tipo", z="Contagem", title=titulo,
+                                 color_continuous_scale=["#252525", "#e48f4f"])
+    fig.update_layout(**TEMA)
+    return fig
+
+
+class DashboardCache:
+    """Agregados e figuras do painel calculados uma vez por versão dos dados.
+
+    A versão é a impressão digital do analyst_data.parquet e do timeseries.parquet: quando a pipeline
+    grava novas métricas, a versão muda e o painel é recalculado na próxima leitura. O resultado fica em memória e em
+    data/dashboard/<versão>.json, para ser reaproveitado por outros processos e após reinícios.
+    """
+
+    def __init__(self, data_dir="data", cache_dir=None, keep_versions=3):
+        self.logger = logging.getLogger(__name__)
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir or os.path.join(data_dir, "dashboard")
+        self.keep_versions = keep_versions
+        self.store = get_datastore(data_dir)
+        self._current = (None, None)
+        self._lock = threading.Lock()
+
+    def version(self):
+        return data_version(self.data_dir, filenames=("analyst_data.parquet", "timeseries.parquet"))
+
+    def _path(self, version):
+        return os.path.join(self.cache_dir, f"{version}.json")
+
+    def get(self, require_figures=False):
+        """Retorna {"version", "total", "tables", "figures", "spikes"} da versão atual dos dados.
+
+        Com require_figures, um cache gravado sem as figuras (por um processo sem plotly) é completado.
+        """
+        version = self.version()
+        with self._lock:
+            if self._current[0] == version:
+                return self._current[1]
+            payload = self._load(version)
+            faltando = payload is not None and require_figures and any(
+                tabela and nome not in payload["figures"] for nome, tabela in payload["tables"].items()
+            )
+            if payload is None or faltando:
+                payload = self.build(version)
+            self._current = (version, payload)
+            return payload
+
+    def _load(self, version):
+        try:
+            with open(self._path(version), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Erro ao ler o cache do painel {self._path(version)}: {e}")
+            return None
+
+    def build(self, version=None):
+        """Calcula os agregados e as figuras (em JSON) e grava o resultado no disco."""
+        version = version or self.version()
+        metrics = self.store.get_metrics()
+        analysis = self.store.get_analysis()
+        timeseries = self.store.get_timeseries()
+        payload = {"version": version, "total": analysis.get("total_golpes", 0), "tables": {}, "figures": {}}
+        # tipos em pico na última semana (escore acima do limiar das séries)
+        picos = latest_spikes(timeseries, "W", "tipo")
+        payload["spikes"] = [
+            {"tipo": key, "casos": int(count), "escore": round(float(score), 2)}
+            for key, count, score in zip(picos.get("key", []), picos.get("count", []), picos.get("spike_score", []))
+        ]
+        for nome, df in build_aggregates(metrics, timeseries).items():
+            payload["tables"][nome] = df.to_dict("records")
+            if df.empty:
+                continue
+            try:
+                payload["figures"][nome] = json.loads(build_figure(nome, df).to_json())
+            except ImportError:
+                # sem plotly (ex.: processo do agendador) ficam só as tabelas; as figuras saem no app
+                pass
+        if not analysis:
+            # sem dados ainda: não vale a pena guardar
+            return payload
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(version)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._prune(keep=path)
+            self.logger.info(f"Painel pré-calculado para a versão {version} dos dados")
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar o cache do painel: {e}")
+        return payload
+
+    def _prune(self, keep):
+        antigos = sorted(glob.glob(os.path.join(self.cache_dir, "*.json")), key=os.path.getmtime, reverse=True)
+        for path in antigos[self.keep_versions:]:
+            if path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_dashboard_cache(data_dir="data"):
+    """Retorna o cache do painel compartilhado para o diretório informado."""
+    with _caches_lock:
+        if data_dir not in _caches:
+            _caches[data_dir] = DashboardCache(data_dir)
+        return _caches[data_dir]
@@ -0,0 +1,147 @@
+import os
+import logging
+import threading
+import pandas as pd
+from src.utils import setup_logging
+from src.metrics import analysis_to_metrics, metrics_to_analysis, legacy_analysis
+from src.storage import open_engineer_storage
+
+setup_logging()
+
+
+class DataStore:
+    """Mantém os DataFrames decodificados em memória e só relê quando o arquivo muda."""
+
+    def __init__(self, data_dir="data", backend=None):
+        self.logger = logging.getLogger(__name__)
+        self.data_dir = data_dir
+        self._lock = threading.RLock()
+        self._frames = {}
+        self._analysis = (None, {})
+        # dataset Parquet particionado ou banco SQLite, conforme storage.backend
+        self.engineer_dataset = open_engineer_storage(data_dir, backend)
+
+    def _signature(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read(self, filename):
+        """Retorna o DataFrame do arquivo (compartilhado, não deve ser modificado)."""
+        path = os.path.join(self.data_dir, filename)
+        with self._lock:
+            signature = self._signature(path)
+            cached = self._frames.get(filename)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            if signature is None:
+                self.logger.warning(f"Arquivo Parquet {path} não encontrado")
+                df = pd.DataFrame()
+            else:
+                try:
+                    df = pd.read_parquet(path, engine="pyarrow")
+                    self.logger.info(f"Lido {len(df)} registros de {path}")
+                except Exception as e:
+                    self.logger.error(f"Erro ao ler arquivo Parquet {path}: {e}")
+                    return pd.DataFrame()
+            self._frames[filename] = (signature, df)
+            return df
+
+    def get_engineer_df(self, columns=None):
+        """Retorna os dados do agente engenheiro (já deduplicados), do backend configurado.
+
+        Com columns, só essas colunas são lidas (ou recortadas do DataFrame completo, se já em memória).
+        """
+        with self._lock:
+            signature = self.engineer_dataset.signature()
+            cached = self._frames.get("engineer_data")
+            if cached is not None and cached[0] == signature:
+                return cached[1] if columns is None or cached[1].empty else cached[1][list(columns)]
+            key = "engineer_data" if columns is None else ("engineer_data", tuple(columns))
+            cached = self._frames.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            try:
+                df = self.engineer_dataset.read(columns=columns)
+                self.logger.info(f"Lido {len(df)} registros de {self.engineer_dataset.root}")
+            except Exception as e:
+                self.logger.error(f"Erro ao ler o dataset {self.engineer_dataset.root}: {e}")
+                return pd.DataFrame()
+            # a leitura pode ter migrado o arquivo antigo, então a assinatura é recalculada
+            self._frames[key] = (self.engineer_dataset.signature(), df)
+            return df
+
+    def count_records(self, by=None, **filters):
+        """Conta registros do engenheiro com filtros e agrupamentos executados no backend.
+
+        Ex.: count_records(tipo="Golpe do Pix", publico="Idosos", date_from="2025-03-01",
+        date_to="2025-03-31"); com o SQLite, nada além do resultado é carregado na memória.
+        """
+        return self.engineer_dataset.count(by=by, **filters)
+
+    def select_records(self, columns=None, limit=None, **filters):
+        """Registros do engenheiro filtrados no backend, sem carregar o dataset inteiro.
+
+        No Parquet, só os grupos de linhas que podem conter o filtro são lidos; no SQLite, a
+        consulta usa os índices. Ex.: select_records(["Fonte", "Tipo do golpe"], limit=5, tipo="Phishing").
+        """
+        try:
+            return self.engineer_dataset.select(columns=columns, limit=limit, **filters)
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar o dataset {self.engineer_dataset.root}: {e}")
+            return pd.DataFrame()
+
+    def get_metrics(self):
+        """Retorna a tabela tipada de métricas do analista (dimension/key/subkey/period/count)."""
+        df = self.read("analyst_data.parquet")
+        if "Categoria" in df.columns:
+            # arquivo no formato antigo, gerado antes da tabela tipada
+            return analysis_to_metrics(legacy_analysis(df))
+        return df
+
+    def get_timeseries(self):
+        """Retorna as séries temporais pré-calculadas (frequency/series/key/period/count/...)."""
+        return self.read("timeseries.parquet")
+
+    def get_analysis(self):
+        """Retorna o dicionário de análise, reconstruído apenas quando o arquivo muda."""
+        with self._lock:
+            df = self.read("analyst_data.parquet")
+            if self._analysis[0] is df:
+                return self._analysis[1]
+            if df.empty:
+                analysis = {}
+            elif "Categoria" in df.columns:
+                analysis = legacy_analysis(df)
+            elif "dimension" in df.columns:
+                analysis = metrics_to_analysis(df)
+            else:
+                self.logger.warning("Arquivo analyst_data.parquet não contém as colunas esperadas")
+                analysis = {}
+            self._analysis = (df, analysis)
+            return analysis
+
+    def invalidate(self, filename=None):
+        """Descarta o cache de um arquivo (ou de todos)."""
+        with self._lock:
+            if filename is None:
+                self._frames.clear()
+                self._analysis = (None, {})
+            else:
+                for key in [k for k in self._frames if k == filename or (isinstance(k, tuple) and k[0] == filename)]:
+                    self._frames.pop(key)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_datastore(data_dir="data"):
+    """Retorna a instância compartilhada do DataStore para o diretório informado."""
+    with _stores_lock:
+        if data_dir not in _stores:
+            _stores[data_dir] = DataStore(data_dir)
+        return _stores[data_dir]
@@ -0,0 +1,156 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# campos que definem o conteúdo de um registro: mudou algum, a nova versão substitui a gravada
+CAMPOS_CONTEUDO = [
+    "Tipo do golpe", "Descrição breve do golpe", "Canal utilizado", "Público alvo", "Estimativa de impacto ou prejuízo",
+]
+# parâmetros de rastreamento que não mudam o conteúdo da página
+_RASTREAMENTO = re.compile(r"^(utm_.*|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|ref|ref_src|cmpid|__twitter_impression)$", re.I)
+
+
+def normalize_url(url):
+    """Normaliza a URL da fonte: sem citações [n], esquema, www, barra final, fragmento e rastreamento."""
+    url = re.sub(r"\[\d+\]", "", str(url or "")).strip()
+    if not url:
+        return ""
+    parts = urlsplit(url if "://" in url else f"//{url}")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"/+$", "", parts.path)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _RASTREAMENTO.match(k)))
+    return urlunsplit(("", host, path, query, "")).lstrip("/")
+
+
+def fingerprint(fonte, data):
+    """Impressão digital de um registro: URL normalizada + data da notícia."""
+    return hashlib.sha1(f"{normalize_url(fonte)}|{str(data).strip()[:10]}".encode()).hexdigest()
+
+
+def _texto(valor):
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return ""
+    return str(valor).strip()
+
+
+def content_hash(record):
+    """Hash dos campos de conteúdo do registro (CAMPOS_CONTEUDO)."""
+    return hashlib.sha1("|".join(_texto(record.get(campo)) for campo in CAMPOS_CONTEUDO).encode()).hexdigest()
+
+
+def dataset_identity(dataset):
+    """Identidade do armazenamento do engenheiro: hash da assinatura (arquivos, mtime e tamanho, ou a sequência do SQLite)."""
+    return hashlib.sha1(repr(dataset.signature()).encode()).hexdigest()
+
+
+class DedupIndex:
+    """Índice persistente (SQLite) das impressões digitais já gravadas, para deduplicar na ingestão.
+
+    Cada impressão guarda também o hash do conteúdo do registro: um registro que reaparece igual
+    é duplicado, mas um que reaparece com outro conteúdo é aceito como substituição (com a Fonte
+    gravada, para ter a mesma chave no dataset), como o keep="last" da leitura. O índice guarda a
+    identidade do dataset contra a qual foi construído (dataset_version).
+    """
+
+    def __init__(self, path=os.path.join("data", "dedup_index.sqlite")):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints "
+                "(fp TEXT PRIMARY KEY, fonte TEXT, data TEXT, first_seen REAL, content TEXT)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(fingerprints)")}
+            if "content" not in colunas:
+                # índice gravado antes do hash do conteúdo
+                conn.execute("ALTER TABLE fingerprints ADD COLUMN content TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def dataset_version(self):
+        """Identidade do dataset (dataset_identity) com que o índice está sincronizado, ou None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE name = 'dataset_version'").fetchone()
+        return row[0] if row else None
+
+    def set_dataset_version(self, version):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dataset_version', ?)", (version,))
+
+    def split(self, records):
+        """Separa os registros em (aceitos, duplicados) sem alterar o índice.
+
+        Um registro já gravado com o mesmo conteúdo é duplicado; com conteúdo diferente, é aceito
+        como substituição. Dentro do lote, vale a última versão de cada impressão.
+        """
+        aceitos, duplicados, vistos, substituidos = [], [], {}, 0
+        with self._connect() as conn:
+            for record in records:
+                fp = fingerprint(record.get("Fonte", ""), record.get("Data da notícia", ""))
+                conteudo = content_hash(record)
+                if fp in vistos:
+                    posicao, anterior = vistos[fp]
+                    if conteudo == anterior:
+                        duplicados.append(record)
+                    else:
+                        # a versão mais recente do lote fica no lugar da anterior, com a mesma Fonte
+                        duplicados.append(aceitos[posicao])
+                        aceitos[posicao] = {**record, "Fonte": aceitos[posicao]["Fonte"]}
+                        vistos[fp] = (posicao, conteudo)
+                    continue
+                gravado = conn.execute("SELECT fonte, content FROM fingerprints WHERE fp = ?", (fp,)).fetchone()
+                if gravado is not None and gravado[1] in (None, conteudo):
+                    duplicados.append(record)
+                    continue
+                if gravado is not None:
+                    substituidos += 1
+                    record = {**record, "Fonte": gravado[0]}
+                vistos[fp] = (len(aceitos), conteudo)
+                aceitos.append(record)
+        if substituidos:
+            self.logger.info(f"{substituidos} registros já gravados chegaram com outro conteúdo e serão substituídos")
+        return aceitos, duplicados
+
+    def add(self, records):
+        """Registra no índice os registros gravados."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO fingerprints (fp, fonte, data, first_seen, content) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(fp) DO UPDATE SET content = excluded.content",
+                (
+                    (
+                        fingerprint(r.get("Fonte", ""), r.get("Data da notícia", "")),
+                        r.get("Fonte", ""), str(r.get("Data da notícia", "")), now, content_hash(r),
+                    )
+                    for r in records
+                ),
+            )
+
+    def rebuild(self, df):
+        """Recria o índice a partir dos registros já armazenados."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fingerprints")
+        if not df.empty:
+            self.add(df[["Fonte", "Data da notícia", *[c for c in CAMPOS_CONTEUDO if c in df.columns]]].to_dict("records"))
+        self.logger.info(f"Índice de deduplicação recriado com {len(df)} registros")
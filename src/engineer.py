@@ -1,39 +1,124 @@
 import os
-import re
-import json
 import logging
-import datetime
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-import google.generativeai as genai
 from dotenv import load_dotenv
-from src.utils import setup_logging, load_config
+from src.utils import setup_logging, load_config, create_gemini_model
+from src.datastore import get_datastore
+from src.dedup import DedupIndex, dataset_identity
+from src.ratelimit import TokenBucket
+from src.instrumentation import get_metrics, timed
+from src.parsing import JSONObjectStream, RecordValidator
+from src.records import TIPOS_GOLPE, CANAIS, PUBLICOS
 
 load_dotenv()
 setup_logging()
 
+# vocabulários usados no prompt e na padronização dos registros
+FONTES = ["G1", "UOL", "TecMundo", "Polícia Federal", "Febraban", "Reclame Aqui"]
+MESES = [f"2025-{mes:02d}" for mes in range(1, 13)]
+
+# dimensões para dividir a ingestão em lote: (valores, modelo do texto de foco)
+FOCOS = {
+    "tipo": (TIPOS_GOLPE, 'Busque apenas golpes do tipo "{}".'),
+    "canal": (CANAIS, 'Busque apenas golpes aplicados pelo canal "{}".'),
+    "publico": (PUBLICOS, 'Busque apenas golpes direcionados ao público "{}".'),
+    "mes": (MESES, "Busque apenas notícias publicadas no mês {} (YYYY-MM)."),
+    "fonte": (FONTES, "Busque apenas notícias publicadas por {}."),
+}
+
+class RecordSink:
+    """Recebe os registros validados à medida que chegam e os grava em lotes de flush_every.
+
+    As gravações são serializadas, então várias buscas paralelas podem alimentar o mesmo destino
+    sem que o índice de deduplicação aceite o mesmo registro duas vezes.
+    """
+
+    def __init__(self, writer, flush_every=200):
+        self.writer = writer
+        self.flush_every = flush_every
+        self.records = []
+        self.stats = {"accepted": 0, "duplicates": 0}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+            self._buffer.append(record)
+            if len(self._buffer) < self.flush_every:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def _write(self, batch):
+        with self._write_lock:
+            stats = self.writer(batch)
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] += stats.get(key, 0)
+
+    def close(self):
+        """Grava o que sobrou no buffer."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
 class EngineerAgent:
-    def __init__(self):
+    def __init__(self, model=None):
         self.config = load_config()
         self.logger = logging.getLogger(__name__)
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.store = get_datastore(self.data_dir)
+        self.compact_threshold = self.config.get("storage", {}).get("compact_threshold", 20)
+        self.dedup_index = DedupIndex(os.path.join(self.data_dir, "dedup_index.sqlite"))
+        self.last_run_stats = {"accepted": 0, "duplicates": 0}
+
+        engineer_config = self.config.get("engineer", {})
+        self.bulk = engineer_config.get("bulk", False)
+        self.split_by = engineer_config.get("split_by", ["tipo"])
+        self.max_workers = engineer_config.get("max_workers", 4)
+        self.requests_per_minute = engineer_config.get("requests_per_minute", 30)
+        self.max_results_per_query = engineer_config.get("max_results_per_query", 20)
+        self.flush_every = engineer_config.get("flush_every", 200)
+        self.validator = RecordValidator(
+            {"Tipo do golpe": TIPOS_GOLPE, "Canal utilizado": CANAIS, "Público alvo": PUBLICOS},
+            fuzzy_cutoff=engineer_config.get("fuzzy_cutoff", 0.8),
+        )
 
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            self.logger.error("GEMINI_API_KEY não encontrada no .env")
-            raise ValueError("GEMINI_API_KEY não configurada")
+        # com o modelo do Gemini, a parte fixa do prompt vai como system instruction
+        self.system_instruction = model is None and self.config.get("prompts", {}).get("system_instruction", True)
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(model_name="gemini-2.0-flash")
+        if model is not None:
+            # modelo injetado (ex.: modelo falso local para testes)
+            self.model = model
+        else:
+            self.api_key = os.getenv("GEMINI_API_KEY")
+            if not self.api_key:
+                self.logger.error("GEMINI_API_KEY não encontrada no .env")
+                raise ValueError("GEMINI_API_KEY não configurada")
 
-    def criar_prompt_agente(self):
-        return """
-Você é um engenheiro de dados especializado em golpes financeiros. Sua tarefa é buscar informações reais e recentes (de 2025) sobre golpes financeiros ocorridos no Brasil, usando fontes confiáveis como G1, UOL, TecMundo, Polícia Federal, Febraban, Reclame Aqui.
+            self.model = create_gemini_model(
+                self.api_key, system_instruction=self.criar_prompt_agente() if self.system_instruction else None
+            )
 
+    def criar_prompt_agente(self, foco=None, max_results=None):
+        """Monta o prompt do engenheiro; foco restringe a busca (ex.: um tipo de golpe ou mês)."""
+        opcoes = lambda valores: "\n".join(f"  - {valor}" for valor in valores)
+        foco_texto = f"\n**Foco desta busca:** {foco}\n" if foco else ""
+        limite_texto = f"- Retorne no máximo {max_results} itens, sem repetir notícias.\n" if max_results else ""
+        return f"""
+Você é um engenheiro de dados especializado em golpes financeiros. Sua tarefa é buscar informações reais e recentes (de 2025) sobre golpes financeiros ocorridos no Brasil, usando fontes confiáveis como {", ".join(FONTES)}.
+{foco_texto}
 Retorne SOMENTE uma lista JSON válida com os seguintes campos, sem qualquer texto adicional fora dos colchetes:
 
 [
-  {
+  {{
     "Fonte": "https://...",
     "Data da notícia": "2025-MM-DD",
     "Tipo do golpe": "<escolha uma das opções abaixo>",
@@ -41,135 +126,186 @@ Retorne SOMENTE uma lista JSON válida com os seguintes campos, sem qualquer tex
     "Canal utilizado": "<escolha uma das opções abaixo>",
     "Público alvo": "<escolha uma das opções abaixo>",
     "Estimativa de impacto ou prejuízo": "<estimativa ou 'Não informado'>"
-  },
+  }},
   ...
 ]
 
 **Instruções para padronização:**
 - Para "Tipo do golpe", escolha EXATAMENTE uma das seguintes opções com base na descrição do golpe:
-  - Golpe do Pix
-  - Phishing
-  - Golpe do Suporte Técnico
-  - Falso Investimento
-  - Clonagem de WhatsApp
-  - Falso Empréstimo
-  - Falso Comprovante de Pagamento
-  - Perfil Falso
-  - Deepfake / IA
-  - Site Falso / Link Malicioso
-  - Golpe do Cartão
-  - Golpe com Número Falso
-  - Falso Bolsa Família
-  - Golpe do Auxílio
-  - Compra Falsa
+{opcoes(TIPOS_GOLPE)}
 
 - Para "Canal utilizado", escolha EXATAMENTE uma das seguintes opções com base no método do golpe:
-  - WhatsApp
-  - SMS / Mensagens
-  - E-mail
-  - Telefone
-  - PIX
-  - Cartão de Crédito / Débito
-  - Boletos
-  - Redes Sociais
-  - E-commerce / Plataformas Online
-  - Máquina de Cartão
-  - Manipulação de DNS
-  - IA / Deepfake
-  - Internet
+{opcoes(CANAIS)}
 
 - Para "Público alvo", escolha EXATAMENTE uma das seguintes opções com base nas vítimas:
-  - Idosos
-  - Jovens
-  - Usuários do Pix
-  - Usuários do WhatsApp
-  - Usuários de Internet
-  - Investidores
-  - Comerciantes
-  - Clientes Bancários
-  - População em Geral
-  - Consumidores
-  - Instituições Financeiras
-  - Empresas
-  - Foliões
+{opcoes(PUBLICOS)}
 
 - "Estimativa de impacto ou prejuízo" deve ser um valor estimado (ex.: "Mais de 100 mil reais") ou "Não informado" se desconhecido.
 - Certifique-se de que a "Data da notícia" esteja no formato "YYYY-MM-DD" e corresponda a 2025.
-- Se não encontrar dados reais, retorne uma lista vazia [].
+{limite_texto}- Se não encontrar dados reais, retorne uma lista vazia [].
 - A saída deve ser JSON válido, contendo apenas os campos especificados, sem explicações ou mensagens adicionais.
 """
 
-    def search_fraud_data(self, query="Golpes financeiros Brasil 2025", max_results=10):
-        try:
-            prompt = self.criar_prompt_agente()
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+    def prompt_da_busca(self, foco=None, max_results=None):
+        """Prompt enviado em cada busca: só o foco e o limite quando o resto está na system instruction."""
+        if not self.system_instruction:
+            return self.criar_prompt_agente(foco=foco, max_results=max_results)
+        partes = ["Busque agora golpes financeiros seguindo as instruções."]
+        if foco:
+            partes.append(f"**Foco desta busca:** {foco}")
+        if max_results:
+            partes.append(f"Retorne no máximo {max_results} itens, sem repetir notícias.")
+        return "\n".join(partes)
 
-            # Log da resposta bruta para depuração
-            self.logger.debug(f"Resposta do Gemini: {response_text}")
+    def build_queries(self, split_by=("tipo",)):
+        """Gera um foco de busca para cada combinação das dimensões informadas (tipo, canal, publico, mes, fonte)."""
+        focos = []
+        for dimensao in split_by:
+            if dimensao not in FOCOS:
+                raise ValueError(f"Dimensão de divisão desconhecida: {dimensao}")
+            valores, modelo = FOCOS[dimensao]
+            focos.append([modelo.format(valor) for valor in valores])
+        return [" ".join(combinacao) for combinacao in itertools.product(*focos)]
+
+    def iter_fraud_records(self, query=None, max_results=10):
+        """Busca com o Gemini em streaming e produz cada registro válido assim que ele chega completo.
 
-            # Extrair JSON da resposta
-            match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if match:
-                json_text = match.group(0)
+        Registros malformados ou fora do esquema são descartados individualmente, sem perder o lote.
+        """
+        prompt = self.prompt_da_busca(foco=query, max_results=max_results if query else None)
+        parser = JSONObjectStream()
+        response = None
+        parts = []
+        entregues = 0
+        rejeitados = 0
+        try:
+            response = self.model.generate_content(prompt, stream=True)
+            for chunk in response:
                 try:
-                    results = json.loads(json_text)
-                    if not isinstance(results, list):
-                        self.logger.warning("Resposta não é uma lista JSON")
-                        return []
-                    self.logger.info(f"{len(results)} resultados reais extraídos com Gemini")
-                    return results[:max_results]
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"Erro ao parsear JSON: {e}")
-                    return []
-            else:
-                self.logger.warning("Nenhum JSON válido encontrado na resposta do Gemini")
-                return []
+                    text = chunk.text
+                except (AttributeError, ValueError):
+                    # pedaço sem texto (ex.: só metadados de segurança)
+                    continue
+                parts.append(text)
+                for item in parser.feed(text):
+                    record, motivo = self.validator.validate(item)
+                    if record is None:
+                        rejeitados += 1
+                        get_metrics().incr("engineer_records_rejected_total", reason=motivo)
+                        self.logger.warning(f"Registro descartado ({motivo}): {item}")
+                        continue
+                    yield record
+                    entregues += 1
+                    if entregues >= max_results:
+                        return
+            parser.close()
         except Exception as e:
             self.logger.error(f"Erro ao buscar dados com Gemini: {e}")
-            return []
+        finally:
+            get_metrics().record_llm("engineer", prompt, response, "".join(parts))
+            # Log da resposta bruta para depuração
+            self.logger.debug(f"Resposta do Gemini: {''.join(parts)}")
+            self.logger.info(
+                f"{entregues} resultados reais extraídos com Gemini "
+                f"({rejeitados} fora do esquema, {parser.errors} malformados)"
+            )
+
+    @timed("engineer.search_fraud_data")
+    def search_fraud_data(self, query=None, max_results=10):
+        """Busca registros com o Gemini; query é um foco opcional para o prompt."""
+        return list(self.iter_fraud_records(query, max_results))
+
+    def bulk_search(self, queries, max_results=None, sink=None, limiter=None):
+        """Executa várias buscas em paralelo (pool limitado + limite de requisições) e junta os resultados.
+
+        Com sink, cada registro é entregue a ele assim que chega, sem esperar as outras buscas.
+        limiter é o TokenBucket consumido antes de cada busca (padrão: engineer.requests_per_minute,
+        com rajada de max_workers).
+        """
+        max_results = max_results or self.max_results_per_query
+        limiter = limiter or TokenBucket(self.requests_per_minute, capacity=self.max_workers)
+
+        def buscar(query):
+            limiter.acquire()
+            records = []
+            for record in self.iter_fraud_records(query, max_results):
+                records.append(record)
+                if sink is not None:
+                    sink.add(record)
+            return records
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(buscar, query): query for query in queries}
+            for future in as_completed(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    self.logger.error(f"Erro na busca '{futures[future]}': {e}")
+        self.logger.info(f"{len(results)} resultados extraídos em {len(queries)} buscas paralelas")
+        return results
 
     def normalize_data(self, data):
-        """Aplica limpeza básica, já que os dados vêm padronizados do Gemini."""
+        """Valida e padroniza uma lista de registros, descartando os que estão fora do esquema."""
         normalized = []
         for item in data:
-            try:
-                normalized_item = {
-                    "Fonte": re.sub(r"\[\d+\]", "", item.get("Fonte", "")).strip(),
-                    "Data da notícia": item.get("Data da notícia", datetime.datetime.now().strftime("%Y-%m-%d")),
-                    "Tipo do golpe": item.get("Tipo do golpe", "Outros"),
-                    "Descrição breve do golpe": item.get("Descrição breve do golpe", ""),
-                    "Canal utilizado": item.get("Canal utilizado", "Outros"),
-                    "Público alvo": item.get("Público alvo", "População em Geral"),
-                    "Estimativa de impacto ou prejuízo": item.get("Estimativa de impacto ou prejuízo", "Não informado")
-                }
-                normalized.append(normalized_item)
-            except Exception as e:
-                self.logger.error(f"Erro na normalização do item {item}: {e}")
+            record, motivo = self.validator.validate(item)
+            if record is None:
+                self.logger.warning(f"Registro descartado ({motivo}): {item}")
+                continue
+            normalized.append(record)
         return normalized
 
-    def save_to_parquet(self, data, filename="engineer_data.parquet"):
+    @timed("engineer.save_to_parquet")
+    def save_to_parquet(self, data):
+        """Grava os registros inéditos como um novo arquivo do dataset particionado.
+
+        Os registros são conferidos no índice de deduplicação antes de chegar ao armazenamento:
+        um registro já gravado (mesma URL normalizada e data) com o mesmo conteúdo é descartado;
+        com outro tipo, canal, público, descrição ou impacto, é gravado com a Fonte já armazenada
+        e substitui a versão anterior na leitura (keep="last"), como antes do índice. O índice é
+        recriado a partir do dataset sempre que o dataset não é mais aquele com que ele foi
+        sincronizado (ex.: data/engineer_data apagado, restaurado de um backup ou recriado).
+        Retorna as contagens de aceitos (inclusive substituições) e duplicados.
+        """
+        stats = {"accepted": 0, "duplicates": 0}
         try:
-            df_new = pd.DataFrame(data)
-            output_path = os.path.join(self.data_dir, filename)
-
-            # Se o arquivo já existe, carrega e concatena
-            if os.path.exists(output_path):
-                df_existing = pd.read_parquet(output_path)
-                df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-                # Remover duplicatas baseadas em 'Fonte' e 'Data da notícia'
-                df_combined = df_combined.drop_duplicates(subset=["Fonte", "Data da notícia"], keep="last")
+            dataset = self.store.engineer_dataset
+            if self.dedup_index.dataset_version() != dataset_identity(dataset):
+                self.dedup_index.rebuild(dataset.read())
+
+            accepted, duplicates = self.dedup_index.split(data)
+            stats = {"accepted": len(accepted), "duplicates": len(duplicates)}
+
+            path = dataset.append(pd.DataFrame(accepted))
+            self.store.invalidate("engineer_data")
+            if path:
+                self.dedup_index.add(accepted)
+                self.logger.info(f"{len(accepted)} novos registros salvos em {path} ({len(duplicates)} duplicados descartados)")
             else:
-                df_combined = df_new
+                self.logger.info(f"Nenhum registro novo para salvar ({len(duplicates)} duplicados descartados)")
 
-            # Salvar o DataFrame combinado
-            df_combined.to_parquet(output_path, engine="pyarrow", index=False)
-            self.logger.info(f"{len(df_combined)} registros salvos em {output_path} ({len(df_new)} novos)")
+            # compactação periódica: junta os arquivos pequenos e aplica a deduplicação
+            if dataset.num_files() > self.compact_threshold:
+                dataset.compact()
+                self.store.invalidate("engineer_data")
+            self.dedup_index.set_dataset_version(dataset_identity(dataset))
         except Exception as e:
             self.logger.error(f"Erro ao salvar em Parquet: {e}")
+        return stats
 
-    def run(self, date_str):
-        raw_data = self.search_fraud_data()
-        normalized_data = self.normalize_data(raw_data)
-        self.save_to_parquet(normalized_data, "engineer_data.parquet")
-        return normalized_data
\ No newline at end of file
+    def run(self, date_str, bulk=None):
+        bulk = self.bulk if bulk is None else bulk
+        # os registros validados vão direto para o armazenamento, em lotes de flush_every
+        sink = RecordSink(self.save_to_parquet, self.flush_every)
+        try:
+            if bulk:
+                # ingestão em lote: um prompt por combinação de foco
+                self.bulk_search(self.build_queries(self.split_by), sink=sink)
+            else:
+                for record in self.iter_fraud_records():
+                    sink.add(record)
+        finally:
+            sink.close()
+        self.last_run_stats = dict(sink.stats)
+        return sink.records
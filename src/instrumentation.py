@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from src.utils import load_config
+from src.prompts import estimate_tokens
+
+
+class Metrics:
+    """Registro de métricas do processo: tempos por etapa, uso do LLM e contadores.
+
+    Cada evento é anexado como uma linha JSON em jsonl_path (se configurado), e o
+    agregado pode ser exportado no formato texto do Prometheus.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, prefix="guardiao"):
+        self.logger = logging.getLogger(__name__)
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.prefix = prefix
+        self.counters = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, event):
+        if not self.jsonl_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar métricas em {self.jsonl_path}: {e}")
+
+    def incr(self, name, value=1, **labels):
+        """Incrementa um contador (com rótulos opcionais)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds, **extra):
+        """Registra a duração de uma etapa."""
+        with self._lock:
+            count, total, maximum = self.timings.get(stage, (0, 0.0, 0.0))
+            self.timings[stage] = (count + 1, total + seconds, max(maximum, seconds))
+        self._emit({"ts": time.time(), "type": "timing", "stage": stage, "seconds": round(seconds, 6), **extra})
+
+    @contextmanager
+    def timer(self, stage):
+        """Mede o bloco; o dicionário retornado pode receber campos extras para o evento."""
+        extra = {}
+        inicio = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.observe(stage, time.perf_counter() - inicio, **extra)
+
+    def record_llm(self, agent, prompt, response=None, response_text=None, cached=False):
+        """Registra uma chamada ao LLM: tamanhos do prompt/resposta e tokens (informados pelo modelo e estimados)."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens_estimate = estimate_tokens(prompt)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+        response_tokens = getattr(usage, "candidates_token_count", None) if usage else None
+        self.incr("llm_calls_total", agent=agent)
+        self.incr("llm_prompt_chars_total", len(prompt or ""), agent=agent)
+        self.incr("llm_response_chars_total", len(response_text or ""), agent=agent)
+        self.incr("llm_prompt_tokens_estimate_total", prompt_tokens_estimate, agent=agent)
+        if prompt_tokens is not None:
+            self.incr("llm_prompt_tokens_total", prompt_tokens, agent=agent)
+        if response_tokens is not None:
+            self.incr("llm_response_tokens_total", response_tokens, agent=agent)
+        self._emit({
+            "ts": time.time(),
+            "type": "llm",
+            "agent": agent,
+            "prompt_chars": len(prompt or ""),
+            "response_chars": len(response_text or ""),
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_estimate": prompt_tokens_estimate,
+            "response_tokens": response_tokens,
+        })
+
+    def record_cache(self, hit, cache="response", **extra):
+        self.incr("cache_hits_total" if hit else "cache_misses_total", cache=cache)
+        self._emit({"ts": time.time(), "type": "cache", "cache": cache, "hit": hit, **extra})
+
+    def prometheus_text(self):
+        """Exporta as métricas agregadas no formato texto do Prometheus."""
+        linhas = []
+        with self._lock:
+            timings = dict(self.timings)
+            counters = dict(self.counters)
+        if timings:
+            nome = f"{self.prefix}_stage_seconds"
+            linhas.append(f"# TYPE {nome} summary")
+            for stage, (count, total, _) in sorted(timings.items()):
+                linhas.append(f'{nome}_count{{stage="{stage}"}} {count}')
+                linhas.append(f'{nome}_sum{{stage="{stage}"}} {total:.6f}')
+            linhas.append(f"# TYPE {nome}_max gauge")
+            for stage, (_, _, maximum) in sorted(timings.items()):
+                linhas.append(f'{nome}_max{{stage="{stage}"}} {maximum:.6f}')
+        tipos_emitidos = set()
+        for (name, labels), value in sorted(counters.items()):
+            nome = f"{self.prefix}_{name}"
+            if nome not in tipos_emitidos:
+                linhas.append(f"# TYPE {nome} counter")
+                tipos_emitidos.add(nome)
+            rotulos = ",".join(f'{k}="{v}"' for k, v in labels)
+            linhas.append(f"{nome}{{{rotulos}}} {value}" if rotulos else f"{nome} {value}")
+        return "\n".join(linhas) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Grava o texto do Prometheus em arquivo (para um coletor de node_exporter/textfile)."""
+        path = path or self.prometheus_path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Retorna o registro de métricas do processo, configurado pelo config.yaml."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            try:
+                config = load_config().get("instrumentation", {})
+            except OSError:
+                config = {}
+            _metrics = Metrics(config.get("jsonl_path"), config.get("prometheus_path"))
+        return _metrics
+
+
+def timed(stage):
+    """Decorador que registra a duração da função na etapa informada."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
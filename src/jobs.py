@@ -0,0 +1,62 @@
+import time
+import logging
+import threading
+from src.utils import setup_logging
+from src.orchestrator import PipelineBusyError
+
+setup_logging()
+
+
+class PipelineJob:
+    """Executa a pipeline do orquestrador em uma thread de fundo, expondo o progresso."""
+
+    def __init__(self, orchestrator):
+        self.logger = logging.getLogger(__name__)
+        self.orchestrator = orchestrator
+        self.status = "idle"
+        self.stage = ""
+        self.progress = 0.0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    def start(self):
+        """Inicia a pipeline em segundo plano; não faz nada se ela já estiver rodando."""
+        with self._lock:
+            if self.running:
+                return False
+            self.status = "running"
+            self.stage = "Iniciando"
+            self.progress = 0.0
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self._thread = threading.Thread(target=self._run, name="pipeline-job", daemon=True)
+            self._thread.start()
+            return True
+
+    def _update(self, stage, fraction):
+        self.stage = stage
+        self.progress = fraction
+
+    def _run(self):
+        try:
+            self.orchestrator.run_pipeline(progress_callback=self._update)
+            self.status = "done"
+        except PipelineBusyError as e:
+            # outra execução (ex.: o agendador) segura data/pipeline.lock; não é uma falha
+            self.logger.info(f"Pipeline em segundo plano não iniciada: {e}")
+            self.error = str(e)
+            self.status = "busy"
+        except Exception as e:
+            self.logger.error(f"Erro na pipeline em segundo plano: {e}")
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            self.finished_at = time.time()
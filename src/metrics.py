@@ -0,0 +1,93 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.analyst_state import CRUZAMENTOS, PERIODOS, SEPARADOR
+
+# formato do analyst_data.parquet: uma linha por (dimensão, chave, subchave, período)
+SCHEMA = pa.schema([
+    pa.field("dimension", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("key", pa.string()),
+    pa.field("subkey", pa.string()),
+    pa.field("period", pa.string()),
+    pa.field("count", pa.int64()),
+])
+
+
+def _is_period(dimension):
+    return dimension in PERIODOS or CRUZAMENTOS.get(dimension, ("",))[0] in PERIODOS
+
+
+def analysis_to_metrics(analysis):
+    """Converte o dicionário de análise para a tabela tipada de métricas."""
+    linhas = []
+    for dimension, valor in analysis.items():
+        if not isinstance(valor, dict):
+            linhas.append((dimension, None, None, None, int(valor)))
+            continue
+        for chave, count in valor.items():
+            if dimension in CRUZAMENTOS:
+                primeira, segunda = chave.split(SEPARADOR, 1)
+                if _is_period(dimension):
+                    linhas.append((dimension, segunda, None, primeira, int(count)))
+                else:
+                    linhas.append((dimension, primeira, segunda, None, int(count)))
+            elif _is_period(dimension):
+                linhas.append((dimension, None, None, chave, int(count)))
+            else:
+                linhas.append((dimension, chave, None, None, int(count)))
+    df = pd.DataFrame(linhas, columns=SCHEMA.names)
+    df["count"] = df["count"].astype("int64")
+    return df
+
+
+def metrics_to_analysis(df):
+    """Reconstrói o dicionário de análise a partir da tabela de métricas."""
+    analysis = {}
+    for dimension, group in df.groupby("dimension", sort=False, observed=True):
+        counts = group["count"].tolist()
+        if group["key"].isna().all() and group["period"].isna().all():
+            analysis[dimension] = counts[0]
+            continue
+        if dimension in CRUZAMENTOS:
+            primeira = group["period"] if _is_period(dimension) else group["key"]
+            segunda = group["key"] if _is_period(dimension) else group["subkey"]
+            chaves = primeira + SEPARADOR + segunda
+        elif _is_period(dimension):
+            chaves = group["period"]
+        else:
+            chaves = group["key"]
+        analysis[dimension] = dict(zip(chaves.tolist(), counts))
+    return analysis
+
+
+def legacy_analysis(df):
+    """Lê o formato antigo Categoria/Subcategoria/Valor do analyst_data.parquet."""
+    analysis = {}
+    for category, group in df.groupby("Categoria", sort=False):
+        subcategories = group["Subcategoria"].fillna("")
+        values = group["Valor"].tolist()
+        if (subcategories == "").all():
+            analysis[category] = values[-1]
+        else:
+            mask = (subcategories != "").tolist()
+            analysis[category] = {
+                sub: value for sub, value, keep in zip(subcategories.tolist(), values, mask) if keep
+            }
+    return analysis
+
+
+def dimension_frame(df, dimension):
+    """Retorna as métricas de uma dimensão prontas para plotar (sem colunas vazias)."""
+    if df.empty:
+        return pd.DataFrame(columns=["key", "count"])
+    frame = df[df["dimension"] == dimension].drop(columns="dimension")
+    return frame.dropna(axis=1, how="all").reset_index(drop=True)
+
+
+def write_metrics(df, path):
+    """Grava a tabela de métricas de forma atômica (arquivo temporário + rename)."""
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
@@ -1,41 +1,198 @@
+import os
+import sys
+import time
+import cProfile
+import argparse
 import logging
+import threading
 from datetime import datetime
 from src.engineer import EngineerAgent
 from src.analyst import AnalystAgent
 from src.professor import ProfessorAgent
-from src.utils import setup_logging
+from src.broker import BrokerError, RequestBroker
+from src.utils import setup_logging, load_config
+from src.datastore import get_datastore
+from src.locks import FileLock
+from src.instrumentation import get_metrics
+from src.dashboard import get_dashboard_cache
 
 setup_logging()
 
+class PipelineBusyError(RuntimeError):
+    """Outra execução da pipeline já está em andamento."""
+
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, model=None):
         self.logger = logging.getLogger(__name__)
-        self.engineer = EngineerAgent()
-        self.analyst = AnalystAgent()
-        self.professor = ProfessorAgent()
+        # modelo injetado nos agentes (ex.: modelo falso dos benchmarks); None usa o Gemini
+        self.model = model
+        self.config = load_config()
+        self.max_concurrency = self.config.get("llm", {}).get("max_concurrency", 5)
+        # os agentes só são criados no primeiro uso
+        self._agents = {}
+        self._agents_lock = threading.Lock()
+        self.last_run_stats = {}
+
+    def _agent(self, name, factory):
+        with self._agents_lock:
+            if name not in self._agents:
+                self._agents[name] = factory()
+            return self._agents[name]
+
+    @property
+    def engineer(self):
+        return self._agent("engineer", lambda: EngineerAgent(model=self.model))
+
+    @property
+    def analyst(self):
+        return self._agent("analyst", AnalystAgent)
+
+    @property
+    def professor(self):
+        return self._agent("professor", lambda: ProfessorAgent(model=self.model))
+
+    @property
+    def broker(self):
+        """Fila das perguntas ao professor, compartilhada por todas as sessões que usam este orquestrador."""
+        return self._agent("broker", self._create_broker)
 
-    def run_pipeline(self):
-        """Executa toda a pipeline de coleta e análise de dados."""
+    def _create_broker(self):
+        config = self.config.get("broker", {})
+        return RequestBroker(
+            # o broker já consultou o cache antes de enfileirar a pergunta
+            answer=lambda question, analysis: self.professor.stream_response(question, analysis, check_cache=False),
+            cached=lambda question: self.professor.cached_response(question),
+            workers=self.max_concurrency,
+            max_queue=config.get("max_queue", 20),
+            requests_per_minute=config.get("requests_per_minute", 30),
+            burst=config.get("burst", 5),
+            session_requests_per_minute=config.get("session_requests_per_minute", 6),
+            session_burst=config.get("session_burst", 3),
+            wait_timeout_seconds=config.get("wait_timeout_seconds", 120),
+        )
+
+    def run_pipeline(self, progress_callback=None):
+        """Executa toda a pipeline de coleta e análise de dados.
+
+        progress_callback(etapa, fração), se informado, é chamado no início de cada etapa.
+        Levanta PipelineBusyError se outra execução (de qualquer processo) estiver em andamento.
+        """
+        lock = FileLock(os.path.join("data", "pipeline.lock"))
+        if not lock.acquire():
+            self.logger.warning("Pipeline já em execução em outro processo")
+            raise PipelineBusyError("Pipeline já em execução")
+        try:
+            with get_metrics().timer("pipeline"):
+                return self._run_pipeline(progress_callback)
+        finally:
+            lock.release()
+            self.export_metrics()
+
+    def export_metrics(self):
+        """Grava as métricas agregadas no arquivo do Prometheus configurado."""
+        try:
+            path = get_metrics().write_prometheus()
+            if path:
+                self.logger.info(f"Métricas exportadas em {path}")
+        except OSError as e:
+            self.logger.error(f"Erro ao exportar métricas: {e}")
+
+    def _run_pipeline(self, progress_callback):
+        progress = progress_callback or (lambda stage, fraction: None)
         self.logger.info("Iniciando a pipeline")
         date_str = datetime.now().strftime("%Y-%m-%d")
+        stats = {"started_at": time.time(), "stages": {}}
         
+        # o antigo engineer_data.parquet só é migrado aqui, com a trava da pipeline
+        try:
+            get_datastore("data").engineer_dataset.migrate_legacy()
+        except Exception as e:
+            self.logger.error(f"Erro ao migrar o arquivo antigo do engenheiro: {e}")
+
         # executa o agente engineer
         self.logger.info("Executando o agente engineer")
+        progress("Coletando dados com o agente engenheiro", 0.1)
+        inicio = time.perf_counter()
         fraud_data = self.engineer.run(date_str)
+        stats["stages"]["engineer"] = time.perf_counter() - inicio
+        stats["records_fetched"] = len(fraud_data)
+        stats["new_rows"] = self.engineer.last_run_stats.get("accepted", 0)
+        stats["duplicate_rows"] = self.engineer.last_run_stats.get("duplicates", 0)
         
         # executa o agente analyst
         self.logger.info("Executando o agente analyst")
+        progress("Analisando os dados", 0.8)
+        inicio = time.perf_counter()
         analysis = self.analyst.run()
+        stats["stages"]["analyst"] = time.perf_counter() - inicio
+
+        # pré-calcula o painel da nova versão dos dados, para o primeiro acesso já ser rápido
+        try:
+            get_dashboard_cache().build()
+        except Exception as e:
+            self.logger.error(f"Erro ao pré-calcular o painel: {e}")
         
+        stats["finished_at"] = time.time()
+        self.last_run_stats = stats
         self.logger.info("Pipeline concluída")
+        progress("Pipeline concluída", 1.0)
         return fraud_data, analysis
 
-    def get_educational_response(self, question, analysis_data):
-        """Obtém uma resposta educativa para uma pergunta do usuário."""
+    def submit_question(self, question, analysis_data, session_id=None):
+        """Envia uma pergunta ao broker e retorna o Ticket que acompanha a resposta.
+
+        Levanta BrokerError (fila cheia ou sessão acima do limite) com a mensagem para o usuário.
+        """
         self.logger.info(f"Processando a pergunta: {question}")
-        return self.professor.run(question, analysis_data)
+        return self.broker.submit(question, analysis_data, session_id)
+
+    def get_educational_response(self, question, analysis_data, stream=False, session_id=None):
+        """Obtém uma resposta educativa para uma pergunta do usuário.
+
+        Com stream=True, retorna um gerador que produz a resposta em pedaços. Perguntas iguais em
+        andamento em outras sessões compartilham a mesma chamada ao Gemini.
+        """
+        ticket = self.submit_question(question, analysis_data, session_id)
+        return ticket.stream() if stream else ticket.result()
+
+    def get_educational_responses(self, questions, analysis_data=None):
+        """Obtém respostas para várias perguntas pelo broker; a latência total é a da chamada mais lenta.
+
+        As perguntas são enfileiradas juntas (e compartilhadas com outras sessões que fizeram as
+        mesmas); uma pergunta recusada pelo broker recebe a mensagem de recusa como resposta.
+        """
+        tickets = []
+        for question in questions:
+            try:
+                tickets.append(self.submit_question(question, analysis_data))
+            except BrokerError as e:
+                tickets.append(str(e))
+        return [ticket if isinstance(ticket, str) else ticket.result() for ticket in tickets]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa a pipeline do Guardião")
+    parser.add_argument("--profile", action="store_true",
+                        help="Grava um dump do cProfile da execução em data/profiles/")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     orchestrator = Orchestrator()
-    fraud_data, analysis = orchestrator.run_pipeline()
+    if not args.profile:
+        fraud_data, analysis = orchestrator.run_pipeline()
+        print("Análise:", analysis)
+        return 0
+
+    profile_dir = os.path.join("data", "profiles")
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_path = os.path.join(profile_dir, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.pstats")
+    profiler = cProfile.Profile()
+    try:
+        fraud_data, analysis = profiler.runcall(orchestrator.run_pipeline)
+    finally:
+        profiler.dump_stats(profile_path)
+        print(f"Perfil gravado em {profile_path} (veja com: python -m pstats {profile_path})")
     print("Análise:", analysis)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
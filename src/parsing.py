@@ -0,0 +1,177 @@
+import re
+import json
+import difflib
+import datetime
+import threading
+from src.cache import normalize_question
+
+
+class JSONObjectStream:
+    """Extrai objetos JSON de um texto que chega em pedaços (ex.: resposta do LLM em streaming).
+
+    Cada objeto de primeiro nível é devolvido assim que sua chave de fechamento chega, sem esperar
+    o fim da lista; texto fora dos objetos (colchetes, ```json, comentários) é ignorado. Um objeto
+    malformado é contado em errors e descartado sem afetar os demais.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.errors = 0
+        self._pos = 0      # próximo caractere do buffer a examinar
+        self._start = None  # início do objeto atual no buffer
+
+    def feed(self, chunk):
+        """Processa mais um pedaço de texto e retorna a lista de objetos completados por ele."""
+        objects = []
+        self.buffer += chunk
+        buffer = self.buffer
+        i = self._pos
+        while i < len(buffer):
+            c = buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                if self.depth > 0:
+                    self.in_string = True
+            elif c == "{":
+                if self.depth == 0:
+                    self._start = i
+                self.depth += 1
+            elif c == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    objects.extend(self._decode(buffer[self._start:i + 1]))
+                    self._start = None
+            i += 1
+
+        # só o objeto incompleto continua no buffer, então a memória fica limitada a um registro
+        if self._start is None:
+            self.buffer, self._pos = "", 0
+        else:
+            self.buffer, self._pos = buffer[self._start:], i - self._start
+            self._start = 0
+        return objects
+
+    def _decode(self, text):
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return []
+        return [obj] if isinstance(obj, dict) else []
+
+    def close(self):
+        """Finaliza o fluxo; um objeto ainda aberto (resposta truncada) conta como erro."""
+        if self._start is not None:
+            self.errors += 1
+        self.buffer, self._pos, self._start, self.depth = "", 0, None, 0
+
+
+def _label_key(text):
+    """Forma comparável de um rótulo: sem acentos, minúsculo e só com letras e números."""
+    return " ".join(re.findall(r"\w+", normalize_question(text)))
+
+
+class VocabularyMapper:
+    """Mapeia um valor livre para o rótulo canônico mais próximo do vocabulário (ou None)."""
+
+    def __init__(self, labels, cutoff=0.8):
+        self.labels = {_label_key(label): label for label in labels}
+        self.cutoff = cutoff
+
+    def map(self, value):
+        key = _label_key(value)
+        if not key:
+            return None
+        if key in self.labels:
+            return self.labels[key]
+        # "Golpe via Pix" -> "Golpe do Pix"; "WhatsApp (clonagem)" -> "Clonagem de WhatsApp"
+        close = difflib.get_close_matches(key, self.labels, n=1, cutoff=self.cutoff)
+        if close:
+            return self.labels[close[0]]
+        # valor que contém o rótulo inteiro (ex.: "PIX instantâneo" -> "PIX"); o mais longo vence
+        contidos = [k for k in self.labels if len(k) >= 3 and f" {k} " in f" {key} "]
+        if contidos:
+            return self.labels[max(contidos, key=len)]
+        return None
+
+
+class RecordValidator:
+    """Valida os registros do engenheiro contra o esquema e os vocabulários de categorias.
+
+    validate devolve (registro normalizado, None) ou (None, motivo da rejeição); as contagens de
+    rejeição por motivo ficam em rejections.
+    """
+
+    DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y")
+
+    def __init__(self, vocabularies, fuzzy_cutoff=0.8, default_public="População em Geral"):
+        # vocabularies: {"Tipo do golpe": [...], "Canal utilizado": [...], "Público alvo": [...]}
+        self.mappers = {field: VocabularyMapper(labels, fuzzy_cutoff) for field, labels in vocabularies.items()}
+        self.default_public = default_public
+        self.accepted = 0
+        self.rejections = {}
+        self._lock = threading.Lock()
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        return None, reason
+
+    def parse_date(self, value):
+        text = str(value).strip()[:10]
+        for fmt in self.DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        return None
+
+    def validate(self, item):
+        if not isinstance(item, dict):
+            return self._reject("não é objeto")
+
+        fonte = re.sub(r"\[\d+\]", "", str(item.get("Fonte") or "")).strip()
+        if not re.match(r"https?://\S+\.\S+", fonte):
+            return self._reject("fonte inválida")
+
+        data = item.get("Data da notícia")
+        if data:
+            data = self.parse_date(data)
+            if data is None:
+                return self._reject("data inválida")
+        else:
+            data = datetime.datetime.now().strftime("%Y-%m-%d")
+
+        record = {"Fonte": fonte, "Data da notícia": data}
+        for field, mapper in self.mappers.items():
+            value = item.get(field)
+            if not value and field == "Público alvo":
+                value = self.default_public
+            canonical = mapper.map(value) if isinstance(value, str) else None
+            if canonical is None:
+                return self._reject(f"{field} fora do vocabulário")
+            record[field] = canonical
+
+        record["Descrição breve do golpe"] = str(item.get("Descrição breve do golpe") or "").strip()
+        record["Estimativa de impacto ou prejuízo"] = str(item.get("Estimativa de impacto ou prejuízo") or "Não informado").strip()
+        with self._lock:
+            self.accepted += 1
+        # mesma ordem de colunas do engineer_data
+        return {
+            "Fonte": record["Fonte"],
+            "Data da notícia": record["Data da notícia"],
+            "Tipo do golpe": record["Tipo do golpe"],
+            "Descrição breve do golpe": record["Descrição breve do golpe"],
+            "Canal utilizado": record["Canal utilizado"],
+            "Público alvo": record["Público alvo"],
+            "Estimativa de impacto ou prejuízo": record["Estimativa de impacto ou prejuízo"],
+        }, None
@@ -1,144 +1,263 @@
+import re
 import logging
 import os
+import time
+import queue
+import random
+import threading
 import pandas as pd
-import google.generativeai as genai
 from dotenv import load_dotenv
-from src.utils import setup_logging, load_config
+from src.utils import setup_logging, load_config, create_gemini_model
+from src.cache import ResponseCache, data_version
+from src.semantic_cache import SemanticCache
+from src.datastore import get_datastore
+from src.instrumentation import get_metrics, timed
+from src.retrieval import get_retrieval_index, mentioned_values, aggregate_slices
+from src.prompts import PROFESSOR_INSTRUCTIONS, ContextPacker, compact_table, compact_counts, estimate_tokens
 
 load_dotenv()
 setup_logging()
 
 class ProfessorAgent:
-    def __init__(self):
+    def __init__(self, model=None):
         self.config = load_config()
         self.logger = logging.getLogger(__name__)
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.store = get_datastore(self.data_dir)
 
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            self.logger.error("GEMINI_API_KEY não encontrada no .env")
-            raise ValueError("GEMINI_API_KEY não configurada")
+        llm_config = self.config.get("llm", {})
+        self.timeout_seconds = llm_config.get("timeout_seconds", 30)
+        self.max_retries = llm_config.get("max_retries", 2)
+        self.retry_backoff_seconds = llm_config.get("retry_backoff_seconds", 1.0)
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(model_name="gemini-2.0-flash")
+        prompts_config = self.config.get("prompts", {})
+        self.max_context_tokens = prompts_config.get("max_context_tokens", 800)
+        self.chars_per_token = prompts_config.get("chars_per_token", 4.0)
+        # com o modelo do Gemini, as instruções fixas vão como system instruction
+        self.system_instruction = model is None and prompts_config.get("system_instruction", True)
 
+        if model is not None:
+            # modelo injetado (ex.: modelo falso local para testes)
+            self.model = model
+        else:
+            self.api_key = os.getenv("GEMINI_API_KEY")
+            if not self.api_key:
+                self.logger.error("GEMINI_API_KEY não encontrada no .env")
+                raise ValueError("GEMINI_API_KEY não configurada")
+
+            self.model = create_gemini_model(
+                self.api_key, system_instruction=PROFESSOR_INSTRUCTIONS if self.system_instruction else None
+            )
+
+        retrieval_config = self.config.get("retrieval", {})
+        self.retrieval_enabled = retrieval_config.get("enabled", True)
+        self.top_k = retrieval_config.get("top_k", 5)
+        self.retrieval = get_retrieval_index(self.data_dir)
+
+        cache_config = self.config.get("cache", {})
+        response_cache = ResponseCache(
+            path=cache_config.get("path", os.path.join(self.data_dir, "response_cache.sqlite")),
+            ttl_seconds=cache_config.get("ttl_seconds", 86400),
+            max_entries=cache_config.get("max_entries", 500),
+        )
+        semantic_config = cache_config.get("semantic", {})
+        if semantic_config.get("enabled", True):
+            # paráfrases da mesma pergunta reaproveitam a resposta guardada, sem chamar o Gemini
+            self.cache = SemanticCache(
+                response_cache,
+                threshold=semantic_config.get("threshold", 0.75),
+                type_threshold=semantic_config.get("type_threshold", 0.8),
+            )
+        else:
+            self.cache = response_cache
+
+    @timed("professor.read_parquets")
     def read_parquets(self):
         """Lê os arquivos engineer_data.parquet e analyst_data.parquet."""
         try:
-            # Ler engineer_data.parquet
-            engineer_path = os.path.join(self.data_dir, "engineer_data.parquet")
-            if not os.path.exists(engineer_path):
-                self.logger.warning(f"Arquivo {engineer_path} não encontrado")
-                engineer_df = pd.DataFrame()
-            else:
-                engineer_df = pd.read_parquet(engineer_path, engine="pyarrow")
-                self.logger.info(f"Lido {len(engineer_df)} registros de {engineer_path}")
-
-            # Ler analyst_data.parquet
-            analyst_path = os.path.join(self.data_dir, "analyst_data.parquet")
-            if not os.path.exists(analyst_path):
-                self.logger.warning(f"Arquivo {analyst_path} não encontrado")
-                analyst_df = pd.DataFrame()
-            else:
-                analyst_df = pd.read_parquet(analyst_path, engine="pyarrow")
-                self.logger.info(f"Lido {len(analyst_df)} registros de {analyst_path}")
-
-            # Extrair métricas de analyst_data
-            analysis = {}
-            if not analyst_df.empty:
-                for _, row in analyst_df.iterrows():
-                    category = row["Categoria"]
-                    subcategory = row["Subcategoria"]
-                    value = row["Valor"]
-                    if subcategory:
-                        if category not in analysis:
-                            analysis[category] = {}
-                        analysis[category][subcategory] = value
-                    else:
-                        analysis[category] = value
-
+            # Os DataFrames ficam em memória e só são relidos quando os arquivos mudam
+            engineer_df = self.store.get_engineer_df()
+            analysis = self.store.get_analysis()
             return engineer_df, analysis
         except Exception as e:
             self.logger.error(f"Erro ao ler arquivos Parquet: {e}")
             return pd.DataFrame(), {}
 
+    @timed("professor.relevant_records")
+    def relevant_records(self, question, engineer_df, analysis=None):
+        """Seleciona os registros mais relevantes para a pergunta no índice de busca (BM25)."""
+        if self.retrieval_enabled:
+            try:
+                self.retrieval.refresh(self.store.engineer_dataset)
+                records = self.retrieval.search(question, k=self.top_k)
+                if not records.empty:
+                    return records
+            except Exception as e:
+                self.logger.error(f"Erro ao consultar o índice de busca: {e}")
+        # sem índice ou sem resultados: registros do tipo/canal/público citado, lidos só com esse filtro
+        filtros = mentioned_values(question, analysis or {})
+        if filtros:
+            records = self.store.select_records(limit=self.top_k, **filtros)
+            if not records.empty:
+                return records
+        return engineer_df.head(self.top_k)
+
     def create_prompt(self, question, engineer_df, analysis):
-        """Cria um prompt para o Gemini com base na pergunta e nos dados dos Parquet."""
-        # Extrair informações relevantes dos Parquet
-        context = []
-        if not engineer_df.empty:
-            context.append("### Dados detalhados de golpes financeiros (engineer_data.parquet):")
-            for _, row in engineer_df.head(5).iterrows():  # Limitar a 5 registros para evitar prompt longo
-                context.append(
-                    f"- Fonte: {row['Fonte']}\n"
-                    f"  Data: {row['Data da notícia']}\n"
-                    f"  Tipo do golpe: {row['Tipo do golpe']}\n"
-                    f"  Descrição: {row['Descrição breve do golpe']}\n"
-                    f"  Canal: {row['Canal utilizado']}\n"
-                    f"  Público alvo: {row['Público alvo']}\n"
-                    f"  Impacto: {row['Estimativa de impacto ou prejuízo']}"
-                )
-        else:
-            context.append("Nenhum dado detalhado de golpes disponível em engineer_data.parquet.")
+        """Cria um prompt para o Gemini com base na pergunta e nos dados dos Parquet.
 
+        O contexto é codificado de forma compacta e cortado para caber em prompts.max_context_tokens.
+        As instruções fixas só entram no texto quando não estão na system instruction do modelo.
+        """
+        packer = ContextPacker(self.max_context_tokens, self.chars_per_token)
         if analysis.get("golpes_por_tipo"):
-            context.append("\n### Métricas agregadas (analyst_data.parquet):")
-            context.append(f"Total de golpes: {analysis.get('total_golpes', 0)}")
-            context.append("Tipos de golpes mais comuns:")
-            for fraud_type, count in sorted(analysis.get("golpes_por_tipo", {}).items(), key=lambda x: x[1], reverse=True)[:3]:
-                context.append(f"- {fraud_type}: {count} casos")
+            metricas = [
+                f"Total de golpes: {analysis.get('total_golpes', 0)}",
+                f"Tipos de golpes mais comuns: {compact_counts(analysis['golpes_por_tipo'], limit=3)}",
+            ]
+            # recortes das métricas para os tipos, canais e públicos citados na pergunta
+            for label, values in aggregate_slices(analysis, **mentioned_values(question, analysis)).items():
+                metricas.append(f"{label}: {compact_counts(values)}")
+            packer.add("Métricas agregadas (analyst_data)", metricas)
+        else:
+            packer.add("Métricas agregadas", ["Nenhuma métrica agregada disponível em analyst_data.parquet."])
+
+        if not engineer_df.empty:
+            registros = compact_table(self.relevant_records(question, engineer_df, analysis))
+            packer.add("Golpes relacionados à pergunta (engineer_data)", registros, header_lines=1)
         else:
-            context.append("Nenhuma métrica agregada disponível em analyst_data.parquet.")
-
-        # Criar o prompt
-        prompt = f"""
-Você é um especialista em prevenção de golpes financeiros no Brasil. Sua tarefa é responder à pergunta do usuário de forma educativa, clara e formatada em Markdown, com base nos dados fornecidos e no seu conhecimento sobre golpes financeiros em 2025.
-
-**Pergunta do usuário**: {question}
-
-**Contexto (dados coletados em 2025):**
-{'\n'.join(context)}
-
-**Instruções:**
-- Responda em Markdown, com seções claras (e.g., `### Sobre o [golpe]`, `#### Como se prevenir`).
-- Se a pergunta mencionar um tipo de golpe específico, forneça detalhes sobre ele, incluindo sua frequência (se disponível no contexto) e dicas de prevenção específicas.
-- Use os dados do contexto para embasar a resposta (e.g., cite tipos de golpes, canais, públicos alvos ou descrições).
-- Se a pergunta for genérica, forneça uma visão geral dos golpes mais comuns no contexto, com dicas de prevenção.
-- Inclua um exemplo prático de como identificar ou evitar o golpe (baseado no contexto ou no tipo de golpe).
-- Não invente dados; se o contexto for insuficiente, use seu conhecimento geral, mas indique que os dados são limitados.
-- A resposta deve ser concisa, com no máximo 500 palavras.
-
-**Saída esperada (exemplo):**
-```markdown
-### Sobre o Phishing
-O **Phishing** é um golpe comum, com X casos registrados. Ele envolve e-mails falsos que imitam bancos para roubar dados.
-
-#### Como se prevenir
-1. Não clique em links de e-mails suspeitos.
-2. Verifique o remetente antes de responder.
-3. Use autenticação de dois fatores.
-
-#### Exemplo prático
-Você recebe um e-mail pedindo para atualizar seus dados bancários. **O que fazer?** Não clique no link e contate seu banco diretamente.
-```
-"""
+            packer.add("Dados detalhados", ["Nenhum dado detalhado de golpes disponível em engineer_data."])
+
+        context_text, stats = packer.pack()
+        prompt = f"**Pergunta do usuário**: {question}\n\n**Contexto (dados coletados em 2025):**\n{context_text}"
+        if not self.system_instruction:
+            prompt = f"{PROFESSOR_INSTRUCTIONS}\n\n{prompt}"
+        self.logger.info(
+            f"Prompt do professor com ~{estimate_tokens(prompt, self.chars_per_token)} tokens "
+            f"(contexto: {stats['context_tokens']}, {stats['omitted_lines']} linhas omitidas)"
+        )
         return prompt
 
+    def _retry_delay(self, attempt):
+        """Espera antes da próxima tentativa: backoff exponencial com jitter."""
+        return self.retry_backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def _call_with_deadline(self, func, *args, **kwargs):
+        """Executa func em uma thread daemon e desiste após llm.timeout_seconds.
+
+        Uma chamada presa ao Gemini não pode ser cancelada; a thread é abandonada e quem chamou
+        (ex.: uma thread do broker) fica livre para a próxima pergunta.
+        """
+        resultado = {}
+        pronto = threading.Event()
+
+        def executar():
+            try:
+                resultado["value"] = func(*args, **kwargs)
+            except Exception as e:
+                resultado["error"] = e
+            finally:
+                pronto.set()
+
+        threading.Thread(target=executar, name="professor-gemini", daemon=True).start()
+        if not pronto.wait(self.timeout_seconds):
+            raise TimeoutError(f"Gemini sem resposta em {self.timeout_seconds}s")
+        if "error" in resultado:
+            raise resultado["error"]
+        return resultado["value"]
+
+    def _stream_with_deadline(self, prompt, holder):
+        """Gera os pedaços do Gemini em streaming, com prazo de llm.timeout_seconds para cada pedaço.
+
+        A leitura da resposta roda em uma thread daemon; holder["response"] recebe a resposta
+        completa (para o usage_metadata) quando o último pedaço chega.
+        """
+        fila = queue.Queue()
+
+        def produzir():
+            try:
+                response = self.model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        fila.put(("chunk", text))
+                fila.put(("done", response))
+            except Exception as e:
+                fila.put(("error", e))
+
+        threading.Thread(target=produzir, name="professor-gemini-stream", daemon=True).start()
+        while True:
+            try:
+                tipo, valor = fila.get(timeout=self.timeout_seconds)
+            except queue.Empty:
+                raise TimeoutError(f"Gemini sem enviar pedaços por {self.timeout_seconds}s")
+            if tipo == "chunk":
+                yield valor
+            elif tipo == "done":
+                holder["response"] = valor
+                return
+            else:
+                raise valor
+
+    @timed("professor.query_gemini")
     def query_gemini(self, question, engineer_df, analysis):
-        """Faz uma pergunta ao modelo Gemini e retorna a resposta."""
-        try:
-            prompt = self.create_prompt(question, engineer_df, analysis)
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            self.logger.debug(f"Resposta do Gemini: {response_text}")
-            return response_text
-        except Exception as e:
-            self.logger.error(f"Erro ao consultar Gemini: {e}")
-            return f"### Erro\nNão foi possível gerar uma resposta devido a um problema com o modelo. Tente novamente mais tarde."
+        """Faz uma pergunta ao modelo Gemini e retorna a resposta, com timeout e novas tentativas com jitter."""
+        prompt = self.create_prompt(question, engineer_df, analysis)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._call_with_deadline(self.model.generate_content, prompt)
+                response_text = response.text.strip()
+                get_metrics().record_llm("professor", prompt, response, response_text)
+                self.logger.debug(f"Resposta do Gemini: {response_text}")
+                return response_text
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.logger.error(f"Erro ao consultar Gemini após {attempt + 1} tentativas: {e!r}")
+                    break
+                delay = self._retry_delay(attempt)
+                self.logger.warning(f"Falha ao consultar Gemini ({e!r}), nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+        return f"### Erro\nNão foi possível gerar uma resposta devido a um problema com o modelo. Tente novamente mais tarde."
+
+    def stream_gemini(self, question, engineer_df, analysis):
+        """Faz uma pergunta ao Gemini e devolve os pedaços da resposta à medida que chegam.
+
+        Cada pedaço tem prazo de llm.timeout_seconds. Enquanto nada foi entregue, falhas e prazos
+        esgotados são repetidos (llm.max_retries, com jitter); depois do primeiro pedaço, o erro
+        sobe para quem chamou, que completa a resposta com o fallback.
+        """
+        prompt = self.create_prompt(question, engineer_df, analysis)
+        for attempt in range(self.max_retries + 1):
+            parts, holder = [], {}
+            try:
+                with get_metrics().timer("professor.stream_gemini"):
+                    for text in self._stream_with_deadline(prompt, holder):
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                if parts or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                self.logger.warning(f"Falha ao consultar Gemini em streaming ({e!r}), nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            # no streaming o usage_metadata só fica completo depois do último pedaço
+            get_metrics().record_llm("professor", prompt, holder.get("response"), "".join(parts))
+            return
+
+    def fallback_response(self, analysis):
+        """Resposta básica usada quando o Gemini falha."""
+        return f"### Resposta Temporária\nDesculpe, não consegui processar sua pergunta no momento. Tente novamente ou pergunte sobre um golpe específico, como {list(analysis.get('golpes_por_tipo', {}).keys())[0] if analysis.get('golpes_por_tipo') else 'Phishing'}."
 
     def generate_response(self, question, analysis_data):
         """Gera uma resposta educativa para uma pergunta do usuário."""
+        # Consultar o cache antes de ler os dados e chamar o Gemini
+        version = data_version(self.data_dir)
+        cached = self.cache.get(question, version)
+        if cached is not None:
+            self.logger.info(f"Resposta encontrada no cache para: {question}")
+            return cached
+
         # Ler os dados dos Parquet
         engineer_df, analysis = self.read_parquets()
 
@@ -147,10 +266,47 @@ Você recebe um e-mail pedindo para atualizar seus dados bancários. **O que faz
 
         # Se o Gemini falhar, fornecer uma resposta básica
         if "Erro" in response:
-            response = f"### Resposta Temporária\nDesculpe, não consegui processar sua pergunta no momento. Tente novamente ou pergunte sobre um golpe específico, como {list(analysis.get('golpes_por_tipo', {}).keys())[0] if analysis.get('golpes_por_tipo') else 'Phishing'}."
+            response = self.fallback_response(analysis)
+        else:
+            self.cache.set(question, version, response)
 
         return response
 
+    def cached_response(self, question):
+        """Resposta em cache (exata ou semelhante) para a versão atual dos dados, ou None."""
+        return self.cache.get(question, data_version(self.data_dir))
+
+    def stream_response(self, question, analysis_data, check_cache=True):
+        """Gera uma resposta educativa em streaming; respostas em cache são reproduzidas pela mesma interface.
+
+        check_cache=False pula a consulta ao cache (quem chama já a fez, como o broker de perguntas).
+        """
+        version = data_version(self.data_dir)
+        cached = self.cache.get(question, version) if check_cache else None
+        if cached is not None:
+            self.logger.info(f"Resposta encontrada no cache para: {question}")
+            # reproduz a resposta em pedaços de uma palavra (com o espaço seguinte)
+            yield from re.findall(r"\S+\s*|\s+", cached)
+            return
+
+        engineer_df, analysis = self.read_parquets()
+        parts = []
+        try:
+            for chunk in self.stream_gemini(question, engineer_df, analysis):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar Gemini em streaming: {e}")
+            yield ("\n\n" if parts else "") + self.fallback_response(analysis)
+            return
+
+        response_text = "".join(parts).strip()
+        if response_text:
+            self.logger.debug(f"Resposta do Gemini: {response_text}")
+            self.cache.set(question, version, response_text)
+        else:
+            yield self.fallback_response(analysis)
+
     def run(self, question, analysis_data):
         """Executa a pipeline do professor."""
         return self.generate_response(question, analysis_data)
\ No newline at end of file
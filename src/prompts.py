@@ -0,0 +1,136 @@
+import math
+from src.records import as_text
+
+# Parte fixa do prompt do professor: igual em todas as chamadas, enviada como system instruction
+# do Gemini (ou no início do prompt, quando o modelo não aceita instruções de sistema).
+PROFESSOR_INSTRUCTIONS = """
+Você é um especialista em prevenção de golpes financeiros no Brasil. Sua tarefa é responder à pergunta do usuário de forma educativa, clara e formatada em Markdown, com base nos dados fornecidos e no seu conhecimento sobre golpes financeiros em 2025.
+
+**Formato do contexto:** os registros vêm em uma tabela com colunas separadas por "|" (a primeira linha é o cabeçalho) e as métricas como "valor=casos".
+
+**Instruções:**
+- Responda em Markdown, com seções claras (e.g., `### Sobre o [golpe]`, `#### Como se prevenir`).
+- Se a pergunta mencionar um tipo de golpe específico, forneça detalhes sobre ele, incluindo sua frequência (se disponível no contexto) e dicas de prevenção específicas.
+- Use os dados do contexto para embasar a resposta (e.g., cite tipos de golpes, canais, públicos alvos ou descrições).
+- Se a pergunta for genérica, forneça uma visão geral dos golpes mais comuns no contexto, com dicas de prevenção.
+- Inclua um exemplo prático de como identificar ou evitar o golpe (baseado no contexto ou no tipo de golpe).
+- Não invente dados; se o contexto for insuficiente, use seu conhecimento geral, mas indique que os dados são limitados.
+- A resposta deve ser concisa, com no máximo 500 palavras.
+
+**Saída esperada (exemplo):**
+```markdown
+### Sobre o Phishing
+O **Phishing** é um golpe comum, com X casos registrados. Ele envolve e-mails falsos que imitam bancos para roubar dados.
+
+#### Como se prevenir
+1. Não clique em links de e-mails suspeitos.
+2. Verifique o remetente antes de responder.
+3. Use autenticação de dois fatores.
+
+#### Exemplo prático
+Você recebe um e-mail pedindo para atualizar seus dados bancários. **O que fazer?** Não clique no link e contate seu banco diretamente.
+```
+""".strip()
+
+# colunas dos registros no contexto do professor: (coluna do engineer_data, nome curto)
+COLUNAS_CONTEXTO = [
+    ("Data da notícia", "data"),
+    ("Tipo do golpe", "tipo"),
+    ("Canal utilizado", "canal"),
+    ("Público alvo", "publico"),
+    ("Estimativa de impacto ou prejuízo", "impacto"),
+    ("Descrição breve do golpe", "descricao"),
+    ("Fonte", "fonte"),
+]
+
+
+def estimate_tokens(text, chars_per_token=4.0):
+    """Estimativa rápida de tokens (o Gemini fica perto de 4 caracteres por token em português)."""
+    return math.ceil(len(text or "") / chars_per_token)
+
+
+def compact_table(df, columns=COLUNAS_CONTEXTO, max_cell_chars=160):
+    """Codifica registros como tabela "|" com cabeçalho curto; retorna a lista de linhas."""
+    presentes = [(coluna, nome) for coluna, nome in columns if coluna in df.columns]
+    linhas = ["|".join(nome for _, nome in presentes)]
+    texto = as_text(df[[coluna for coluna, _ in presentes]])
+    valores = [texto[coluna].tolist() for coluna, _ in presentes]
+    for registro in zip(*valores):
+        celulas = []
+        for celula in registro:
+            celula = " ".join(celula.replace("|", "/").split())
+            if len(celula) > max_cell_chars:
+                celula = celula[:max_cell_chars - 1] + "…"
+            celulas.append(celula)
+        linhas.append("|".join(celulas))
+    return linhas
+
+
+def compact_counts(counts, limit=None):
+    """Codifica contagens como "valor=casos; ..." (ordem decrescente quando há limite)."""
+    itens = list(counts.items())
+    if limit is not None:
+        itens = sorted(itens, key=lambda x: x[1], reverse=True)[:limit]
+    return "; ".join(f"{chave}={contagem}" for chave, contagem in itens)
+
+
+class ContextPacker:
+    """Monta o contexto do prompt respeitando um orçamento de tokens.
+
+    As seções entram na ordem em que são adicionadas (a mais importante primeiro). Quando uma
+    seção não cabe inteira, entram só as primeiras linhas e uma nota com quantas ficaram de fora,
+    cujo custo é reservado antes das linhas; header_lines linhas do início (ex.: o cabeçalho de
+    uma tabela) só entram junto com alguma linha. O texto montado nunca passa de budget_tokens.
+    """
+
+    def __init__(self, budget_tokens, chars_per_token=4.0):
+        self.budget_tokens = budget_tokens
+        self.chars_per_token = chars_per_token
+        self.sections = []
+
+    def add(self, title, lines, header_lines=0):
+        self.sections.append((title, list(lines), header_lines))
+
+    def pack(self):
+        """Retorna (texto, estatísticas) com o contexto que coube no orçamento."""
+        partes = []
+        usados = 0
+        omitidas = 0
+        for title, lines, header_lines in self.sections:
+            if not lines:
+                continue
+            cabecalho = [f"### {title}"] + lines[:header_lines]
+            # a linha em branco entre as seções também conta
+            custo_cabecalho = sum(self._tokens(linha) for linha in cabecalho) + (1 if partes else 0)
+            linhas = lines[header_lines:]
+            custos = [self._tokens(linha) for linha in linhas]
+            disponivel = self.budget_tokens - usados
+            if custo_cabecalho + sum(custos) > disponivel:
+                # a seção vai ser cortada: a nota (no maior tamanho possível) precisa caber junto
+                disponivel -= self._tokens(self._nota(len(linhas)))
+            corpo = []
+            custo = custo_cabecalho
+            for linha, custo_linha in zip(linhas, custos):
+                if custo + custo_linha > disponivel:
+                    break
+                corpo.append(linha)
+                custo += custo_linha
+            restantes = len(linhas) - len(corpo)
+            omitidas += restantes
+            if not corpo:
+                continue
+            if restantes:
+                corpo.append(self._nota(restantes))
+                custo += self._tokens(corpo[-1])
+            partes.append("\n".join(cabecalho + corpo))
+            usados += custo
+        texto = "\n\n".join(partes)
+        return texto, {"context_tokens": self._tokens(texto), "omitted_lines": omitidas}
+
+    @staticmethod
+    def _nota(restantes):
+        return f"(+{restantes} omitidos por limite de tamanho)"
+
+    def _tokens(self, text):
+        # +1 pela quebra de linha
+        return estimate_tokens(text, self.chars_per_token) + 1
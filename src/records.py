@@ -0,0 +1,159 @@
+import pandas as pd
+import pyarrow as pa
+
+# vocabulários fixos das categorias (usados no prompt do engenheiro e na padronização dos registros)
+TIPOS_GOLPE = [
+    "Golpe do Pix",
+    "Phishing",
+    "Golpe do Suporte Técnico",
+    "Falso Investimento",
+    "Clonagem de WhatsApp",
+    "Falso Empréstimo",
+    "Falso Comprovante de Pagamento",
+    "Perfil Falso",
+    "Deepfake / IA",
+    "Site Falso / Link Malicioso",
+    "Golpe do Cartão",
+    "Golpe com Número Falso",
+    "Falso Bolsa Família",
+    "Golpe do Auxílio",
+    "Compra Falsa",
+]
+CANAIS = [
+    "WhatsApp",
+    "SMS / Mensagens",
+    "E-mail",
+    "Telefone",
+    "PIX",
+    "Cartão de Crédito / Débito",
+    "Boletos",
+    "Redes Sociais",
+    "E-commerce / Plataformas Online",
+    "Máquina de Cartão",
+    "Manipulação de DNS",
+    "IA / Deepfake",
+    "Internet",
+]
+PUBLICOS = [
+    "Idosos",
+    "Jovens",
+    "Usuários do Pix",
+    "Usuários do WhatsApp",
+    "Usuários de Internet",
+    "Investidores",
+    "Comerciantes",
+    "Clientes Bancários",
+    "População em Geral",
+    "Consumidores",
+    "Instituições Financeiras",
+    "Empresas",
+    "Foliões",
+]
+
+COLUNA_DATA = "Data da notícia"
+# colunas categóricas: códigos sobre o vocabulário fixo (valores fora dele entram ao final); o
+# impacto é texto livre, mas se repete muito ("Não informado" é o padrão da validação)
+CATEGORIAS = {
+    "Tipo do golpe": TIPOS_GOLPE,
+    "Canal utilizado": CANAIS,
+    "Público alvo": PUBLICOS,
+    "Estimativa de impacto ou prejuízo": ["Não informado"],
+}
+
+# esquema do Parquet: a data como date32 e as categorias como texto no Arrow; no arquivo, as
+# categorias usam a codificação por dicionário do Parquet (use_dictionary na escrita). Com o tipo
+# dictionary do Arrow, o pyarrow não usa as estatísticas da coluna para descartar grupos de linhas
+SCHEMA = pa.schema([
+    pa.field("Fonte", pa.string()),
+    pa.field("Data da notícia", pa.date32()),
+    pa.field("Tipo do golpe", pa.string()),
+    pa.field("Descrição breve do golpe", pa.string()),
+    pa.field("Canal utilizado", pa.string()),
+    pa.field("Público alvo", pa.string()),
+    pa.field("Estimativa de impacto ou prejuízo", pa.string()),
+])
+# colunas com poucos valores distintos, gravadas com dicionário no Parquet
+COLUNAS_DICIONARIO = list(CATEGORIAS)
+
+
+def _categories(serie, vocabulary):
+    """Vocabulário seguido dos valores que não pertencem a ele (ordenados)."""
+    valores = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dropna().unique()
+    extras = sorted(set(valores) - set(vocabulary))
+    return list(vocabulary) + [str(v) for v in extras]
+
+
+def as_category(serie, vocabulary, categories=None):
+    """Coluna categórica com os códigos na ordem do vocabulário (mesmos códigos em todos os arquivos)."""
+    categories = categories or _categories(serie, vocabulary)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        if list(serie.cat.categories) == categories:
+            return serie
+        return serie.cat.set_categories(categories)
+    return pd.Series(pd.Categorical(serie, categories=categories), index=serie.index, name=serie.name)
+
+
+def as_date(serie):
+    """Coluna de datas (datetime64, sem hora); valores inválidos viram NaT."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    # o cache do to_datetime converte cada data distinta uma única vez
+    datas = pd.to_datetime(serie.astype(object).where(serie.notna(), None), errors="coerce", format="ISO8601")
+    return datas.dt.normalize()
+
+
+def compact_frame(df):
+    """Representação compacta dos registros: categorias como códigos e datas como datetime64."""
+    if df.empty:
+        return df
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in CATEGORIAS:
+            serie = as_category(serie, CATEGORIAS[coluna])
+        elif coluna == COLUNA_DATA:
+            serie = as_date(serie)
+        colunas[coluna] = serie
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def concat_compact(frames):
+    """Concatena DataFrames compactos mantendo as colunas categóricas (união das categorias)."""
+    frames = [compact_frame(frame) for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    for coluna, vocabulary in CATEGORIAS.items():
+        presentes = [frame for frame in frames if coluna in frame.columns]
+        if not presentes:
+            continue
+        extras = set().union(*(frame[coluna].cat.categories for frame in presentes)) - set(vocabulary)
+        categories = list(vocabulary) + sorted(extras)
+        for i, frame in enumerate(frames):
+            if coluna in frame.columns:
+                frames[i] = frame.assign(**{coluna: as_category(frame[coluna], vocabulary, categories)})
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_table(df):
+    """Converte os registros para uma tabela Arrow no SCHEMA (só as colunas presentes)."""
+    df = compact_frame(df)
+    schema = pa.schema([field for field in SCHEMA if field.name in df.columns])
+    return pa.Table.from_pandas(df[[f.name for f in schema]], schema=schema, preserve_index=False)
+
+
+def from_table(table):
+    """Converte uma tabela Arrow lida do Parquet para a representação compacta do pandas."""
+    return compact_frame(table.to_pandas(date_as_object=False))
+
+
+def as_text(df):
+    """Cópia com todas as colunas como texto (vazio no lugar de nulos), para prompts e busca."""
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime("%Y-%m-%d")
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(object)
+        colunas[coluna] = serie.where(serie.notna(), "").astype(str)
+    return pd.DataFrame(colunas, index=df.index)
@@ -0,0 +1,227 @@
+import re
+import math
+import logging
+import functools
+import threading
+import numpy as np
+import pandas as pd
+from src.cache import normalize_question
+from src.storage import CHAVE_DEDUP
+from src.records import as_text
+from src.analyst_state import SEPARADOR
+
+# campos indexados pela busca textual e campos que aceitam filtro exato
+CAMPOS_TEXTO = ["Descrição breve do golpe", "Tipo do golpe", "Canal utilizado", "Público alvo"]
+CAMPOS_FILTRO = {"tipo": "Tipo do golpe", "canal": "Canal utilizado", "publico": "Público alvo"}
+
+STOPWORDS = set("""
+a ao aos as com como da das de do dos e em é na nas no nos o os ou para pela pelas pelo pelos por
+que qual quais quando se sem sobre um uma umas uns mais muito eu me meu minha voce voces ele ela
+isso esse essa este esta ser sao foi tem ter ha
+""".split())
+
+
+@functools.lru_cache(maxsize=65536)
+def tokenize(text):
+    """Quebra o texto em termos normalizados (sem acentos, minúsculos e sem stopwords).
+
+    Os campos categóricos se repetem muito entre os registros, por isso o resultado fica em cache.
+    """
+    return tuple(t for t in re.findall(r"\w+", normalize_question(text)) if len(t) > 1 and t not in STOPWORDS)
+
+
+class RetrievalIndex:
+    """Índice invertido BM25 sobre os registros do engenheiro, atualizado de forma incremental.
+
+    Os documentos são identificados pela chave de deduplicação (Fonte, Data da notícia); um
+    registro que reaparece substitui o anterior, como na leitura do dataset.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.logger = logging.getLogger(__name__)
+        self.k1 = k1
+        self.b = b
+        self.seq = -1
+        self.records = []       # doc_id -> registro (um registro substituído reaproveita o doc_id)
+        self.doc_terms = []     # doc_id -> {termo: frequência}
+        self.doc_lengths = []
+        self.doc_ids = {}       # chave de deduplicação -> doc_id
+        self.postings = {}      # termo -> {doc_id: frequência}
+        self.filters = {campo: {} for campo in CAMPOS_FILTRO.values()}  # campo -> valor -> {doc_id}
+        self.total_length = 0
+        self._lengths = None    # doc_lengths como array, recalculado após cada add
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _remove(self, doc_id):
+        for term in self.doc_terms[doc_id]:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+        for campo, valores in self.filters.items():
+            valores.get(self.records[doc_id].get(campo), set()).discard(doc_id)
+        self.total_length -= self.doc_lengths[doc_id]
+
+    def add(self, df):
+        """Indexa (ou substitui) os registros de um DataFrame do engenheiro."""
+        if df is None or df.empty:
+            return 0
+        df = as_text(df)
+        colunas = list(df.columns)
+        with self._lock:
+            # zip sobre as listas das colunas é bem mais rápido que to_dict("records")
+            for valores in zip(*(df[c].tolist() for c in colunas)):
+                record = dict(zip(colunas, valores))
+                key = tuple(record.get(c, "") for c in CHAVE_DEDUP)
+                doc_id = self.doc_ids.get(key)
+                if doc_id is None:
+                    doc_id = len(self.records)
+                    self.doc_ids[key] = doc_id
+                    self.records.append(None)
+                    self.doc_terms.append({})
+                    self.doc_lengths.append(0)
+                else:
+                    self._remove(doc_id)
+
+                terms = {}
+                for campo in CAMPOS_TEXTO:
+                    for term in tokenize(record.get(campo, "")):
+                        terms[term] = terms.get(term, 0) + 1
+                for term, freq in terms.items():
+                    self.postings.setdefault(term, {})[doc_id] = freq
+                for campo in self.filters:
+                    self.filters[campo].setdefault(record.get(campo, ""), set()).add(doc_id)
+
+                self.records[doc_id] = record
+                self.doc_terms[doc_id] = terms
+                self.doc_lengths[doc_id] = sum(terms.values())
+                self.total_length += self.doc_lengths[doc_id]
+            self._lengths = None
+        return len(df)
+
+    def refresh(self, dataset):
+        """Indexa apenas os arquivos do dataset gravados depois da última atualização."""
+        max_seq = dataset.max_seq()
+        if max_seq <= self.seq:
+            return 0
+        # compactações geram arquivos novos com os mesmos registros; a chave evita duplicá-los
+        novos = dataset.read(since_seq=self.seq if self.seq >= 0 else None)
+        added = self.add(novos)
+        self.seq = max_seq
+        self.logger.info(f"Índice de busca atualizado com {added} registros ({len(self)} no total)")
+        return added
+
+    def search(self, query, k=5, **filters):
+        """Retorna os k registros mais relevantes para a consulta, como DataFrame.
+
+        filters aceita tipo, canal e publico com valores exatos (ex.: tipo="Golpe do Pix").
+        """
+        with self._lock:
+            candidatos = None
+            for nome, valor in filters.items():
+                if valor is None:
+                    continue
+                ids = self.filters[CAMPOS_FILTRO[nome]].get(valor, set())
+                candidatos = ids if candidatos is None else candidatos & ids
+            if candidatos is not None and not candidatos:
+                return pd.DataFrame()
+
+            n_docs = len(self.doc_ids)
+            if n_docs == 0:
+                return pd.DataFrame()
+            avgdl = self.total_length / n_docs
+            if self._lengths is None:
+                self._lengths = np.asarray(self.doc_lengths, dtype=float)
+            lengths = self._lengths
+            scores = np.zeros(len(self.records))
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                ids = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+                tfs = np.fromiter(posting.values(), dtype=float, count=len(posting))
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[ids] / avgdl)
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            if candidatos is not None:
+                mascara = np.zeros(len(self.records), dtype=bool)
+                mascara[list(candidatos)] = True
+                scores[~mascara] = -1.0
+                # com filtros, registros sem termos em comum ainda são úteis como exemplos
+                elegiveis = np.flatnonzero(mascara)
+            else:
+                elegiveis = np.flatnonzero(scores > 0)
+            if len(elegiveis) == 0:
+                return pd.DataFrame()
+            k = min(k, len(elegiveis))
+            top = elegiveis[np.argsort(-scores[elegiveis], kind="stable")[:k]]
+            return pd.DataFrame([self.records[i] for i in top])
+
+
+def mentioned_values(question, analysis):
+    """Valores de tipo, canal e público citados na pergunta (comparação sem acentos)."""
+    palavras = lambda texto: " " + " ".join(re.findall(r"\w+", normalize_question(texto))) + " "
+    texto = palavras(question)
+    encontrados = {}
+    for nome, dimensao in (("tipo", "golpes_por_tipo"), ("canal", "golpes_por_canal"), ("publico", "golpes_por_publico")):
+        valores = [v for v in analysis.get(dimensao, {}) if palavras(v) in texto]
+        if valores:
+            # o valor mais longo é o mais específico ("Golpe do Pix" em vez de "PIX")
+            encontrados[nome] = max(valores, key=len)
+    return encontrados
+
+
+def aggregate_slices(analysis, tipo=None, canal=None, publico=None, limit=3):
+    """Recortes das métricas agregadas para os valores informados.
+
+    Retorna {rótulo: {chave: contagem}} com as contagens do valor e, para um tipo, os canais,
+    públicos e meses mais frequentes desse tipo.
+    """
+    slices = {}
+    for nome, valor, dimensao in (
+        ("tipo", tipo, "golpes_por_tipo"),
+        ("canal", canal, "golpes_por_canal"),
+        ("publico", publico, "golpes_por_publico"),
+    ):
+        if valor is not None and valor in analysis.get(dimensao, {}):
+            slices[f"Total para {nome} {valor}"] = {valor: analysis[dimensao][valor]}
+
+    if tipo is not None:
+        for rotulo, dimensao, posicao in (
+            (f"Canais mais usados em {tipo}", "golpes_por_tipo_canal", 0),
+            (f"Públicos mais atingidos por {tipo}", "golpes_por_tipo_publico", 0),
+            (f"Casos por mês de {tipo}", "tendencias_mensais_por_tipo", 1),
+        ):
+            recorte = {}
+            for chave, contagem in analysis.get(dimensao, {}).items():
+                partes = chave.split(SEPARADOR)
+                if len(partes) == 2 and partes[posicao] == tipo:
+                    recorte[partes[1 - posicao]] = contagem
+            if recorte:
+                if posicao == 1:
+                    slices[rotulo] = dict(sorted(recorte.items()))
+                else:
+                    slices[rotulo] = dict(sorted(recorte.items(), key=lambda x: x[1], reverse=True)[:limit])
+    return slices
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_retrieval_index(data_dir="data"):
+    """Retorna o índice de busca compartilhado para o diretório informado."""
+    with _indexes_lock:
+        if data_dir not in _indexes:
+            _indexes[data_dir] = RetrievalIndex()
+        return _indexes[data_dir]
+
+
+def reset_retrieval_index(data_dir="data"):
+    """Descarta o índice compartilhado do diretório; o próximo get_retrieval_index cria um vazio."""
+    with _indexes_lock:
+        _indexes.pop(data_dir, None)
@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import datetime
+from contextlib import contextmanager
+from src.utils import setup_logging
+from src.locks import FileLock
+from src.orchestrator import Orchestrator, PipelineBusyError
+
+setup_logging()
+
+
+def parse_interval(text):
+    """Converte intervalos como "90s", "30m", "6h" ou "1d" (ou só segundos) em segundos."""
+    text = str(text).strip().lower()
+    unidades = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text and text[-1] in unidades:
+        return float(text[:-1]) * unidades[text[-1]]
+    return float(text)
+
+
+class CronSchedule:
+    """Subconjunto do cron: "minuto hora dia mês dia-da-semana" com *, n/passo, listas e intervalos.
+
+    Como no cron, quando o dia do mês e o dia da semana são ambos restritos (nenhum começa com
+    "*"), basta um deles bater: "0 9 1 * 1" roda no dia 1 e em toda segunda-feira. No dia da
+    semana, 0 e 7 são domingo. Valores fora dos limites levantam ValueError com o nome do campo.
+    """
+
+    CAMPOS = ["minuto", "hora", "dia do mês", "mês", "dia da semana"]
+    LIMITES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        campos = expression.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron inválida: {expression}")
+        self.expression = expression
+        self.fields = [
+            self._parse(campo, nome, *limite) for campo, nome, limite in zip(campos, self.CAMPOS, self.LIMITES)
+        ]
+        # 7 também é domingo
+        if 7 in self.fields[4]:
+            self.fields[4] = (self.fields[4] - {7}) | {0}
+        self.day_or_weekday = not campos[2].startswith("*") and not campos[4].startswith("*")
+
+    @staticmethod
+    def _parse(campo, nome, minimo, maximo):
+        valores = set()
+        for parte in campo.split(","):
+            try:
+                passo = 1
+                if "/" in parte:
+                    parte, passo = parte.split("/")
+                    passo = int(passo)
+                    if passo < 1:
+                        raise ValueError
+                if parte == "*":
+                    inicio, fim = minimo, maximo
+                elif "-" in parte:
+                    inicio, fim = map(int, parte.split("-"))
+                else:
+                    # "n/passo" vai de n até o fim do campo, como no cron
+                    inicio = int(parte)
+                    fim = maximo if passo > 1 else inicio
+            except ValueError:
+                raise ValueError(f"Campo {nome} inválido na expressão cron: {campo}") from None
+            if not minimo <= inicio <= fim <= maximo:
+                raise ValueError(f"Campo {nome} fora do intervalo {minimo}-{maximo} na expressão cron: {campo}")
+            valores.update(range(inicio, fim + 1, passo))
+        return valores
+
+    def next_after(self, moment):
+        """Próximo horário (com precisão de minuto) estritamente depois de moment."""
+        candidato = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        minutos, horas, dias, meses, semana = self.fields
+        for _ in range(366 * 24 * 60):
+            # no cron, domingo é 0; no Python, segunda é 0
+            no_dia = candidato.day in dias
+            no_dia_da_semana = (candidato.weekday() + 1) % 7 in semana
+            dia = (no_dia or no_dia_da_semana) if self.day_or_weekday else (no_dia and no_dia_da_semana)
+            if candidato.minute in minutos and candidato.hour in horas and candidato.month in meses and dia:
+                return candidato
+            candidato += datetime.timedelta(minutes=1)
+        raise ValueError(f"Nenhum horário encontrado para {self.expression}")
+
+
+class RunHistory:
+    """Histórico persistido (SQLite) das execuções da pipeline."""
+
+    def __init__(self, path=os.path.join("data", "run_history.sqlite")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at TEXT NOT NULL,
+                    finished_at TEXT,
+                    status TEXT NOT NULL,
+                    records_fetched INTEGER,
+                    new_rows INTEGER,
+                    duplicate_rows INTEGER,
+                    engineer_seconds REAL,
+                    analyst_seconds REAL,
+                    duration_seconds REAL,
+                    error TEXT
+                )"""
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, started_at, finished_at, status, stats=None, error=None):
+        stats = stats or {}
+        stages = stats.get("stages", {})
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs (started_at, finished_at, status, records_fetched, new_rows, duplicate_rows, "
+                "engineer_seconds, analyst_seconds, duration_seconds, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    started_at.isoformat(timespec="seconds"),
+                    finished_at.isoformat(timespec="seconds"),
+                    status,
+                    stats.get("records_fetched"),
+                    stats.get("new_rows"),
+                    stats.get("duplicate_rows"),
+                    stages.get("engineer"),
+                    stages.get("analyst"),
+                    (finished_at - started_at).total_seconds(),
+                    error,
+                ),
+            )
+
+    def latest(self, limit=20):
+        """Retorna as últimas execuções como lista de dicionários."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+class Scheduler:
+    """Executa a pipeline periodicamente (intervalo ou cron), com instância única e sem sobreposição."""
+
+    def __init__(self, orchestrator=None, interval=None, cron=None, data_dir="data"):
+        if (interval is None) == (cron is None):
+            raise ValueError("Informe exatamente um entre interval e cron")
+        self.logger = logging.getLogger(__name__)
+        self.orchestrator = orchestrator or Orchestrator()
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.history = RunHistory(os.path.join(data_dir, "run_history.sqlite"))
+        self.instance_lock = FileLock(os.path.join(data_dir, "scheduler.lock"))
+
+    def next_run(self, after):
+        if self.cron:
+            return self.cron.next_after(after)
+        return after + datetime.timedelta(seconds=self.interval)
+
+    def run_once(self):
+        """Executa a pipeline uma vez e grava o resultado no histórico."""
+        started_at = datetime.datetime.now()
+        try:
+            self.orchestrator.run_pipeline()
+            status, error, stats = "success", None, self.orchestrator.last_run_stats
+        except PipelineBusyError as e:
+            # outra execução (ex.: manual ou pelo app) ainda está rodando
+            status, error, stats = "skipped", str(e), None
+        except Exception as e:
+            self.logger.error(f"Erro na execução agendada da pipeline: {e}")
+            status, error, stats = "error", str(e), None
+        self.history.record(started_at, datetime.datetime.now(), status, stats, error)
+        self.logger.info(f"Execução agendada finalizada com status {status}")
+        return status
+
+    def run_forever(self):
+        """Laço principal do agendador; retorna False se já houver outra instância rodando."""
+        if not self.instance_lock.acquire():
+            self.logger.error("Outra instância do agendador já está em execução")
+            return False
+        try:
+            proxima = self.next_run(datetime.datetime.now()) if self.cron else datetime.datetime.now()
+            while True:
+                espera = (proxima - datetime.datetime.now()).total_seconds()
+                if espera > 0:
+                    self.logger.info(f"Próxima execução da pipeline em {proxima:%Y-%m-%d %H:%M:%S}")
+                    time.sleep(espera)
+                self.run_once()
+                # o próximo horário é calculado após o término, então execuções nunca se sobrepõem
+                proxima = self.next_run(datetime.datetime.now() if self.cron else proxima)
+                if proxima < datetime.datetime.now():
+                    proxima = self.next_run(datetime.datetime.now())
+        except KeyboardInterrupt:
+            self.logger.info("Agendador interrompido")
+        finally:
+            self.instance_lock.release()
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agendador da pipeline do Guardião")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--interval", help='Intervalo entre execuções (ex.: "30m", "6h")')
+    grupo.add_argument("--cron", help='Expressão cron (ex.: "0 */6 * * *")')
+    grupo.add_argument("--once", action="store_true", help="Executa uma única vez e registra no histórico")
+    grupo.add_argument("--history", action="store_true", help="Mostra as últimas execuções")
+    args = parser.parse_args(argv)
+
+    if args.history:
+        for run in RunHistory().latest():
+            print(run)
+        return 0
+    if args.once:
+        return 0 if Scheduler(interval=0).run_once() == "success" else 1
+    scheduler = Scheduler(interval=parse_interval(args.interval) if args.interval else None, cron=args.cron)
+    return 0 if scheduler.run_forever() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import re
+import math
+import logging
+import threading
+from collections import deque
+from src.cache import normalize_question
+from src.records import TIPOS_GOLPE
+from src.instrumentation import get_metrics
+
+# palavras sem peso na comparação das perguntas
+STOPWORDS = set("""
+a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelo por que um uma
+me meu minha eu se sobre qual quais quando onde voce voces isso esse essa este esta sao ser
+""".split())
+
+# sinônimos levados a um termo canônico; definem a "ação" da intenção
+ACOES = {
+    "prevencao": ["evitar", "prevenir", "proteger", "protejo", "previno", "evito", "prevencao", "protecao",
+                  "defender", "seguranca", "cuidado", "cuidados", "dicas"],
+    "definicao": ["funciona", "significa", "definicao", "explique", "explica", "entender", "oque"],
+    "identificacao": ["identificar", "reconhecer", "sinais", "perceber", "desconfiar", "detectar"],
+    "vitima": ["cai", "caí", "vitima", "fui", "roubado", "perdi", "recuperar", "denunciar", "fazer"],
+    "estatistica": ["quantos", "quantidade", "comum", "comuns", "frequente", "frequentes", "mais", "numero", "casos"],
+}
+SINONIMOS = {palavra: acao for acao, palavras in ACOES.items() for palavra in palavras}
+
+
+def char_ngrams(text, n=3):
+    """N-gramas de caracteres de cada palavra (com bordas), como no char_wb do scikit-learn."""
+    grams = {}
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - n + 1)):
+            gram = padded[i:i + n]
+            grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+
+def _cosine(a, b):
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class SemanticCache:
+    """Camada de similaridade na frente do ResponseCache, para reaproveitar respostas de paráfrases.
+
+    Cada pergunta é levada a uma intenção canônica: o tipo de golpe do vocabulário (comparado por
+    n-gramas de caracteres, tolerando variações de escrita) e a ação pedida (prevenção, definição...).
+    Só perguntas com a mesma intenção são comparadas, pela similaridade de cosseno dos vetores TF-IDF de
+    n-gramas do texto canônico; acima de threshold, a resposta guardada é devolvida sem chamar o LLM.
+    """
+
+    def __init__(self, cache, threshold=0.75, type_threshold=0.8, vocabulary=TIPOS_GOLPE):
+        self.logger = logging.getLogger(__name__)
+        self.cache = cache
+        self.threshold = threshold
+        self.type_threshold = type_threshold
+        # vocabulário normalizado -> valor original, com os n-gramas de cada tipo
+        self.vocabulary = {self.canonical_text(v, keep_actions=False): v for v in vocabulary}
+        self.vocabulary_grams = {v: set(char_ngrams(texto)) for texto, v in self.vocabulary.items()}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.similarities = deque(maxlen=10000)  # melhor similaridade das últimas consultas, para calibrar o limiar
+        self._vectors = {}      # pergunta normalizada -> (intenção, n-gramas)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def canonical_text(question, keep_actions=True):
+        """Texto sem acentos, sem stopwords e com os sinônimos de ação trocados pelo termo canônico."""
+        texto = re.sub(r"\bo que\b", "oque", normalize_question(question))
+        palavras = []
+        for palavra in re.findall(r"\w+", texto):
+            if palavra in STOPWORDS:
+                continue
+            if keep_actions and palavra in SINONIMOS:
+                palavra = SINONIMOS[palavra]
+            palavras.append(palavra)
+        return " ".join(palavras)
+
+    def fraud_type(self, question):
+        """Tipo de golpe do vocabulário citado na pergunta (ou None), pela cobertura dos n-gramas do tipo."""
+        grams = set(char_ngrams(self.canonical_text(question, keep_actions=False)))
+        melhor, melhor_score = None, 0.0
+        for valor, type_grams in self.vocabulary_grams.items():
+            score = len(type_grams & grams) / len(type_grams)
+            # em empate, o tipo mais longo é o mais específico
+            if score > melhor_score or (score == melhor_score and melhor and len(valor) > len(melhor)):
+                melhor, melhor_score = valor, score
+        return melhor if melhor_score >= self.type_threshold else None
+
+    def intent(self, question):
+        """Intenção canônica: (tipo de golpe ou None, ações pedidas)."""
+        texto = self.canonical_text(question)
+        acoes = tuple(sorted({palavra for palavra in texto.split() if palavra in ACOES}))
+        return self.fraud_type(question), acoes
+
+    def _vector(self, question):
+        chave = normalize_question(question)
+        if chave not in self._vectors:
+            if len(self._vectors) >= 10000:
+                self._vectors.clear()
+            self._vectors[chave] = (self.intent(question), char_ngrams(self.canonical_text(question)))
+        return self._vectors[chave]
+
+    def _tfidf(self, grams, df, n_docs):
+        return {g: tf * (math.log((1 + n_docs) / (1 + df.get(g, 0))) + 1) for g, tf in grams.items()}
+
+    def best_match(self, question, version):
+        """Retorna (similaridade, pergunta, resposta) da entrada de mesma intenção mais parecida."""
+        intent, grams = self._vector(question)
+        candidatos = []
+        for stored_question, response in self.cache.entries(version):
+            stored_intent, stored_grams = self._vector(stored_question)
+            if stored_intent == intent:
+                candidatos.append((stored_question, response, stored_grams))
+        if not candidatos:
+            return 0.0, None, None
+
+        # IDF calculado sobre as perguntas candidatas e a própria consulta
+        df = {}
+        for _, _, stored_grams in candidatos:
+            for gram in stored_grams:
+                df[gram] = df.get(gram, 0) + 1
+        n_docs = len(candidatos) + 1
+        for gram in grams:
+            df[gram] = df.get(gram, 0) + 1
+        consulta = self._tfidf(grams, df, n_docs)
+        melhor = (0.0, None, None)
+        for stored_question, response, stored_grams in candidatos:
+            score = _cosine(consulta, self._tfidf(stored_grams, df, n_docs))
+            if score > melhor[0]:
+                melhor = (score, stored_question, response)
+        return melhor
+
+    def get(self, question, version):
+        """Busca exata e, se falhar, por similaridade; None se nada passar do limiar."""
+        response = self.cache.get(question, version)
+        if response is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return response
+
+        try:
+            score, stored_question, response = self.best_match(question, version)
+        except Exception as e:
+            self.logger.error(f"Erro na busca semântica do cache: {e}")
+            score, stored_question, response = 0.0, None, None
+        hit = response is not None and score >= self.threshold
+        with self._lock:
+            self.similarities.append(round(score, 4))
+            if hit:
+                self.semantic_hits += 1
+            else:
+                self.misses += 1
+        get_metrics().record_cache(hit, cache="semantic", similarity=round(score, 4))
+        if not hit:
+            return None
+        self.logger.info(f"Pergunta '{question}' respondida pela semelhante '{stored_question}' ({score:.2f})")
+        # guarda a paráfrase para que a próxima consulta igual seja um acerto exato
+        self.cache.set(question, version, response)
+        return response
+
+    def set(self, question, version, response):
+        self.cache.set(question, version, response)
+
+    def stats(self):
+        """Acertos exatos e semânticos, taxa de acerto e distribuição das similaridades (faixas de 0.1)."""
+        with self._lock:
+            total = self.exact_hits + self.semantic_hits + self.misses
+            histogram = {}
+            for score in self.similarities:
+                faixa = f"{min(int(score * 10), 9) / 10:.1f}"
+                histogram[faixa] = histogram.get(faixa, 0) + 1
+            return {
+                **self.cache.stats(),
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "semantic_misses": self.misses,
+                "total_hit_rate": (self.exact_hits + self.semantic_hits) / total if total else 0.0,
+                "similarity_histogram": dict(sorted(histogram.items())),
+            }
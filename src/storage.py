@@ -0,0 +1,719 @@
+import os
+import re
+import glob
+import uuid
+import sqlite3
+import logging
+import argparse
+import datetime
+import operator
+import functools
+import itertools
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from src.utils import setup_logging, load_config
+from src.locks import FileLock
+from src.records import COLUNAS_DICIONARIO, COLUNA_DATA, compact_frame, concat_compact, to_table, from_table
+
+setup_logging()
+
+CHAVE_DEDUP = ["Fonte", "Data da notícia"]
+_ARQUIVO = re.compile(r"^(part|compact)-(\d+)-[0-9a-f]+\.parquet$")
+# linhas por grupo nos arquivos do engenheiro: cada grupo é a menor unidade descartada por um filtro
+ROW_GROUP_ROWS = 65_536
+# ordem das linhas na escrita: cada grupo de linhas cobre um intervalo curto de datas (e de tipos)
+ORDEM_ESCRITA = [COLUNA_DATA, "Tipo do golpe"]
+# metadado dos arquivos gravados já deduplicados (sem chave repetida dentro do arquivo)
+_CHAVES_UNICAS = b"guardiao.unique_keys"
+
+# filtros aceitos por select/count dos backends: nome -> coluna do engineer_data
+FILTROS = {"tipo": "Tipo do golpe", "canal": "Canal utilizado", "publico": "Público alvo"}
+# agrupamentos aceitos por count: os filtros, o dia e o mês ("YYYY-MM") da notícia
+AGRUPAMENTOS = [*FILTROS, "data", "mes"]
+
+
+def filter_frame(df, tipo=None, canal=None, publico=None, date_from=None, date_to=None):
+    """Aplica os filtros de select/count a um DataFrame do engenheiro (datas "YYYY-MM-DD", inclusivas)."""
+    if df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for nome, valor in (("tipo", tipo), ("canal", canal), ("publico", publico)):
+        if valor is not None:
+            mask &= df[FILTROS[nome]] == valor
+    datas = df[COLUNA_DATA]
+    if date_from is not None:
+        mask &= datas >= pd.Timestamp(date_from)
+    if date_to is not None:
+        mask &= datas <= pd.Timestamp(date_to)
+    return df[mask]
+
+
+def _date32(valor):
+    return pa.scalar(pd.Timestamp(valor).date(), pa.date32())
+
+
+def filter_expression(tipo=None, canal=None, publico=None, date_from=None, date_to=None):
+    """Expressão do pyarrow.dataset equivalente a filter_frame (None se não há filtros)."""
+    condicoes = []
+    for nome, valor in (("tipo", tipo), ("canal", canal), ("publico", publico)):
+        if valor is not None:
+            condicoes.append(ds.field(FILTROS[nome]) == valor)
+    if date_from is not None:
+        condicoes.append(ds.field(COLUNA_DATA) >= _date32(date_from))
+    if date_to is not None:
+        condicoes.append(ds.field(COLUNA_DATA) <= _date32(date_to))
+    return functools.reduce(operator.and_, condicoes) if condicoes else None
+
+
+def _keys(df):
+    """Colunas da chave com tipos fixos (arquivos antigos e novos podem trazer a data em unidades diferentes)."""
+    return pd.DataFrame({"Fonte": df["Fonte"].astype(str), COLUNA_DATA: df[COLUNA_DATA].astype("datetime64[ns]")})
+
+
+def group_counts(df, by):
+    """Contagens de um DataFrame do engenheiro agrupadas pelos nomes de AGRUPAMENTOS."""
+    colunas = {}
+    for nome in by:
+        if nome in FILTROS:
+            colunas[nome] = df[FILTROS[nome]]
+        elif nome == "data":
+            colunas[nome] = df[COLUNA_DATA].dt.strftime("%Y-%m-%d")
+        elif nome == "mes":
+            colunas[nome] = df[COLUNA_DATA].dt.strftime("%Y-%m")
+        else:
+            raise ValueError(f"Agrupamento desconhecido: {nome}")
+    counts = pd.DataFrame(colunas).groupby(list(by), sort=True).size()
+    return counts.rename("count").reset_index()
+
+
+def atomic_write_parquet(df, path, row_group_rows=ROW_GROUP_ROWS):
+    """Grava registros do engenheiro em Parquet via arquivo temporário + rename (nunca deixa arquivo pela metade).
+
+    Categorias e impacto vão com dicionário, a data como date32 e todas as colunas com estatísticas
+    (mínimo/máximo por grupo de linhas), em zstd. As linhas são deduplicadas pela chave e ordenadas
+    por data e tipo, para que as estatísticas de cada grupo sejam estreitas e os filtros de leitura
+    descartem a maior parte dos grupos.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        df = compact_frame(df)
+        unicas = set(CHAVE_DEDUP) <= set(df.columns)
+        if unicas:
+            df = df.drop_duplicates(subset=CHAVE_DEDUP, keep="last")
+        ordem = [c for c in ORDEM_ESCRITA if c in df.columns]
+        if ordem and not df.empty:
+            # categorias ordenadas pelo texto, que é o que as estatísticas do Parquet comparam
+            texto = lambda s: s.astype(object).fillna("") if isinstance(s.dtype, pd.CategoricalDtype) else s
+            df = df.sort_values(ordem, key=texto, kind="stable")
+        table = to_table(df)
+        if unicas:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _CHAVES_UNICAS: b"1"})
+        dicionario = [c for c in COLUNAS_DICIONARIO if c in table.column_names]
+        pq.write_table(
+            table, tmp_path, row_group_size=row_group_rows, use_dictionary=dicionario,
+            write_statistics=True, compression="zstd",
+        )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class EngineerDataset:
+    """Dataset particionado e append-only dos registros do engenheiro.
+
+    Layout: data/engineer_data/ingest_month=YYYY-MM/part-<seq>-<id>.parquet. Cada lote vira
+    um arquivo pequeno com número de sequência crescente; a deduplicação por (Fonte, Data da
+    notícia) é aplicada na leitura (mantendo a versão mais recente) e na compactação.
+
+    select/count/scan empurram a projeção e os filtros para o pyarrow: grupos de linhas cujas
+    estatísticas não batem com o filtro não são lidos. Com memory_map, os arquivos são mapeados na
+    memória em vez de lidos com read().
+    """
+
+    backend = "parquet"
+    unique_keys = False  # a mesma chave pode aparecer em mais de um arquivo até a compactação
+
+    def __init__(self, data_dir="data", name="engineer_data", row_group_rows=ROW_GROUP_ROWS, memory_map=False):
+        self.logger = logging.getLogger(__name__)
+        self.data_dir = data_dir
+        self.root = os.path.join(data_dir, name)
+        self.legacy_path = os.path.join(data_dir, f"{name}.parquet")
+        self.row_group_rows = row_group_rows
+        self.memory_map = memory_map
+        self._filesystem = pafs.LocalFileSystem(use_mmap=memory_map)
+
+    def files(self):
+        """Lista (sequência, caminho) dos arquivos do dataset, em ordem de escrita.
+
+        O antigo engineer_data.parquet, enquanto não for migrado, entra como sequência 0 (anterior
+        a todas as partes); os leitores o leem como está, sem regravá-lo.
+        """
+        arquivos = [(0, False, self.legacy_path)] if os.path.exists(self.legacy_path) else []
+        for path in glob.glob(os.path.join(self.root, "ingest_month=*", "*.parquet")):
+            match = _ARQUIVO.match(os.path.basename(path))
+            if match:
+                # em caso de empate, o arquivo compactado vem antes das partes que ele substitui
+                arquivos.append((int(match.group(2)), match.group(1) == "part", path))
+        return [(seq, path) for seq, _, path in sorted(arquivos)]
+
+    def signature(self):
+        """Identifica o estado atual do dataset (arquivos, mtime e tamanho)."""
+        assinatura = []
+        for _, path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            assinatura.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(assinatura)
+
+    def max_seq(self):
+        """Maior número de sequência escrito (0 se o dataset está vazio)."""
+        arquivos = self.files()
+        return arquivos[-1][0] if arquivos else 0
+
+    def num_files(self):
+        return len(self.files())
+
+    def migrate_legacy(self):
+        """Regrava o antigo engineer_data.parquet (arquivo único) como a parte de sequência 0 do dataset.
+
+        Só deve ser chamado por quem escreve com a trava da pipeline (ou pela linha de comando):
+        a parte é gravada antes de o arquivo antigo ser removido, e a sequência 0 é a mesma com
+        que os leitores já o viam, então o estado incremental do analista continua válido.
+        """
+        if not os.path.exists(self.legacy_path):
+            return
+        df = pd.read_parquet(self.legacy_path, engine="pyarrow")
+        self._write_part(df, seq=0)
+        os.remove(self.legacy_path)
+        self.logger.info(f"{len(df)} registros migrados de {self.legacy_path} para {self.root}")
+
+    def append(self, df):
+        """Grava um lote como um novo arquivo da partição do mês de ingestão."""
+        if df.empty:
+            return None
+        return self._write_part(df)
+
+    def _write_part(self, df, seq=None):
+        seq = self.max_seq() + 1 if seq is None else seq
+        partition = f"ingest_month={datetime.datetime.now().strftime('%Y-%m')}"
+        path = os.path.join(self.root, partition, f"part-{seq:012d}-{uuid.uuid4().hex[:8]}.parquet")
+        atomic_write_parquet(df, path, self.row_group_rows)
+        return path
+
+    def select(self, columns=None, limit=None, **filters):
+        """Registros que passam pelos filtros (tipo, canal, publico, date_from, date_to)."""
+        grupos = self._groups()
+        if limit is not None and len(grupos) <= 1:
+            # uma única sequência (ex.: logo após a compactação) não tem chaves substituídas, então
+            # a leitura para assim que as primeiras limit linhas aparecem
+            return self._head(grupos[0] if grupos else [], columns, limit, filters)
+        df = self.scan(columns, **filters)
+        return df.head(limit) if limit is not None else df
+
+    def _head(self, paths, columns, limit, filters):
+        """Primeiras limit linhas dos arquivos, na ordem, sem ler os arquivos e lotes seguintes."""
+        frames, faltam = [], limit
+        for path in paths:
+            if faltam <= 0:
+                break
+            try:
+                dataset = self._open(path)
+                if self._pushdown(dataset):
+                    df = from_table(dataset.head(faltam, columns=columns, filter=filter_expression(**filters)))
+                else:
+                    df = self._scan_file(path, columns, filters).head(faltam)
+            except FileNotFoundError:
+                # arquivo removido por uma compactação concorrente; o conteúdo está no compactado
+                continue
+            frames.append(df)
+            faltam -= len(df)
+        df = concat_compact(frames)
+        return df[list(columns)] if columns is not None and not df.empty else df
+
+    def count(self, by=None, **filters):
+        """Número de registros que passam pelos filtros; com by, um DataFrame por grupo."""
+        by = list(by or [])
+        desconhecidos = [nome for nome in by if nome not in AGRUPAMENTOS]
+        if desconhecidos:
+            raise ValueError(f"Agrupamento desconhecido: {desconhecidos[0]}")
+        # só as colunas dos agrupamentos (e a chave, lida sempre) saem dos arquivos
+        df = self.scan([FILTROS[nome] if nome in FILTROS else COLUNA_DATA for nome in by], **filters)
+        if not by:
+            return len(df)
+        if df.empty:
+            return pd.DataFrame(columns=[*by, "count"])
+        return group_counts(df, by)
+
+    def _open(self, path, dictionary=False):
+        """Abre um arquivo como pyarrow.dataset (lê só o rodapé); dictionary devolve as categorias como dicionário.
+
+        O dicionário só é pedido em leituras sem filtro: com ele, o pyarrow deixa de usar as
+        estatísticas das categorias para descartar grupos de linhas.
+        """
+        options = ds.ParquetReadOptions(dictionary_columns=COLUNAS_DICIONARIO) if dictionary else None
+        return ds.dataset(path, format=ds.ParquetFileFormat(read_options=options), filesystem=self._filesystem)
+
+    @staticmethod
+    def _pushdown(dataset):
+        """Se o arquivo aceita filtros no pyarrow: data como date32 e chaves únicas (gravado por atomic_write_parquet)."""
+        schema = dataset.schema
+        return schema.field(COLUNA_DATA).type == pa.date32() and _CHAVES_UNICAS in (schema.metadata or {})
+
+    def _read_file(self, path, columns=None):
+        if columns is not None:
+            # a chave é sempre lida, para a deduplicação
+            columns = list(dict.fromkeys([*CHAVE_DEDUP, *columns]))
+        return from_table(self._open(path, dictionary=True).to_table(columns=columns))
+
+    def _scan_file(self, path, columns, filters, fontes=None):
+        """Linhas de um arquivo que passam pelos filtros, já sem chaves repetidas dentro do arquivo.
+
+        fontes restringe a leitura a essas URLs (usado na busca das chaves dos candidatos).
+        Arquivos gravados antes da ordenação (data como texto ou chaves repetidas) são lidos por
+        inteiro e filtrados no pandas.
+        """
+        dataset = self._open(path)
+        if self._pushdown(dataset):
+            expression = filter_expression(**filters)
+            if fontes is not None:
+                na_lista = ds.field("Fonte").isin(fontes)
+                expression = na_lista if expression is None else expression & na_lista
+            return from_table(dataset.to_table(columns=columns, filter=expression))
+        # as colunas dos filtros são lidas mesmo fora da projeção
+        usadas = None if columns is None else [
+            *columns, COLUNA_DATA, *(FILTROS[nome] for nome in FILTROS if filters.get(nome) is not None)
+        ]
+        df = self._read_file(path, usadas).drop_duplicates(subset=CHAVE_DEDUP, keep="last")
+        df = filter_frame(df, **filters)
+        if fontes is not None and not df.empty:
+            df = df[df["Fonte"].isin(fontes.to_pylist())]
+        return df[list(columns)] if columns is not None and not df.empty else df
+
+    def scan(self, columns=None, **filters):
+        """Lê o dataset deduplicado com projeção e filtros (tipo, canal, publico, date_from, date_to).
+
+        Cada arquivo é lido só nos grupos de linhas cujas estatísticas (mínimo/máximo) podem conter
+        o filtro, então o custo acompanha o tamanho do resultado. Uma linha só é mantida se a sua
+        chave não reaparece em um arquivo mais recente: com mais de uma sequência no dataset, a
+        chave dos candidatos é procurada nos arquivos (só Fonte e data, no intervalo de datas e
+        entre as URLs dos candidatos) e vale a ocorrência mais recente.
+        """
+        colunas = None if columns is None else list(dict.fromkeys([*CHAVE_DEDUP, *columns]))
+        grupos = self._groups()
+        frames, ordem = [], []
+        for n, paths in enumerate(grupos):
+            for path in paths:
+                try:
+                    df = self._scan_file(path, colunas, filters)
+                except FileNotFoundError:
+                    # arquivo removido por uma compactação concorrente; o conteúdo está no compactado
+                    continue
+                frames.append(df)
+                ordem.append(np.full(len(df), n))
+        df = concat_compact(frames)
+        if df.empty:
+            return df
+        if len(grupos) > 1:
+            df = df[self._latest(df, np.concatenate(ordem), grupos, filters)].reset_index(drop=True)
+        return df[list(columns)] if columns is not None else df
+
+    def _groups(self):
+        """Caminhos dos arquivos agrupados por sequência; arquivos com a mesma sequência (compactados) não se sobrepõem."""
+        return [[path for _, path in g] for _, g in itertools.groupby(self.files(), key=lambda arquivo: arquivo[0])]
+
+    def _latest(self, df, ordem, grupos, filters):
+        """Máscara dos candidatos cuja chave não reaparece em uma sequência posterior."""
+        candidatos = _keys(df).assign(__grupo=ordem)
+        if all(filters.get(nome) is None for nome in FILTROS):
+            # só com filtro de data, os candidatos já são todas as chaves do intervalo
+            ocorrencias = candidatos
+        else:
+            datas = {nome: filters.get(nome) for nome in ("date_from", "date_to")}
+            fontes = pa.array(df["Fonte"].unique().astype(object), pa.string())
+            partes = []
+            for n, paths in enumerate(grupos):
+                for path in paths:
+                    try:
+                        partes.append(_keys(self._scan_file(path, CHAVE_DEDUP, datas, fontes)).assign(__grupo=n))
+                    except FileNotFoundError:
+                        continue
+            ocorrencias = pd.concat(partes, ignore_index=True)
+        ultimo = ocorrencias.groupby(CHAVE_DEDUP, sort=False, as_index=False)["__grupo"].max()
+        marcados = candidatos.merge(ultimo, on=CHAVE_DEDUP, how="left", suffixes=("", "_ultimo"))
+        return (marcados["__grupo"] == marcados["__grupo_ultimo"]).to_numpy()
+
+    def read(self, since_seq=None, columns=None):
+        """Lê o dataset deduplicado; com since_seq, só os arquivos escritos depois dessa sequência.
+
+        columns limita as colunas lidas dos arquivos (ex.: o analista não lê a descrição).
+        """
+        frames = []
+        for seq, path in self.files():
+            if since_seq is not None and seq <= since_seq:
+                continue
+            try:
+                frames.append(self._read_file(path, columns))
+            except FileNotFoundError:
+                # arquivo removido por uma compactação concorrente; o conteúdo está no compactado
+                continue
+        df = concat_compact(frames)
+        if df.empty:
+            return df
+        df = df.drop_duplicates(subset=CHAVE_DEDUP, keep="last").reset_index(drop=True)
+        return df[list(columns)] if columns is not None else df
+
+    def shards(self, max_rows=500_000):
+        """Divide o dataset em fatias (arquivo, linha inicial, linha final) de até max_rows linhas.
+
+        Grupos de linhas consecutivos do mesmo arquivo são juntados enquanto couberem em max_rows;
+        um grupo maior que max_rows é dividido em faixas de linhas. A ordem é a de escrita.
+        """
+        fatias = []
+        for _, path in self.files():
+            inicio = fim = 0
+            metadata = pq.ParquetFile(path).metadata
+            for row_group in range(metadata.num_row_groups):
+                linhas = metadata.row_group(row_group).num_rows
+                if fim > inicio and fim - inicio + linhas > max_rows:
+                    fatias.append((path, inicio, fim))
+                    inicio = fim
+                fim += linhas
+                while fim - inicio > max_rows:
+                    fatias.append((path, inicio, inicio + max_rows))
+                    inicio += max_rows
+            if fim > inicio:
+                fatias.append((path, inicio, fim))
+        return fatias
+
+    def read_shard(self, shard, columns=None):
+        """Lê uma fatia de shards() sem deduplicar (a ordem das linhas é a do arquivo).
+
+        Só os grupos de linhas que cobrem a faixa são lidos.
+        """
+        path, inicio, fim = shard
+        arquivo = pq.ParquetFile(path, read_dictionary=COLUNAS_DICIONARIO, memory_map=self.memory_map)
+        grupos, primeira, linha = [], None, 0
+        for row_group in range(arquivo.num_row_groups):
+            linhas = arquivo.metadata.row_group(row_group).num_rows
+            if linha < fim and linha + linhas > inicio:
+                primeira = linha if primeira is None else primeira
+                grupos.append(row_group)
+            linha += linhas
+        tabela = arquivo.read_row_groups(grupos, columns=columns)
+        return from_table(tabela.slice(inicio - (primeira or 0), fim - inicio))
+
+    def superseded_rows(self, shard):
+        """Posições das linhas da fatia cuja chave reaparece depois, na ordem de files() (read mantém a última).
+
+        A busca é só desta fatia: na própria fatia, no restante do arquivo (arquivos antigos podem
+        repetir chaves) e nos arquivos posteriores, lendo deles apenas a chave, no intervalo de datas
+        da fatia e entre as suas URLs. Cada processo da análise paralela chama para a sua fatia, sem
+        carregar as chaves do histórico inteiro.
+        """
+        path, inicio, fim = shard
+        chaves = _keys(self.read_shard(shard, CHAVE_DEDUP))
+        repetidas = chaves.duplicated(subset=CHAVE_DEDUP, keep="last").to_numpy()
+        partes = []
+        total = pq.ParquetFile(path).metadata.num_rows
+        if fim < total and not self._pushdown(self._open(path)):
+            partes.append(_keys(self.read_shard((path, fim, total), CHAVE_DEDUP)))
+        caminhos = [caminho for _, caminho in self.files()]
+        posteriores = caminhos[caminhos.index(path) + 1:] if path in caminhos else []
+        if posteriores and not chaves.empty:
+            datas = chaves[COLUNA_DATA]
+            # chaves sem data não passam por um filtro de intervalo: nesse caso a busca é só pelas URLs
+            filters = {} if datas.isna().any() else {"date_from": datas.min(), "date_to": datas.max()}
+            fontes = pa.array(chaves["Fonte"].unique().astype(object), pa.string())
+            for caminho in posteriores:
+                try:
+                    partes.append(_keys(self._scan_file(caminho, CHAVE_DEDUP, filters, fontes)))
+                except FileNotFoundError:
+                    # arquivo removido por uma compactação concorrente; o conteúdo está no compactado
+                    continue
+        if partes:
+            depois = pd.concat(partes, ignore_index=True).drop_duplicates().assign(__depois=True)
+            marcadas = chaves.merge(depois, on=CHAVE_DEDUP, how="left")["__depois"].notna().to_numpy()
+            repetidas = repetidas | marcadas
+        return np.flatnonzero(repetidas)
+
+    def compact(self):
+        """Junta os arquivos pequenos em um arquivo por partição, aplicando a deduplicação.
+
+        Como grava e apaga arquivos, só deve ser chamado com a trava da pipeline.
+        """
+        # o arquivo antigo não pertence a nenhuma partição: vira a parte 0 antes de ser compactado
+        self.migrate_legacy()
+        arquivos = self.files()
+        if len(arquivos) <= 1:
+            return 0
+        frames = []
+        for seq, path in arquivos:
+            df = self._read_file(path)
+            df["__particao"] = os.path.basename(os.path.dirname(path))
+            frames.append(df)
+        df = concat_compact(frames).drop_duplicates(subset=CHAVE_DEDUP, keep="last")
+
+        max_seq = arquivos[-1][0]
+        for partition, group in df.groupby("__particao"):
+            path = os.path.join(self.root, partition, f"compact-{max_seq:012d}-{uuid.uuid4().hex[:8]}.parquet")
+            atomic_write_parquet(group.drop(columns="__particao"), path, self.row_group_rows)
+        # os arquivos antigos só são removidos depois que os compactados estão gravados
+        for _, path in arquivos:
+            os.remove(path)
+        self.logger.info(f"Dataset compactado: {len(arquivos)} arquivos, {len(df)} registros")
+        return len(arquivos)
+
+
+# colunas do engineer_data -> colunas da tabela records do SQLite
+COLUNAS_SQL = {
+    "Fonte": "fonte",
+    "Data da notícia": "data",
+    "Tipo do golpe": "tipo",
+    "Descrição breve do golpe": "descricao",
+    "Canal utilizado": "canal",
+    "Público alvo": "publico",
+    "Estimativa de impacto ou prejuízo": "impacto",
+}
+_EXPRESSOES_SQL = {"tipo": "tipo", "canal": "canal", "publico": "publico", "data": "data", "mes": "substr(data, 1, 7)"}
+
+
+class SQLiteEngineerStore:
+    """Registros do engenheiro em um banco SQLite, com índices por tipo, canal, público e data.
+
+    Tem a mesma interface do EngineerDataset (append, read, max_seq, signature, compact), mais
+    select e count executados no próprio banco: filtros e agregações não carregam o dataset na
+    memória. Cada lote recebe um número de sequência; um registro com chave (Fonte, Data da
+    notícia) já existente é substituído e passa a ter a sequência do novo lote, de modo que
+    read(since_seq) também devolve as substituições.
+    """
+
+    backend = "sqlite"
+    unique_keys = True  # a chave é a chave primária da tabela
+
+    def __init__(self, data_dir="data", name="engineer_data"):
+        self.logger = logging.getLogger(__name__)
+        self.data_dir = data_dir
+        self.root = os.path.join(data_dir, f"{name}.sqlite")
+        os.makedirs(data_dir or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records (fonte TEXT, data TEXT, tipo TEXT, descricao TEXT, canal TEXT, "
+                "publico TEXT, impacto TEXT, seq INTEGER, PRIMARY KEY (fonte, data))"
+            )
+            for colunas in ("seq", "data", "tipo, data", "canal, data", "publico, data"):
+                nome = "idx_records_" + colunas.replace(", ", "_")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON records ({colunas})")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.root, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def max_seq(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM records").fetchone()[0]
+
+    def migrate_legacy(self):
+        """Nada a migrar: o banco não tem formato antigo (ver migrate_to_sqlite)."""
+
+    def signature(self):
+        # toda escrita (inclusive substituição) cria uma sequência nova
+        return (self.root, self.max_seq())
+
+    def num_files(self):
+        return 1 if self.max_seq() else 0
+
+    def append(self, df, seq=None):
+        """Grava um lote (inserindo ou substituindo pela chave) e retorna a identificação do lote."""
+        if df.empty:
+            return None
+        colunas = [c for c in COLUNAS_SQL if c in df.columns]
+        df = compact_frame(df[colunas])
+        if COLUNA_DATA in df.columns:
+            # no banco, a data fica como "YYYY-MM-DD" (comparável como texto)
+            df[COLUNA_DATA] = df[COLUNA_DATA].dt.strftime("%Y-%m-%d")
+        valores = df.astype(object).where(df.notna(), None)
+        with self._connect() as conn:
+            # reserva a sequência e grava o lote na mesma transação
+            conn.execute("BEGIN IMMEDIATE")
+            if seq is None:
+                seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM records").fetchone()[0] + 1
+            nomes = ", ".join(COLUNAS_SQL[c] for c in colunas)
+            conn.executemany(
+                f"INSERT OR REPLACE INTO records ({nomes}, seq) VALUES ({', '.join('?' * len(colunas))}, ?)",
+                (row + (seq,) for row in zip(*(valores[c].tolist() for c in colunas))),
+            )
+        return f"{self.root}#seq={seq}"
+
+    def _where(self, tipo=None, canal=None, publico=None, date_from=None, date_to=None):
+        condicoes, params = [], []
+        for coluna, valor in (("tipo", tipo), ("canal", canal), ("publico", publico)):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                params.append(valor)
+        if date_from is not None:
+            condicoes.append("data >= ?")
+            params.append(str(date_from))
+        if date_to is not None:
+            condicoes.append("data <= ?")
+            params.append(str(date_to))
+        return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", params
+
+    def _query(self, sql, params, columns):
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def _records(self, sql, params, columns):
+        # mesma representação compacta do dataset Parquet
+        return compact_frame(self._query(sql, params, columns))
+
+    def read(self, since_seq=None, columns=None):
+        """Lê os registros; com since_seq, só os gravados (ou substituídos) depois dessa sequência."""
+        colunas = list(columns) if columns is not None else list(COLUNAS_SQL)
+        sql = f"SELECT {', '.join(COLUNAS_SQL[c] for c in colunas)} FROM records"
+        params = []
+        if since_seq is not None:
+            sql += " WHERE seq > ?"
+            params.append(since_seq)
+        df = self._records(sql + " ORDER BY seq, rowid", params, colunas)
+        return df if not df.empty else pd.DataFrame()
+
+    def select(self, columns=None, limit=None, **filters):
+        """Registros que passam pelos filtros (tipo, canal, publico, date_from, date_to)."""
+        colunas = list(columns) if columns is not None else list(COLUNAS_SQL)
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(COLUNAS_SQL[c] for c in colunas)} FROM records{where} ORDER BY seq, rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._records(sql, params, colunas)
+
+    def count(self, by=None, **filters):
+        """Número de registros que passam pelos filtros; com by, um DataFrame por grupo."""
+        where, params = self._where(**filters)
+        if not by:
+            with self._connect() as conn:
+                return conn.execute(f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+        desconhecidos = [nome for nome in by if nome not in _EXPRESSOES_SQL]
+        if desconhecidos:
+            raise ValueError(f"Agrupamento desconhecido: {desconhecidos[0]}")
+        grupos = ", ".join(_EXPRESSOES_SQL[nome] for nome in by)
+        return self._query(
+            f"SELECT {grupos}, COUNT(*) FROM records{where} GROUP BY {grupos} ORDER BY {grupos}", params, [*by, "count"]
+        )
+
+    def shards(self, max_rows=500_000):
+        """Divide a tabela em faixas de rowid com até max_rows linhas cada."""
+        with self._connect() as conn:
+            inicio, fim = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM records").fetchone()
+        if inicio is None:
+            return []
+        return [(a, min(a + max_rows - 1, fim)) for a in range(inicio, fim + 1, max_rows)]
+
+    def read_shard(self, shard, columns=None):
+        """Lê uma faixa de shards() com as colunas pedidas."""
+        colunas = list(columns) if columns is not None else list(COLUNAS_SQL)
+        sql = f"SELECT {', '.join(COLUNAS_SQL[c] for c in colunas)} FROM records WHERE rowid BETWEEN ? AND ?"
+        return self._records(sql, list(shard), colunas)
+
+    def compact(self):
+        """Nada a compactar: as substituições já acontecem na escrita."""
+        return 0
+
+
+BACKENDS = {"parquet": EngineerDataset, "sqlite": SQLiteEngineerStore}
+
+
+def open_engineer_storage(data_dir="data", backend=None):
+    """Abre o armazenamento do engenheiro configurado em storage.backend (parquet ou sqlite)."""
+    try:
+        config = load_config().get("storage") or {}
+    except FileNotFoundError:
+        config = {}
+    backend = backend or config.get("backend", "parquet")
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+    if backend == "parquet":
+        return EngineerDataset(
+            data_dir,
+            row_group_rows=config.get("row_group_rows", ROW_GROUP_ROWS),
+            memory_map=config.get("memory_map", False),
+        )
+    return BACKENDS[backend](data_dir)
+
+
+def migrate_to_sqlite(data_dir="data"):
+    """Importa o dataset Parquet do engenheiro para o SQLite, arquivo por arquivo e na ordem de escrita.
+
+    Os números de sequência dos arquivos são preservados, então o estado incremental do analista
+    continua válido depois da troca de backend. Os arquivos Parquet não são apagados. Deve rodar
+    com a trava da pipeline (a linha de comando a obtém), pois migra o arquivo antigo.
+    """
+    logger = logging.getLogger(__name__)
+    source = EngineerDataset(data_dir)
+    source.migrate_legacy()
+    target = SQLiteEngineerStore(data_dir)
+    total = 0
+    for seq, path in source.files():
+        df = source._read_file(path)
+        # no banco a sequência 0 significa "vazio": a parte migrada do arquivo antigo vira a 1
+        target.append(df, seq=max(seq, 1))
+        total += len(df)
+    registros = target.count()
+    logger.info(f"{total} linhas de {source.root} importadas para {target.root} ({registros} registros)")
+    return registros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção do armazenamento do engenheiro")
+    parser.add_argument("command", choices=["compact", "migrate", "count", "select"])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--backend", choices=list(BACKENDS), help="padrão: storage.backend do config.yaml")
+    parser.add_argument("--tipo")
+    parser.add_argument("--canal")
+    parser.add_argument("--publico")
+    parser.add_argument("--date-from", help="YYYY-MM-DD (inclusiva)")
+    parser.add_argument("--date-to", help="YYYY-MM-DD (inclusiva)")
+    parser.add_argument("--by", nargs="*", choices=AGRUPAMENTOS, help="agrupamentos da contagem")
+    parser.add_argument("--columns", nargs="*", help="colunas do select (padrão: todas)")
+    parser.add_argument("--limit", type=int, default=20, help="linhas exibidas pelo select")
+    args = parser.parse_args()
+    filters = dict(
+        tipo=args.tipo, canal=args.canal, publico=args.publico, date_from=args.date_from, date_to=args.date_to,
+    )
+
+    if args.command in ("compact", "migrate"):
+        # comandos que gravam no dataset usam a mesma trava da pipeline
+        lock = FileLock(os.path.join(args.data_dir, "pipeline.lock"))
+        if not lock.acquire():
+            print("Pipeline em execução em outro processo; tente novamente quando ela terminar.")
+            raise SystemExit(1)
+        try:
+            if args.command == "migrate":
+                migrate_to_sqlite(args.data_dir)
+                print("Importação concluída; use storage.backend: sqlite no config.yaml para ativar o banco.")
+            else:
+                open_engineer_storage(args.data_dir, args.backend).compact()
+        finally:
+            lock.release()
+    elif args.command == "count":
+        storage = open_engineer_storage(args.data_dir, args.backend)
+        result = storage.count(by=args.by, **filters)
+        print(result.to_string(index=False) if isinstance(result, pd.DataFrame) else result)
+    elif args.command == "select":
+        storage = open_engineer_storage(args.data_dir, args.backend)
+        print(storage.select(columns=args.columns, limit=args.limit, **filters).to_string(index=False))
@@ -0,0 +1,171 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# séries disponíveis: nome -> dimensão diária das métricas do analista (a total não tem chave)
+SERIES = {
+    "total": "serie_diaria",
+    "tipo": "serie_diaria_por_tipo",
+    "canal": "serie_diaria_por_canal",
+    "publico": "serie_diaria_por_publico",
+}
+# frequências: código -> (regra do resample, janela padrão da média móvel em períodos)
+FREQUENCIAS = {
+    "D": ("D", 7),
+    "W": ("W-MON", 4),  # semanas começando na segunda-feira
+    "M": ("MS", 3),
+}
+CHAVE_TOTAL = "Total"
+
+# formato do timeseries.parquet: uma linha por (frequência, série, chave, período), grade densa
+SCHEMA = pa.schema([
+    pa.field("frequency", pa.dictionary(pa.int8(), pa.string())),
+    pa.field("series", pa.dictionary(pa.int8(), pa.string())),
+    pa.field("key", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("period", pa.date32()),
+    pa.field("count", pa.int64()),
+    pa.field("rolling_mean", pa.float64()),
+    pa.field("growth", pa.float64()),
+    pa.field("spike_score", pa.float64()),
+    pa.field("spike", pa.bool_()),
+])
+
+
+def daily_matrix(metrics, dimension):
+    """Matriz densa dia × chave com as contagens diárias de uma dimensão das métricas.
+
+    Dias sem notícias entram com zero, para que janelas e variações usem o calendário real.
+    """
+    if metrics.empty:
+        return pd.DataFrame()
+    frame = metrics[metrics["dimension"] == dimension]
+    if frame.empty:
+        return pd.DataFrame()
+    datas = pd.to_datetime(frame["period"], errors="coerce", format="%Y-%m-%d")
+    chaves = frame["key"].fillna(CHAVE_TOTAL) if frame["key"].notna().any() else CHAVE_TOTAL
+    long = pd.DataFrame({"data": datas, "key": chaves, "count": frame["count"]}).dropna(subset=["data"])
+    if long.empty:
+        return pd.DataFrame()
+    matrix = long.pivot_table(index="data", columns="key", values="count", aggfunc="sum", fill_value=0)
+    dias = pd.date_range(matrix.index.min(), matrix.index.max(), freq="D")
+    return matrix.reindex(dias, fill_value=0).astype("int64")
+
+
+def resample_matrix(daily, frequency):
+    """Agrega a matriz diária na frequência pedida (D, W ou M)."""
+    regra, _ = FREQUENCIAS[frequency]
+    if frequency == "D" or daily.empty:
+        return daily
+    return daily.resample(regra, label="left", closed="left").sum()
+
+
+def trend_statistics(matrix, window, min_periods=None):
+    """Média móvel, variação e escore de pico de todas as colunas de uma vez.
+
+    O escore compara cada período com a média e o desvio das `window` janelas anteriores
+    (z-score); o desvio tem piso de 1 caso, para que séries quase constantes não gerem picos
+    por variações de uma notícia.
+    """
+    counts = matrix.to_numpy(dtype=float)
+    min_periods = min_periods or window
+    rolling_mean = matrix.rolling(window, min_periods=1).mean().to_numpy()
+
+    anterior = np.vstack([np.full((1, counts.shape[1]), np.nan), counts[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(anterior > 0, (counts - anterior) / anterior, np.nan)
+
+    historico = matrix.shift(1).rolling(window, min_periods=min_periods)
+    base = historico.mean().to_numpy()
+    desvio = np.maximum(np.nan_to_num(historico.std(ddof=0).to_numpy(), nan=0.0), 1.0)
+    spike_score = (counts - base) / desvio
+    return rolling_mean, growth, spike_score
+
+
+def build_timeseries(metrics, windows=None, spike_threshold=3.0):
+    """Calcula todas as séries (frequência × dimensão) a partir das métricas do analista.
+
+    Retorna a tabela longa no formato SCHEMA; cada série é uma matriz período × chave
+    processada por operações vetoriais, sem laços por categoria.
+    """
+    windows = windows or {}
+    partes = []
+    for nome, dimension in SERIES.items():
+        daily = daily_matrix(metrics, dimension)
+        if daily.empty:
+            continue
+        for frequency in FREQUENCIAS:
+            matrix = resample_matrix(daily, frequency)
+            window = int(windows.get(frequency, FREQUENCIAS[frequency][1]))
+            rolling_mean, growth, spike_score = trend_statistics(matrix, window)
+            n_periodos, n_chaves = matrix.shape
+            partes.append(pd.DataFrame({
+                "frequency": frequency,
+                "series": nome,
+                # a matriz é achatada linha a linha: período repetido, chaves em sequência
+                "key": np.tile(matrix.columns.astype(str).to_numpy(), n_periodos),
+                "period": np.repeat(matrix.index.to_numpy(), n_chaves),
+                "count": matrix.to_numpy().ravel(),
+                "rolling_mean": rolling_mean.ravel(),
+                "growth": growth.ravel(),
+                "spike_score": spike_score.ravel(),
+            }))
+    if not partes:
+        return pd.DataFrame(columns=SCHEMA.names)
+    df = pd.concat(partes, ignore_index=True)
+    df["count"] = df["count"].astype("int64")
+    df["spike"] = (df["spike_score"] >= spike_threshold) & (df["count"] > 0)
+    return df
+
+
+def write_timeseries(df, path):
+    """Grava as séries de forma atômica (arquivo temporário + rename)."""
+    df = df.assign(period=pd.to_datetime(df["period"]).dt.date)
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def series_frame(timeseries, frequency="W", series="tipo", keys=None):
+    """Recorte de uma série pronto para plotar (period, key, count, rolling_mean, ...)."""
+    if timeseries.empty:
+        return pd.DataFrame(columns=SCHEMA.names[2:])
+    mask = (timeseries["frequency"] == frequency) & (timeseries["series"] == series)
+    if keys is not None:
+        mask &= timeseries["key"].isin(list(keys))
+    frame = timeseries[mask].drop(columns=["frequency", "series"])
+    frame = frame.assign(key=frame["key"].astype(str), period=pd.to_datetime(frame["period"]))
+    return frame.reset_index(drop=True)
+
+
+def latest_spikes(timeseries, frequency="W", series="tipo"):
+    """Chaves em pico no último período da série, do maior escore para o menor."""
+    frame = series_frame(timeseries, frequency, series)
+    if frame.empty:
+        return frame
+    ultimo = frame[frame["period"] == frame["period"].max()]
+    return ultimo[ultimo["spike"]].sort_values("spike_score", ascending=False).reset_index(drop=True)
+
+
+class TimeSeriesBuilder:
+    """Recalcula o timeseries.parquet do diretório de dados após cada análise."""
+
+    def __init__(self, data_dir="data", windows=None, spike_threshold=3.0, filename="timeseries.parquet"):
+        self.logger = logging.getLogger(__name__)
+        self.path = os.path.join(data_dir, filename)
+        self.windows = windows or {}
+        self.spike_threshold = spike_threshold
+
+    def run(self, metrics):
+        try:
+            df = build_timeseries(metrics, self.windows, self.spike_threshold)
+            write_timeseries(df, self.path)
+            picos = int(df["spike"].sum()) if not df.empty else 0
+            self.logger.info(f"Séries temporais salvas em {self.path} ({len(df)} pontos, {picos} picos)")
+            return df
+        except Exception as e:
+            self.logger.error(f"Erro ao calcular as séries temporais: {e}")
+            return None
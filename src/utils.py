@@ -1,7 +1,12 @@
 import logging
+import functools
+import threading
 import yaml
 import os
 
+_gemini_lock = threading.Lock()
+_gemini_configured = False
+
 def setup_logging():
     """Configure o registro de logs para a aplicação."""
     logging.basicConfig(
@@ -13,7 +18,24 @@ def setup_logging():
         ]
     )
 
+@functools.lru_cache(maxsize=None)
 def load_config():
-    """Carregar configuração a partir do arquivo config.yaml."""
+    """Carregar configuração a partir do arquivo config.yaml (lido uma vez por processo)."""
     with open("config.yaml", "r") as f:
-        return yaml.safe_load(f)
\ No newline at end of file
+        return yaml.safe_load(f)
+
+def create_gemini_model(api_key, model_name="gemini-2.0-flash", system_instruction=None):
+    """Cria um modelo Gemini, importando e configurando a biblioteca só na primeira vez.
+
+    system_instruction guarda no modelo a parte fixa do prompt, que não precisa ir em cada chamada.
+    """
+    global _gemini_configured
+    import google.generativeai as genai
+
+    with _gemini_lock:
+        if not _gemini_configured:
+            genai.configure(api_key=api_key)
+            _gemini_configured = True
+    if system_instruction:
+        return genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+    return genai.GenerativeModel(model_name=model_name)
\ No newline at end of file
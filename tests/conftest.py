@@ -0,0 +1,23 @@
+import os
+import sys
+import shutil
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# os testes importam src/ e benchmarks/ a partir da raiz do projeto
+sys.path.insert(0, RAIZ)
+
+from src.datastore import get_datastore  # noqa: E402
+from src.retrieval import reset_retrieval_index  # noqa: E402
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Diretório temporário com config.yaml e data/, usado como diretório de trabalho dos agentes."""
+    shutil.copy(os.path.join(RAIZ, "config.yaml"), tmp_path / "config.yaml")
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    # o DataStore e o índice de busca compartilhados são indexados pelo caminho relativo "data"
+    get_datastore("data").invalidate()
+    reset_retrieval_index("data")
+    return tmp_path
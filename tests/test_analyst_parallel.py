@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from benchmarks.datasets import engineer_records
+from src.storage import EngineerDataset, SQLiteEngineerStore
+from src.analyst_state import AnalystState, count_series, counts_to_analysis
+from src.analyst_parallel import ParallelAnalysis, COLUNAS_ANALISE
+
+
+def build_dataset(dataset):
+    """Três lotes, o último reingerindo chaves dos anteriores com outro tipo de golpe."""
+    dataset.append(engineer_records(1500, seed=1, start=0))
+    dataset.append(engineer_records(1500, seed=1, start=1500))
+    reingeridos = dataset.read().sample(n=400, random_state=0)
+    reingeridos["Tipo do golpe"] = engineer_records(400, seed=2)["Tipo do golpe"].to_numpy()
+    dataset.append(reingeridos)
+    return dataset
+
+
+def write_legacy(data_dir):
+    """Antigo engineer_data.parquet (arquivo único), com chaves repetidas dentro do arquivo."""
+    df = engineer_records(600, seed=3, start=10_000)
+    repetidos = df.sample(n=100, random_state=1).assign(**{"Canal utilizado": "SMS"})
+    pd.concat([df, repetidos]).to_parquet(data_dir / "engineer_data.parquet", row_group_size=250)
+
+
+def assert_matches_serial(tmp_path, dataset, shard_rows):
+    df = dataset.read(columns=COLUNAS_ANALISE)
+    parallel = ParallelAnalysis(dataset, workers=2, shard_rows=shard_rows)
+    analysis, rows = parallel.run(with_records=True)
+    assert analysis == counts_to_analysis(count_series(df))
+
+    serial_state = AnalystState(str(tmp_path / "serial_state.sqlite"))
+    serial_state.rebuild(df)
+    parallel_state = AnalystState(str(tmp_path / "parallel_state.sqlite"))
+    parallel_state.rebuild_from(analysis, rows)
+    assert parallel_state.to_analysis() == serial_state.to_analysis()
+
+
+@pytest.mark.parametrize("shard_rows", [200, 700])
+def test_parallel_matches_serial_parquet(tmp_path, shard_rows):
+    write_legacy(tmp_path)
+    dataset = build_dataset(EngineerDataset(str(tmp_path), row_group_rows=500))
+    assert len(dataset.read()) == 3600
+    assert_matches_serial(tmp_path, dataset, shard_rows)
+
+
+def test_parallel_matches_serial_sqlite(tmp_path):
+    dataset = build_dataset(SQLiteEngineerStore(str(tmp_path)))
+    assert len(dataset.shards(700)) > 2
+    assert_matches_serial(tmp_path, dataset, 700)
+
+
+@pytest.mark.parametrize("max_rows", [200, 700, 10_000])
+def test_parquet_shards_respect_max_rows(tmp_path, max_rows):
+    dataset = build_dataset(EngineerDataset(str(tmp_path), row_group_rows=500))
+    shards = dataset.shards(max_rows)
+    assert all(0 < fim - inicio <= max_rows for _, inicio, fim in shards)
+    lidas = pd.concat([dataset.read_shard(shard) for shard in shards], ignore_index=True)
+    arquivos = pd.concat([dataset._read_file(path) for _, path in dataset.files()], ignore_index=True)
+    pd.testing.assert_frame_equal(lidas.astype(str), arquivos.astype(str))
+
+
+def test_parallel_empty_dataset(tmp_path):
+    analysis, rows = ParallelAnalysis(EngineerDataset(str(tmp_path))).run(with_records=True)
+    assert analysis == {} and rows == []
@@ -0,0 +1,36 @@
+from benchmarks.datasets import engineer_records
+from src import cache
+from src.storage import EngineerDataset, SQLiteEngineerStore
+
+
+def test_data_version_tracks_the_parquet_dataset_without_hashing_it(tmp_path, monkeypatch):
+    lidos = []
+    hash_original = cache.file_hash
+    monkeypatch.setattr(cache, "file_hash", lambda path: lidos.append(path) or hash_original(path))
+    dataset = EngineerDataset(str(tmp_path))
+    vazio = cache.data_version(str(tmp_path))
+
+    dataset.append(engineer_records(100, seed=1))
+    v1 = cache.data_version(str(tmp_path))
+    assert v1 != vazio and cache.data_version(str(tmp_path)) == v1
+
+    dataset.append(engineer_records(10, seed=2, start=100))
+    assert cache.data_version(str(tmp_path)) != v1
+    # só os arquivos avulsos (analyst_data.parquet) passam pelo hash do conteúdo
+    assert all("engineer_data" not in path for path in lidos)
+
+
+def test_data_version_tracks_the_sqlite_store_sequence(tmp_path):
+    vazio = cache.data_version(str(tmp_path))
+    store = SQLiteEngineerStore(str(tmp_path))
+    store.append(engineer_records(100, seed=1))
+    v1 = cache.data_version(str(tmp_path))
+    assert v1 != vazio and cache.data_version(str(tmp_path)) == v1
+    store.append(engineer_records(1, seed=1))
+    assert cache.data_version(str(tmp_path)) != v1
+
+
+def test_data_version_follows_the_analyst_metrics(tmp_path):
+    antes = cache.data_version(str(tmp_path))
+    (tmp_path / "analyst_data.parquet").write_bytes(b"PAR1")
+    assert cache.data_version(str(tmp_path)) != antes
@@ -0,0 +1,56 @@
+import shutil
+from benchmarks.datasets import engineer_records
+from benchmarks.fake_llm import FakeModel
+from src.dedup import DedupIndex, fingerprint, normalize_url
+from src.engineer import EngineerAgent
+
+
+def records(rows, start=0):
+    return engineer_records(rows, seed=7, start=start).to_dict("records")
+
+
+def test_normalize_url():
+    assert normalize_url("https://www.g1.globo.com/noticia/1/?utm_source=x&b=2&a=1#topo[3]") == "g1.globo.com/noticia/1?a=1&b=2"
+    assert fingerprint("http://g1.globo.com/noticia/1/", "2025-03-05") == fingerprint("g1.globo.com/noticia/1", "2025-03-05 00:00:00")
+
+
+def test_identical_records_are_duplicates(workspace):
+    agent = EngineerAgent(model=FakeModel())
+    lote = records(60)
+    assert agent.save_to_parquet(lote[:50]) == {"accepted": 50, "duplicates": 0}
+    assert agent.save_to_parquet(lote) == {"accepted": 10, "duplicates": 50}
+    assert len(agent.store.engineer_dataset.read()) == 60
+
+
+def test_changed_record_replaces_the_stored_one(workspace):
+    agent = EngineerAgent(model=FakeModel())
+    agent.save_to_parquet(records(20))
+    alterado = dict(records(20)[3])
+    fonte = alterado["Fonte"]
+    alterado["Fonte"] = fonte.replace("https://", "http://") + "/?utm_source=newsletter"
+    alterado["Canal utilizado"] = "SMS" if alterado["Canal utilizado"] != "SMS" else "E-mail"
+    assert agent.save_to_parquet([alterado]) == {"accepted": 1, "duplicates": 0}
+
+    df = agent.store.engineer_dataset.read()
+    assert len(df) == 20
+    assert df.loc[df["Fonte"] == fonte, "Canal utilizado"].tolist() == [alterado["Canal utilizado"]]
+    # a versão nova também passa a ser a conhecida pelo índice
+    assert agent.save_to_parquet([alterado]) == {"accepted": 0, "duplicates": 1}
+
+
+def test_last_version_in_the_batch_wins(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup_index.sqlite"))
+    primeiro = records(1)[0]
+    segundo = {**primeiro, "Tipo do golpe": "Phishing" if primeiro["Tipo do golpe"] != "Phishing" else "Golpe do Pix"}
+    aceitos, duplicados = index.split([primeiro, segundo])
+    assert aceitos == [segundo] and duplicados == [primeiro]
+
+
+def test_index_is_rebuilt_when_the_dataset_is_recreated(workspace):
+    agent = EngineerAgent(model=FakeModel())
+    agent.save_to_parquet(records(30))
+    shutil.rmtree(workspace / "data" / "engineer_data")
+    agent.store.invalidate("engineer_data")
+    # o índice sobreviveu, mas o dataset não tem mais esses registros
+    assert agent.save_to_parquet(records(30)) == {"accepted": 30, "duplicates": 0}
+    assert len(agent.store.engineer_dataset.read()) == 30
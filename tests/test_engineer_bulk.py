@@ -0,0 +1,78 @@
+import time
+import threading
+from benchmarks.fake_llm import FakeModel
+from src.engineer import EngineerAgent, RecordSink
+from src.ratelimit import TokenBucket
+
+
+class RecordingModel(FakeModel):
+    """FakeModel que anota o horário de cada chamada e falha nas buscas com o foco marcado."""
+
+    def __init__(self, fail_on=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_on = fail_on
+        self.started = []
+        self.active = self.max_active = 0
+        self._active_lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._active_lock:
+            self.started.append(time.monotonic())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.fail_on and self.fail_on in prompt:
+                raise RuntimeError("falha simulada da API")
+            return super().generate_content(prompt, stream)
+        finally:
+            with self._active_lock:
+                self.active -= 1
+
+
+def agent_with(model, workers=4):
+    agent = EngineerAgent(model=model)
+    agent.max_workers = workers
+    return agent
+
+
+def test_queries_are_merged_concurrently(workspace):
+    model = RecordingModel(latency=0.2, records=5)
+    agent = agent_with(model)
+    queries = agent.build_queries(["tipo"])[:4]
+
+    inicio = time.perf_counter()
+    results = agent.bulk_search(queries, max_results=5, limiter=TokenBucket(6000, capacity=4))
+    decorrido = time.perf_counter() - inicio
+
+    assert len(results) == 4 * 5
+    assert len({(r["Fonte"], r["Data da notícia"]) for r in results}) == len(results)
+    assert model.max_active > 1
+    assert decorrido < 4 * 0.2
+
+
+def test_failed_query_does_not_drop_the_others(workspace):
+    model = RecordingModel(records=5, fail_on="foco que falha")
+    agent = agent_with(model)
+    queries = ["foco que falha", *agent.build_queries(["canal"])[:3]]
+
+    sink = RecordSink(lambda batch: {"accepted": len(batch), "duplicates": 0}, flush_every=100)
+    results = agent.bulk_search(queries, max_results=5, sink=sink, limiter=TokenBucket(6000, capacity=4))
+    sink.close()
+
+    assert model.calls == 3 and len(model.started) == 4
+    assert len(results) == 3 * 5
+    # os registros chegam ao sink à medida que as buscas terminam
+    assert sorted(r["Fonte"] for r in sink.records) == sorted(r["Fonte"] for r in results)
+
+
+def test_rate_limit_is_respected(workspace):
+    model = RecordingModel(records=1)
+    agent = agent_with(model, workers=4)
+    queries = agent.build_queries(["tipo"])[:6]
+    # 2 chamadas de rajada e depois uma a cada 0,1 s
+    agent.bulk_search(queries, max_results=1, limiter=TokenBucket(600, capacity=2))
+
+    inicios = sorted(model.started)
+    assert len(inicios) == 6
+    for n, instante in enumerate(inicios[2:], start=1):
+        assert instante - inicios[0] >= n * 0.1 - 0.02
@@ -0,0 +1,22 @@
+import os
+from benchmarks.fake_llm import FakeModel
+from src.jobs import PipelineJob
+from src.locks import FileLock
+from src.orchestrator import Orchestrator
+
+
+def test_busy_lock_is_not_reported_as_failure(workspace):
+    # o agendador (outro processo) segura a trava da pipeline
+    lock = FileLock(os.path.join("data", "pipeline.lock"))
+    assert lock.acquire()
+    try:
+        job = PipelineJob(Orchestrator(model=FakeModel()))
+        assert job.start()
+        job._thread.join(timeout=10)
+    finally:
+        lock.release()
+
+    assert job.status == "busy"
+    assert job.finished_at is not None
+    # liberada a trava, o job pode ser iniciado de novo
+    assert not job.running
@@ -0,0 +1,34 @@
+import time
+from benchmarks.fake_llm import FakeModel
+from src.orchestrator import Orchestrator
+
+LATENCIA = 0.5
+PERGUNTAS = [
+    "Como me proteger do Golpe do Pix?",
+    "O que é phishing?",
+    "Como saber se um investimento é falso?",
+    "O que fazer se clonarem meu WhatsApp?",
+]
+
+
+def test_batch_latency_is_the_slowest_call(workspace):
+    model = FakeModel(latency=LATENCIA)
+    orchestrator = Orchestrator(model=model)
+    orchestrator.professor  # cria o agente fora da medição
+
+    inicio = time.perf_counter()
+    respostas = orchestrator.get_educational_responses(PERGUNTAS)
+    decorrido = time.perf_counter() - inicio
+
+    assert len(respostas) == len(PERGUNTAS) and all(respostas)
+    assert model.calls == len(PERGUNTAS)
+    # em paralelo, o lote leva perto de uma chamada, não a soma das quatro
+    assert decorrido < 2 * LATENCIA, decorrido
+
+
+def test_repeated_batch_is_served_from_cache(workspace):
+    model = FakeModel(latency=LATENCIA)
+    orchestrator = Orchestrator(model=model)
+    primeiras = orchestrator.get_educational_responses(PERGUNTAS[:2])
+    assert orchestrator.get_educational_responses(PERGUNTAS[:2]) == primeiras
+    assert model.calls == 2
@@ -0,0 +1,33 @@
+import random
+from src.prompts import ContextPacker, estimate_tokens
+
+
+def packer(budget, seed=0):
+    rng = random.Random(seed)
+    packer = ContextPacker(budget)
+    packer.add("Registros relevantes", ["fonte|data|tipo"] + [
+        "x" * rng.randint(10, 120) for _ in range(60)
+    ], header_lines=1)
+    packer.add("Contagens", [f"tipo {n}: {rng.randint(1, 999)}" for n in range(30)])
+    return packer
+
+
+def test_packed_context_never_exceeds_the_budget():
+    for budget in range(5, 800, 7):
+        for seed in range(3):
+            texto, stats = packer(budget, seed).pack()
+            assert stats["context_tokens"] <= budget, (budget, seed)
+            assert estimate_tokens(texto) <= budget
+
+
+def test_truncated_section_reports_the_omitted_lines():
+    secao = ContextPacker(60)
+    secao.add("Contagens", [f"tipo {n}: {n * 7}" for n in range(40)])
+    texto, stats = secao.pack()
+    assert texto.splitlines()[-1] == f"(+{stats['omitted_lines']} omitidos por limite de tamanho)"
+    assert 0 < stats["omitted_lines"] < 40 and stats["context_tokens"] <= 60
+
+
+def test_everything_fits_without_a_note():
+    texto, stats = packer(100_000).pack()
+    assert "omitidos" not in texto and stats["omitted_lines"] == 0
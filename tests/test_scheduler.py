@@ -0,0 +1,57 @@
+import datetime
+import pytest
+from src.scheduler import CronSchedule
+
+# domingo, 18/10/2026, 12:00
+INICIO = datetime.datetime(2026, 10, 18, 12, 0)
+
+
+def proximos(expression, n=4, moment=INICIO):
+    schedule, horarios = CronSchedule(expression), []
+    for _ in range(n):
+        moment = schedule.next_after(moment)
+        horarios.append(moment)
+    return horarios
+
+
+def test_step_from_a_start_value():
+    assert CronSchedule("5/10 * * * *").fields[0] == {5, 15, 25, 35, 45, 55}
+    assert CronSchedule("*/15 * * * *").fields[0] == {0, 15, 30, 45}
+    assert CronSchedule("10-20/5 * * * *").fields[0] == {10, 15, 20}
+    assert [h.minute for h in proximos("5/20 * * * *", 3)] == [5, 25, 45]
+
+
+@pytest.mark.parametrize("expression, campo", [
+    ("60 * * * *", "minuto"),
+    ("* 24 * * *", "hora"),
+    ("* * 0 * *", "dia do mês"),
+    ("* * * 13 *", "mês"),
+    ("* * * * 8", "dia da semana"),
+    ("*/0 * * * *", "minuto"),
+    ("1-x * * * *", "minuto"),
+    ("30-10 * * * *", "minuto"),
+])
+def test_invalid_values_name_the_field(expression, campo):
+    with pytest.raises(ValueError, match=campo):
+        CronSchedule(expression)
+
+
+def test_seven_is_sunday():
+    assert CronSchedule("0 9 * * 7").fields[4] == {0}
+    assert CronSchedule("0 9 * * 5-7").fields[4] == {0, 5, 6}
+    assert all(h.weekday() == 6 and h.hour == 9 for h in proximos("0 9 * * 7"))
+
+
+def test_day_of_month_or_day_of_week_when_both_are_restricted():
+    horarios = proximos("0 9 1 * 1", 4)
+    assert [h.date() for h in horarios] == [
+        datetime.date(2026, 10, 19), datetime.date(2026, 10, 26), datetime.date(2026, 11, 1), datetime.date(2026, 11, 2),
+    ]
+    assert all(h.day == 1 or h.weekday() == 0 for h in horarios)
+
+
+def test_star_fields_still_combine_with_and():
+    assert all(h.day == 1 for h in proximos("0 9 1 * *"))
+    assert all(h.weekday() == 0 for h in proximos("0 9 * * 1"))
+    # */n conta como "*": dia múltiplo de 10 + 1 E segunda-feira
+    assert all(h.day % 10 == 1 and h.weekday() == 0 for h in proximos("0 9 */10 * 1", 2))
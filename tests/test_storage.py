@@ -0,0 +1,36 @@
+import os
+from benchmarks.datasets import engineer_records
+from src.storage import CHAVE_DEDUP, EngineerDataset
+
+
+def snapshot(data_dir):
+    return sorted((raiz, tuple(sorted(arquivos))) for raiz, _, arquivos in os.walk(data_dir))
+
+
+def test_readers_do_not_migrate_the_legacy_file(tmp_path):
+    engineer_records(200, seed=1).to_parquet(tmp_path / "engineer_data.parquet")
+    dataset = EngineerDataset(str(tmp_path))
+    antes = snapshot(tmp_path)
+
+    assert len(dataset.read()) == 200
+    assert len(dataset.select(limit=10)) == 10
+    assert dataset.count() == 200
+    assert sum(len(dataset.read_shard(shard)) for shard in dataset.shards(64)) == 200
+    assert dataset.max_seq() == 0
+    assert snapshot(tmp_path) == antes
+
+
+def test_migration_keeps_sequence_zero(tmp_path):
+    engineer_records(200, seed=1).to_parquet(tmp_path / "engineer_data.parquet")
+    dataset = EngineerDataset(str(tmp_path))
+    novos = dataset.read().head(20).assign(**{"Canal utilizado": "SMS"})
+    dataset.append(novos)
+    assert [seq for seq, _ in dataset.files()] == [0, 1]
+    esperado = dataset.read().sort_values(CHAVE_DEDUP).reset_index(drop=True)
+
+    dataset.migrate_legacy()
+    assert not os.path.exists(dataset.legacy_path)
+    assert [seq for seq, _ in dataset.files()] == [0, 1]
+    migrado = dataset.read().sort_values(CHAVE_DEDUP).reset_index(drop=True)
+    assert migrado.astype(str).equals(esperado.astype(str))
+    assert (migrado.set_index(CHAVE_DEDUP).loc[novos.set_index(CHAVE_DEDUP).index, "Canal utilizado"] == "SMS").all()